@@ -0,0 +1,170 @@
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from codegen import BASE_DIR, LAYERS, class_name_for_table, generate_and_save_layer, layer_is_current
+from fingerprints import FingerprintStore
+from json_store import append_json_line, locked, read_json_lines, replace_file
+from output_writer import BulkWriter
+from templates import TEMPLATE_LAYERS
+from schema_model import get_table_info, get_table_names
+
+MANIFEST_NAME = ".batch_manifest.jsonl"
+
+
+# Resumable record of batch runs: one JSON line per finished layer ({"job": "<table>/<layer>", "framework",
+# "status", "path", "error", "finished_at"}); the latest line of a job wins. Lines are appended as layers
+# finish, so recording costs the same however long the run; runs sharing the file append under a file lock.
+class RunManifest:
+    def __init__(self, path, framework):
+        self.path = path
+        self.framework = framework
+        self.jobs = {}
+
+    def load(self):
+        # Results generated for another framework can't be reused
+        for record in read_json_lines(self.path):
+            if record.get("framework") == self.framework and "job" in record:
+                self.jobs[record["job"]] = record
+
+    def is_done(self, table, layer):
+        return self.jobs.get(f"{table}/{layer}", {}).get("status") == "done"
+
+    def record(self, table, layer, status, file_path=None, error=None):
+        record = {
+            "job": f"{table}/{layer}",
+            "framework": self.framework,
+            "status": status,
+            "path": file_path,
+            "error": error,
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with locked(self.path):
+            append_json_line(self.path, record)
+
+    # Function to drop lines a later line of the same job (and framework) replaced, so the file doesn't grow
+    # with every run; done once at the start of a run
+    def compact(self):
+        with locked(self.path):
+            latest = {}
+            for record in read_json_lines(self.path):
+                latest[(record.get("framework"), record.get("job"))] = record
+            replace_file(self.path, lambda f: f.writelines(json.dumps(record, sort_keys=True) + "\n"
+                                                          for record in latest.values()))
+
+
+# Function to pick the tables matching any of the glob patterns
+def select_tables(patterns):
+    tables = get_table_names()
+    return [table for table in tables if any(fnmatch.fnmatch(table, pattern) for pattern in patterns)]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate CRUD layers for every table of the schema without the UI.")
+    parser.add_argument("--tables", nargs="+", default=["*"], help="table name glob patterns (default: all tables)")
+    parser.add_argument("--layers", nargs="+", default=LAYERS, choices=LAYERS, help="layers to generate")
+    parser.add_argument("--framework", default="Spring Boot", choices=["Spring Boot", ".NET Core"])
+    parser.add_argument("--output-dir", default=BASE_DIR, help="base directory for generated files")
+    parser.add_argument("--workers", type=int, default=8, help="size of the worker pool")
+    parser.add_argument("--max-concurrency", type=int, default=4,
+                        help="maximum number of model calls in flight at once")
+    parser.add_argument("--manifest", help=f"run manifest path (default: <output-dir>/{MANIFEST_NAME})")
+    parser.add_argument("--no-resume", action="store_true", help="regenerate layers the manifest marks as done")
+    parser.add_argument("--no-cache", action="store_true", help="ask the model for fresh responses")
+    parser.add_argument("--force", action="store_true", help="regenerate layers whose inputs haven't changed")
+    parser.add_argument("--llm-layers", nargs="*", default=[], choices=TEMPLATE_LAYERS,
+                        help="boilerplate layers to generate with the model instead of the local templates")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest = RunManifest(args.manifest or os.path.join(args.output_dir, MANIFEST_NAME), args.framework)
+    if os.path.exists(manifest.path):
+        manifest.compact()
+    if not args.no_resume:
+        manifest.load()
+    fingerprints = FingerprintStore(args.output_dir)
+
+    # A layer marked done is only skipped while its file still matches its inputs: columns, prompt, template
+    def is_done(table, layer):
+        if not manifest.is_done(table, layer):
+            return False
+        table_info = get_table_info(table)
+        return layer_is_current(layer, class_name_for_table(table), ",".join(table_info.non_fk_columns),
+                                args.framework, fingerprints, table_info, layer not in args.llm_layers, args.output_dir)
+
+    tables = select_tables(args.tables)
+    jobs = [(table, layer) for table in tables for layer in args.layers if not is_done(table, layer)]
+    skipped = len(tables) * len(args.layers) - len(jobs)
+    print(f"{len(tables)} tables, {len(jobs)} layers to generate, {skipped} already done", file=sys.stderr)
+
+    # Caps model calls in flight independently of the worker pool size
+    llm_slots = threading.BoundedSemaphore(args.max_concurrency)
+    use_cache = not args.no_cache
+
+    # Each table's layers are staged and published together once the last of them finishes
+    writer = BulkWriter(args.output_dir)
+    pending = {}
+    for table, _ in jobs:
+        pending[table] = pending.get(table, 0) + 1
+    staged = {table: [] for table in pending}
+
+    def run_job(table, layer):
+        table_info = get_table_info(table)
+        property_names = ",".join(table_info.non_fk_columns)
+        with llm_slots:
+            return generate_and_save_layer(layer, class_name_for_table(table), property_names, args.framework,
+                                           use_cache, args.output_dir, table_info, fingerprints,
+                                           use_template=layer not in args.llm_layers, writer=writer,
+                                           session="batch_generate", regenerate=args.force)
+
+    def publish_table(table):
+        try:
+            writer.publish(class_name_for_table(table))
+        except OSError as e:
+            for layer, _ in staged[table]:
+                manifest.record(table, layer, "failed", error=f"publish failed: {e}")
+            return len(staged[table])
+        for layer, file_path in staged[table]:
+            manifest.record(table, layer, "done", file_path=file_path)
+        return 0
+
+    started = time.perf_counter()
+    completed = failed = unchanged = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(run_job, table, layer): (table, layer) for table, layer in jobs}
+        for future in as_completed(futures):
+            table, layer = futures[future]
+            completed += 1
+            try:
+                file_path, generated = future.result()
+                staged[table].append((layer, file_path))
+                outcome = file_path if generated else f"{file_path} (unchanged)"
+                unchanged += not generated
+            except Exception as e:
+                failed += 1
+                manifest.record(table, layer, "failed", error=str(e))
+                outcome = f"FAILED: {e}"
+            pending[table] -= 1
+            if not pending[table]:
+                failed += publish_table(table)
+            elapsed = time.perf_counter() - started
+            remaining = elapsed / completed * (len(jobs) - completed)
+            print(f"[{completed}/{len(jobs)}] {table} {layer} -> {outcome} "
+                  f"(elapsed {elapsed:.0f}s, eta {remaining:.0f}s)", file=sys.stderr)
+
+    print(f"Finished: {completed - failed - unchanged} generated, {unchanged} unchanged, {failed} failed; "
+          f"{len(writer.written)} files written, {len(writer.unchanged)} identical files left untouched; "
+          f"manifest at {manifest.path}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
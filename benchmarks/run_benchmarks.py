@@ -0,0 +1,374 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import stand_ins
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ["schema", "table_search", "prefetch", "relationships", "crud_stream", "layers", "single_call", "leveled", "apps"]
+
+APP_SCRIPTS = [
+    "crud_app_final_v10.3.py",
+    "crud_operation_generator_final_v24.2.py",
+    "crud_operation_generator_final_v6.3.py",
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the generators offline against a fake Gemini model and a synthetic MySQL schema."
+    )
+    parser.add_argument("--table-counts", default="10,100,1000",
+                        help="Comma-separated synthetic schema sizes (default: 10,100,1000)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios out of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--requests", type=int, default=12,
+                        help="Tables sent to the model per generation scenario (default: 12)")
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Mean model latency per call (default: 200)")
+    parser.add_argument("--response-chars", type=int, default=2000, help="Mean response size (default: 2000)")
+    parser.add_argument("--invalid-rate", type=float, default=0.0,
+                        help="Fraction of model responses that come back broken, to exercise validation retries")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="Latency per database round-trip (default: 1)")
+    parser.add_argument("--think-ms", type=float, default=50.0,
+                        help="Pause between selecting a table and clicking Fetch Columns (default: 50)")
+    parser.add_argument("--llm-rate", type=float, default=1000.0,
+                        help="Scheduler rate limit in model requests per second (default: 1000, effectively off)")
+    parser.add_argument("--use-cache", action="store_true", help="Let generation scenarios read the LLM cache")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def percentile(values, quantile):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(quantile * (len(ordered) - 1))))]
+
+
+# Collects end-to-end latencies of one scenario along with DB round-trips, model calls and peak memory
+class Measurement:
+    def __init__(self, scenario, table_count, database, llm_settings):
+        self.scenario = scenario
+        self.table_count = table_count
+        self.database = database
+        self.llm_settings = llm_settings
+        self.latencies = []
+        self.error = None
+
+    def __enter__(self):
+        self.round_trips = self.database.round_trips
+        self.llm_calls = self.llm_settings.calls
+        tracemalloc.start()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall_seconds = time.perf_counter() - self.started
+        _, self.peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.round_trips = self.database.round_trips - self.round_trips
+        self.llm_calls = self.llm_settings.calls - self.llm_calls
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        return exc_type is not None and issubclass(exc_type, Exception)
+
+    def timed(self, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        self.latencies.append(time.perf_counter() - started)
+        return result
+
+    def result(self):
+        operations = len(self.latencies)
+        return {
+            "scenario": self.scenario,
+            "tables": self.table_count,
+            "operations": operations,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "throughput_per_second": round(operations / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            "p50_ms": round(percentile(self.latencies, 0.5) * 1000, 2),
+            "p95_ms": round(percentile(self.latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 0.99) * 1000, 2),
+            "db_round_trips": self.round_trips,
+            "llm_calls": self.llm_calls,
+            "peak_memory_kb": round(self.peak_bytes / 1024, 1),
+            "error": self.error,
+        }
+
+
+# Schema browsing: the table list followed by every table's columns, cold and then cached
+def run_schema(measurement):
+    from schema_cache import schema_cache
+    from schema_model import get_table_info, get_table_names
+
+    for _ in range(2):
+        schema_cache.clear()
+        tables = measurement.timed(get_table_names)
+        for table in tables:
+            measurement.timed(get_table_info, table)
+        for table in tables:
+            measurement.timed(get_table_info, table)
+
+
+# Table picker: building the search index over the table list, then one page of matches per keystroke
+def run_table_search(measurement, tables):
+    from schema_model import get_table_names
+    from table_index import get_table_index
+
+    names = get_table_names()
+    measurement.timed(get_table_index, names)
+    queries = [table[:length] for table in tables for length in range(1, len(table) + 1)]
+    queries += [table[-3:] for table in tables] + ["col_1", "_id", "missing"]
+    for query in queries:
+        measurement.timed(get_table_index(names).search, query)
+
+
+# Column prefetch: each user scrolls past a few tables, settles on one and clicks Fetch Columns after a pause;
+# only the click's wait is timed. Per-table entries are dropped first, as when the schema outgrows the cache.
+def run_prefetch(measurement, tables, think_seconds):
+    from prefetch import Prefetcher
+    from schema_cache import schema_cache
+    from schema_model import get_table_info, get_table_names
+
+    names = get_table_names()
+    prefetcher = Prefetcher(enabled=True, warm_enabled=False)
+
+    def fetch_columns(session, table):
+        prefetcher.wait(session, table)
+        return get_table_info(table).non_fk_columns
+
+    for number, table in enumerate(tables):
+        session = f"user-{number}"
+        for selected in [name for name in names[number:number + 3] if name != table] + [table]:
+            schema_cache.invalidate_table(selected)
+            prefetcher.prefetch(session, selected)
+        time.sleep(think_seconds)
+        measurement.timed(fetch_columns, session, table)
+
+
+# Relationship detection: the schema-wide FK graph from one bulk read, then in-memory lookups for every table
+def run_relationships(measurement):
+    from schema_model import get_fk_graph, get_table_names
+
+    graph = measurement.timed(get_fk_graph)
+    for table in get_table_names():
+        measurement.timed(graph.relationships, table)
+    for table in get_table_names():
+        measurement.timed(graph.describe_relationships, table, set(graph.references(table).values()))
+
+
+# crud_app_final_v10.3: one streamed CRUD answer per selected table, one user at a time
+def run_crud_stream(measurement, tables, framework, use_cache):
+    from crud_generation import generate_crud_code
+    from schema_model import get_table_info
+
+    def generate(table):
+        return generate_crud_code(",".join(get_table_info(table).non_fk_columns), framework, use_cache, "bench")
+
+    for table in tables:
+        measurement.timed(generate, table)
+
+
+# crud_operation_generator_final_v24.2 / batch_generate: every layer of every table, concurrently
+def run_layers(measurement, tables, framework, use_cache, output_dir):
+    from codegen import GENERATION_CONCURRENCY, LAYERS, class_name_for_table, generate_and_save_layer
+    from schema_model import get_table_info
+
+    def generate(table, layer):
+        table_info = get_table_info(table)
+        measurement.timed(generate_and_save_layer, layer, class_name_for_table(table),
+                          ",".join(table_info.non_fk_columns), framework, use_cache, output_dir, table_info)
+
+    with ThreadPoolExecutor(max_workers=GENERATION_CONCURRENCY) as executor:
+        for future in [executor.submit(generate, table, layer) for table in tables for layer in LAYERS]:
+            future.result()
+
+
+# crud_operation_generator_final_v24.2 in single-call mode: all layers of a table from one streamed response
+def run_single_call(measurement, tables, framework, use_cache, output_dir):
+    from codegen import LAYERS, class_name_for_table, generate_layers_single_call
+    from schema_model import get_table_info
+
+    def generate(table):
+        table_info = get_table_info(table)
+        generated, _, failed = generate_layers_single_call(LAYERS, class_name_for_table(table),
+                                                           ",".join(table_info.non_fk_columns), framework, use_cache,
+                                                           output_dir, table_info)
+        if failed:
+            raise RuntimeError(f"{table}: " + "; ".join(f"{layer}: {reason}" for layer, reason in failed.items()))
+
+    for table in tables:
+        measurement.timed(generate, table)
+
+
+# crud_operation_generator_final_v6.3: related tables in dependency order, each level concurrently.
+# A table's latency is how long after the Generate click its code was complete.
+def run_leveled(measurement, tables, framework, use_cache):
+    from crud_generation import generate_related_tables
+    from schema_model import get_table_names
+
+    started = time.perf_counter()
+    for event, table, value in generate_related_tables(tables, {}, get_table_names(), framework, use_cache, "bench"):
+        if event == "failed":
+            raise RuntimeError(f"{table}: {value}")
+        if event == "generated":
+            measurement.latencies.append(time.perf_counter() - started)
+
+
+def _by_label(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+# All three Streamlit scripts end to end, driven headlessly with streamlit.testing
+# Function to run queued jobs in this process until `job_id` has finished; raises if it or any of its layers failed
+def run_job(job_id):
+    import job_queue
+
+    while True:
+        job = job_queue.job_queue.get(job_id)
+        if job["status"] not in job_queue.ACTIVE_STATUSES:
+            break
+        if job_queue.work_once(worker="benchmark") is None:
+            time.sleep(0.01)
+    if job["status"] != "done":
+        raise RuntimeError(f"Job {job_id} {job['status']}: {job['error']}")
+    failed = {layer: state["error"] for layer, state in job["result"]["layers"].items() if state["status"] == "failed"}
+    if failed or job["result"]["publish_error"]:
+        raise RuntimeError(f"Job {job_id}: failed layers {failed}, publish error {job['result']['publish_error']}")
+    return job
+
+
+def run_apps(measurement, tables, use_cache):
+    from streamlit.testing.v1 import AppTest
+
+    def run(app):
+        measurement.timed(app.run)
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+
+    def start(script):
+        app = AppTest.from_file(os.path.join(REPO_DIR, script), default_timeout=600)
+        run(app)
+        _by_label(app.checkbox, "♻️ Reuse cached responses").set_value(use_cache)
+        return app
+
+    table = tables[0]
+    app = start(APP_SCRIPTS[0])
+    _by_label(app.selectbox, "📊 Select Table").set_value(table)
+    app.button(key="fetch_columns_button").click()
+    run(app)
+    app.button(key="generate_code_button").click()
+    run(app)
+
+    app = start(APP_SCRIPTS[1])
+    _by_label(app.checkbox, "🔁 Regenerate unchanged layers").check()
+    _by_label(app.selectbox, "🔍 Select Table").set_value(table)
+    app.button(key="fetch_columns_button").click()
+    run(app)
+    _by_label(app.text_input, "Enter Class Name (e.g., Employee)").input("Bench")
+    run(app)
+    app.button(key="generate_code_button").click()
+    run(app)
+    # The click only queues the job; its generation is timed until the job is done, then the results page
+    measurement.timed(run_job, app.session_state["layer_job"])
+    run(app)
+
+    app = start(APP_SCRIPTS[2])
+    app.multiselect(key="generate_tables").set_value(tables)
+    _by_label(app.button, "⚙️ Generate CRUD Code").click()
+    run(app)
+
+
+def print_results(results):
+    columns = ["scenario", "tables", "operations", "throughput_per_second", "p50_ms", "p95_ms", "p99_ms",
+               "db_round_trips", "llm_calls", "peak_memory_kb"]
+    print("  ".join(f"{column:>14}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result[column]):>14}" for column in columns))
+        if result["error"]:
+            print(f"{'':>14}  error: {result['error']}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    # Keep the caches, generated files and logs of the run out of the working tree
+    work_dir = tempfile.mkdtemp(prefix="crud_bench_")
+    os.environ.update({
+        "CRUD_LLM_CACHE_PATH": os.path.join(work_dir, "llm_cache.sqlite3"),
+        "CRUD_BASE_DIR": os.path.join(work_dir, "java", "com", "bench"),
+        "CRUD_STARTUP_LOG": os.path.join(work_dir, "startup_times.jsonl"),
+        "CRUD_METRICS_DIR": os.path.join(work_dir, "metrics"),
+        "CRUD_METRICS_EXPORT_INTERVAL": "0",
+        # v24.2's generation jobs are run in this process, against the stand-ins, instead of by worker processes
+        "CRUD_JOB_QUEUE_PATH": os.path.join(work_dir, "jobs.sqlite3"),
+        "CRUD_JOB_AUTOSTART_WORKERS": "0",
+        "CRUD_LLM_RATE_PER_SECOND": str(args.llm_rate),
+        "CRUD_LLM_BURST": str(max(1, int(args.llm_rate))),
+        "CRUD_LLM_RATE_LIMIT_PATH": os.path.join(work_dir, "llm_rate_limit.sqlite3"),
+    })
+    llm_settings = stand_ins.FakeLLMSettings(args.latency_distribution, args.latency_ms, args.response_chars,
+                                             invalid_rate=args.invalid_rate)
+    stand_ins.install(None, llm_settings)
+    sys.path.insert(0, REPO_DIR)
+
+    results = []
+    framework = "Spring Boot"
+    for table_count in [int(count) for count in args.table_counts.split(",")]:
+        database = stand_ins.FakeDatabase(table_count, args.db_latency_ms)
+        stand_ins.swap_database(database)
+        tables = sorted(set(database.tables) - database.join_tables)[:args.requests]
+        for scenario in scenarios:
+            if scenario == "apps":
+                try:
+                    import streamlit.testing.v1  # noqa: F401
+                except ImportError:
+                    print("Skipping 'apps': streamlit is not installed", file=sys.stderr)
+                    continue
+            from schema_cache import schema_cache
+            schema_cache.clear()
+            with Measurement(scenario, table_count, database, llm_settings) as measurement:
+                if scenario == "schema":
+                    run_schema(measurement)
+                elif scenario == "table_search":
+                    run_table_search(measurement, tables)
+                elif scenario == "prefetch":
+                    run_prefetch(measurement, tables, args.think_ms / 1000)
+                elif scenario == "relationships":
+                    run_relationships(measurement)
+                elif scenario == "crud_stream":
+                    run_crud_stream(measurement, tables, framework, args.use_cache)
+                elif scenario == "layers":
+                    run_layers(measurement, tables, framework, args.use_cache,
+                               os.path.join(work_dir, f"layers_{table_count}"))
+                elif scenario == "single_call":
+                    run_single_call(measurement, tables, framework, args.use_cache,
+                                    os.path.join(work_dir, f"single_call_{table_count}"))
+                elif scenario == "leveled":
+                    run_leveled(measurement, tables, framework, args.use_cache)
+                else:
+                    run_apps(measurement, tables, args.use_cache)
+            results.append(measurement.result())
+            print(f"{scenario} ({table_count} tables): {results[-1]['wall_seconds']} s", file=sys.stderr)
+
+    print_results(results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 1 if any(result["error"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
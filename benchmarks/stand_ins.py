@@ -0,0 +1,284 @@
+import random
+import re
+import sys
+import threading
+import time
+import types
+
+# Offline stand-ins for Gemini and MySQL, installed into sys.modules before the app modules are
+# imported so benchmarks run without network access, an API key or a database server.
+
+DATABASE = "bench"
+
+# The FakeDatabase the installed mysql.connector stand-in connects to
+_active = [None]
+
+COLUMN_TYPES = [
+    ("int", "int"), ("bigint", "bigint"), ("varchar", "varchar(255)"), ("varchar", "varchar(50)"),
+    ("decimal", "decimal(10,2)"), ("date", "date"), ("datetime", "datetime"), ("tinyint", "tinyint(1)"),
+    ("text", "text"),
+]
+
+
+# Function to build a synthetic schema: tables t0000.. with an id primary key, 3-12 other columns and,
+# for roughly a third of the tables, a foreign key to an earlier table (one in five of them through a
+# unique column, i.e. one-to-one). Every tenth table is instead a join table between two earlier tables.
+# Foreign-key rows are (table, column, referenced table, referenced column, constraint, update rule, delete rule).
+def synthetic_schema(table_count, seed=7):
+    rng = random.Random(seed)
+    tables = {}
+    foreign_keys = []
+    join_tables = set()
+    entities = []
+    for index in range(table_count):
+        name = f"t{index:04d}"
+        if index % 10 == 9 and len(entities) >= 2:
+            columns = []
+            for referenced in rng.sample(entities, 2):
+                columns.append((f"{referenced}_id", "int", "int", "NO", "PRI", None, ""))
+                foreign_keys.append((name, f"{referenced}_id", referenced, "id", f"fk_{name}_{referenced}",
+                                     "CASCADE", "CASCADE"))
+            tables[name] = columns
+            join_tables.add(name)
+            continue
+        columns = [("id", "int", "int", "NO", "PRI", None, "auto_increment")]
+        for column_index in range(rng.randint(3, 12)):
+            data_type, column_type = rng.choice(COLUMN_TYPES)
+            columns.append((f"col_{column_index}", data_type, column_type, rng.choice(["YES", "NO"]), "", None, ""))
+        if entities and rng.random() < 0.35:
+            referenced = rng.choice(entities)
+            key = "UNI" if rng.random() < 0.2 else "MUL"
+            columns.append((f"{referenced}_id", "int", "int", "YES", key, None, ""))
+            foreign_keys.append((name, f"{referenced}_id", referenced, "id", f"fk_{name}_{referenced}",
+                                 "NO ACTION", "RESTRICT"))
+        tables[name] = columns
+        entities.append(name)
+    return tables, foreign_keys, join_tables
+
+
+class FakeDatabase:
+    def __init__(self, table_count, latency_ms=1.0, seed=7):
+        self.tables, self.foreign_keys, self.join_tables = synthetic_schema(table_count, seed)
+        self.latency = latency_ms / 1000
+        self.queries = 0
+        self.pings = 0
+        self._lock = threading.Lock()
+
+    @property
+    def round_trips(self):
+        return self.queries + self.pings
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def ping(self):
+        with self._lock:
+            self.pings += 1
+        self._round_trip()
+
+    # Function to answer the information_schema queries the apps send; other statements return no rows
+    def execute(self, sql, params):
+        with self._lock:
+            self.queries += 1
+        self._round_trip()
+        table_filter = params[1] if params and len(params) > 1 else None
+        if "information_schema.COLUMNS" in sql:
+            return [
+                (table, *column)
+                for table, columns in sorted(self.tables.items()) if table_filter in (None, table)
+                for column in columns
+            ]
+        if "information_schema.REFERENTIAL_CONSTRAINTS" in sql:
+            return [row for row in self.foreign_keys if table_filter in (None, row[0])]
+        if "information_schema.TABLES" in sql:
+            return [(1000, 16384 * len(self.tables.get(table_filter, ())), 0)] if table_filter in self.tables else []
+        match = re.match(r"\s*DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?`?(\w+)", sql, re.IGNORECASE)
+        if match:
+            self.tables.pop(match.group(1), None)
+        return []
+
+
+class _Cursor:
+    def __init__(self, database):
+        self._database = database
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self._rows = self._database.execute(sql, params)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, database):
+        self._database = database
+
+    def ping(self, reconnect=False):
+        self._database.ping()
+
+    def reconnect(self, attempts=1, delay=0):
+        pass
+
+    def cursor(self):
+        return _Cursor(self._database)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# Function to sample one model latency (seconds) from the configured distribution
+def sample_latency(rng, distribution, mean_ms):
+    mean = mean_ms / 1000
+    if distribution == "fixed":
+        return mean
+    if distribution == "uniform":
+        return rng.uniform(0, 2 * mean)
+    # lognormal with the given mean and a long tail (sigma 0.6)
+    sigma = 0.6
+    return rng.lognormvariate(0, sigma) * mean / (2.718281828 ** (sigma * sigma / 2))
+
+
+class FakeLLMSettings:
+    def __init__(self, distribution="lognormal", mean_ms=200.0, response_chars=2000, chunk_chars=80, seed=11,
+                 invalid_rate=0.0):
+        self.distribution = distribution
+        self.mean_ms = mean_ms
+        self.response_chars = response_chars
+        self.chunk_chars = chunk_chars
+        self.invalid_rate = invalid_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def next_call(self):
+        with self.lock:
+            self.calls += 1
+            latency = sample_latency(self.rng, self.distribution, self.mean_ms)
+            size = max(64, int(self.rng.gauss(self.response_chars, self.response_chars * 0.2)))
+            broken = self.rng.random() < self.invalid_rate
+        return latency, size, broken
+
+
+# Function to answer a prompt with Java classes; a broken answer has prose before its (first) class,
+# which also misses its closing brace
+def fake_java_response(prompt, size, broken=False):
+    match = re.search(r"class named (\w+)", prompt)
+    class_name = match.group(1) if match else "Generated"
+    # Single-call prompts ask for one delimited block per layer
+    blocks = re.search(r"one block per layer, in this order: ([\w, ]+)\.", prompt)
+    if blocks:
+        layers = [layer.strip() for layer in blocks.group(1).split(",")]
+        return "\n".join(
+            f"=== FILE: {layer} ===\n{_java_class(class_name + layer, size // len(layers), broken and not index)}\n"
+            f"=== END FILE ==="
+            for index, layer in enumerate(layers)
+        )
+    return _java_class(class_name, size, broken)
+
+
+def _java_class(class_name, size, broken=False):
+    body = f"```java\npublic class {class_name} {{\n"
+    line = 0
+    while len(body) < size:
+        body += f"    private String field{line};\n"
+        line += 1
+    if broken:
+        return f"Here is the {class_name} class you asked for:\n{body}```"
+    return body + "}\n```"
+
+
+# Function to build a GoogleGenerativeAI stand-in class bound to the benchmark settings
+def make_fake_llm_class(settings):
+    class GoogleGenerativeAI:
+        def __init__(self, model=None, temperature=None, **kwargs):
+            self.model = model
+            self.temperature = temperature
+
+        def __call__(self, prompt):
+            latency, size, broken = settings.next_call()
+            time.sleep(latency)
+            return fake_java_response(prompt, size, broken)
+
+        def stream(self, prompt):
+            latency, size, broken = settings.next_call()
+            text = fake_java_response(prompt, size, broken)
+            chunks = [text[i:i + settings.chunk_chars] for i in range(0, len(text), settings.chunk_chars)]
+            # A third of the latency before the first chunk, the rest spread over the stream
+            time.sleep(latency / 3)
+            for chunk in chunks:
+                time.sleep(latency * 2 / 3 / len(chunks))
+                yield chunk
+
+        invoke = __call__
+
+    return GoogleGenerativeAI
+
+
+def _mysql_modules():
+    connector = types.ModuleType("mysql.connector")
+    errors = types.ModuleType("mysql.connector.errors")
+    pooling = types.ModuleType("mysql.connector.pooling")
+
+    class Error(Exception):
+        def __init__(self, msg=None, errno=None, **kwargs):
+            super().__init__(msg)
+            self.msg = msg
+            self.errno = errno
+
+    class PoolError(Error):
+        pass
+
+    class ProgrammingError(Error):
+        pass
+
+    class MySQLConnectionPool:
+        def __init__(self, **kwargs):
+            self.pool_size = kwargs.get("pool_size", 5)
+
+        def get_connection(self):
+            return _Connection(_active[0])
+
+    errors.Error, errors.PoolError, errors.ProgrammingError = Error, PoolError, ProgrammingError
+    connector.Error, connector.errors, connector.pooling = Error, errors, pooling
+    pooling.MySQLConnectionPool = MySQLConnectionPool
+    mysql = types.ModuleType("mysql")
+    mysql.connector = connector
+    return {"mysql": mysql, "mysql.connector": connector, "mysql.connector.errors": errors,
+            "mysql.connector.pooling": pooling}
+
+
+# Function to install the stand-ins; must run before datasource / llm_client are imported
+def install(database, llm_settings):
+    constants = types.ModuleType("constants")
+    constants.api_key = "offline-benchmark"
+    constants.spring_datasource_url = f"jdbc:mysql://localhost:3306/{DATABASE}?useSSL=false"
+    constants.spring_datasource_username = "bench"
+    constants.spring_datasource_password = "bench"
+
+    genai = types.ModuleType("langchain_google_genai")
+    genai.GoogleGenerativeAI = make_fake_llm_class(llm_settings)
+
+    _active[0] = database
+    sys.modules.update(_mysql_modules())
+    sys.modules["constants"] = constants
+    sys.modules["langchain_google_genai"] = genai
+
+
+# Function to point the installed stand-ins at another schema between benchmark runs
+def swap_database(database):
+    from schema_cache import schema_cache
+
+    _active[0] = database
+    schema_cache.clear()
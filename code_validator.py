@@ -0,0 +1,152 @@
+import os
+import re
+
+# Extra requests for a layer whose code fails validation; failing layers are re-requested on their own
+VALIDATION_RETRIES = int(os.environ.get("CRUD_VALIDATION_RETRIES", "2"))
+
+_CLOSING = {")": "(", "]": "[", "}": "{"}
+_FENCE = re.compile(r"^\s*```")
+_BLOCK_MARKER = re.compile(r"^\s*=+\s*(?:END\s+)?FILE\b", re.IGNORECASE)
+_TYPE_DECLARATION = re.compile(r"\b(?:class|interface|enum|record|struct)\s+\w+")
+
+# What a line outside every brace may start with; anything else there is prose the model left in
+_TOP_LEVEL = {
+    "java": re.compile(r"^(?:@|(?:package|import|public|protected|private|abstract|final|sealed|non-sealed|static|"
+                       r"strictfp|class|interface|enum|record)\b)"),
+    "csharp": re.compile(r"^(?:\[|#|(?:using|namespace|global|public|internal|protected|private|abstract|sealed|"
+                         r"static|partial|file|class|interface|enum|record|struct|readonly)\b)"),
+}
+
+
+class InvalidCodeError(ValueError):
+    def __init__(self, layer, problems, attempts):
+        super().__init__(f"{layer} code is still invalid after {attempts} attempts: {describe_problems(problems)}")
+        self.layer = layer
+        self.problems = problems
+
+
+# Function to pick the language the framework's code is written in
+def language_for(framework):
+    lowered = (framework or "").lower()
+    return "csharp" if ".net" in lowered or "c#" in lowered or "asp" in lowered else "java"
+
+
+def describe_problems(problems, limit=3):
+    shown = "; ".join(problems[:limit])
+    return shown + (f" (+{len(problems) - limit} more)" if len(problems) > limit else "")
+
+
+# Function to split code into lines of bare code (comments and string contents blanked out), noting the
+# brace depth each line starts at. Returns (lines, problems) where lines is [(line number, depth, code)].
+def _scan(code, language):
+    lines, problems, stack = [], [], []
+    current, line_number, line_depth = [], 1, 0
+    state, index, length = None, 0, len(code)
+    while index < length:
+        char = code[index]
+        if char == "\n":
+            lines.append((line_number, line_depth, "".join(current)))
+            current, line_number, line_depth = [], line_number + 1, len(stack)
+            if state == "line_comment" or state == "string":
+                # Ordinary string literals end with the line, so a stray quote in prose can't swallow the code
+                state = None
+            index += 1
+            continue
+        if state == "line_comment":
+            index += 1
+        elif state == "block_comment":
+            if code.startswith("*/", index):
+                state, index = None, index + 2
+            else:
+                index += 1
+        elif state == "text_block":
+            if code.startswith('"""', index):
+                state, index = None, index + 3
+            else:
+                index += 1
+        elif state == "verbatim":
+            if code.startswith('""', index):
+                index += 2
+            elif char == '"':
+                state, index = None, index + 1
+            else:
+                index += 1
+        elif state == "string":
+            if char == "\\":
+                index += 2
+            elif char == '"':
+                state, index = None, index + 1
+            else:
+                index += 1
+        elif code.startswith("//", index):
+            state, index = "line_comment", index + 2
+        elif code.startswith("/*", index):
+            state, index = "block_comment", index + 2
+        elif code.startswith('"""', index):
+            state, index = "text_block", index + 3
+            current.append('""')
+        elif language == "csharp" and (code.startswith('@"', index) or code.startswith('$@"', index)
+                                       or code.startswith('@$"', index)):
+            state, index = "verbatim", index + (2 if char == "@" and code[index + 1] == '"' else 3)
+            current.append('""')
+        elif char == '"':
+            state, index = "string", index + 1
+            current.append('""')
+        elif char == "'":
+            # A char literal is short and closes on the same line; otherwise it's an apostrophe in prose
+            match = re.match(r"'(?:\\.[^'\n]{0,5}|[^'\\\n])'", code[index:index + 9])
+            if match:
+                current.append("' '")
+                index += match.end()
+            else:
+                current.append(char)
+                index += 1
+        else:
+            if char in "([{":
+                stack.append((char, line_number))
+            elif char in _CLOSING:
+                if stack and stack[-1][0] == _CLOSING[char]:
+                    stack.pop()
+                else:
+                    problems.append(f"unbalanced '{char}' on line {line_number}")
+            current.append(char)
+            index += 1
+    lines.append((line_number, line_depth, "".join(current)))
+    if state == "block_comment":
+        problems.append("unterminated /* comment")
+    elif state in ("text_block", "verbatim"):
+        problems.append("unterminated multi-line string")
+    for opening, opened_on in stack[:3]:
+        problems.append(f"'{opening}' opened on line {opened_on} is never closed")
+    return lines, problems
+
+
+# Function to check one generated source file without compiling it. Returns a list of problems, empty when
+# the code looks usable: balanced brackets, no Markdown fences or block markers, no prose around the code.
+def check_code(code, framework="Spring Boot"):
+    if not code or not code.strip():
+        return ["the response is empty"]
+    language = language_for(framework)
+    problems = []
+    for number, line in enumerate(code.split("\n"), 1):
+        if _FENCE.match(line):
+            problems.append(f"Markdown fence on line {number}")
+        elif _BLOCK_MARKER.match(line):
+            problems.append(f"file block marker on line {number}")
+
+    lines, bracket_problems = _scan(code, language)
+    problems += bracket_problems
+    if not _TYPE_DECLARATION.search("\n".join(text for _, _, text in lines)):
+        problems.append("no class, interface, enum or record declaration")
+
+    top_level = _TOP_LEVEL[language]
+    statement_open = False
+    for number, depth, text in lines:
+        text = text.strip()
+        if not text or _FENCE.match(text) or _BLOCK_MARKER.match(text):
+            continue
+        if depth == 0 and not statement_open and not top_level.match(text) and not text.startswith("}"):
+            problems.append(f"text outside the code on line {number}: {text[:60]!r}")
+        # A declaration may continue on the next line (extends / implements / where clauses, parameters)
+        statement_open = depth == 0 and not re.search(r"[;{}\]]\s*$|^@\w+(?:\(.*\))?$", text)
+    return problems
@@ -0,0 +1,293 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from code_validator import VALIDATION_RETRIES, InvalidCodeError, check_code, describe_problems, language_for
+from fingerprints import compute_fingerprint
+from llm_cache import llm_cache, make_key, normalize_property_names
+from layer_splitter import FENCE_PATTERN, LayerStreamSplitter, block_instructions
+from llm_client import MODEL_NAME, TEMPERATURE, complete, get_llm, stream_completion
+from output_writer import BulkWriter
+from templates import TEMPLATE_VERSION, base_package, can_render, render_layer
+
+# Base directory to save generated files
+BASE_DIR = os.environ.get(
+    "CRUD_BASE_DIR", r"C:\Users\Public\Downloads\SBMS_workspace\SBMS_WORK\Report_App\src\main\java\com\ty"
+)
+
+# Layers generated for every class; they don't depend on each other
+LAYERS = ["Controller", "Service", "ServiceImplementation", "Repository", "DTO", "Entity"]
+
+# Package folder (under BASE_DIR) for each layer
+LAYER_FOLDERS = {
+    "Controller": "controller",
+    "Service": "service",
+    "ServiceImplementation": "service/impl",
+    "Repository": "repository",
+    "DTO": "dto",
+    "Entity": "entity"
+}
+
+# Layers whose prompt only needs the class name and primary key, not the full column list,
+# so adding or renaming an ordinary column doesn't make them stale
+KEY_ONLY_LAYERS = {"Controller", "Service", "Repository"}
+
+# Bump when prompts change so previously generated files are regenerated
+PROMPT_VERSION = "2"
+
+# Maximum number of layers generated at the same time
+GENERATION_CONCURRENCY = int(os.environ.get("CRUD_GENERATION_CONCURRENCY", str(len(LAYERS))))
+
+
+# Function to strip every Markdown code fence (```java, ```csharp, ```) from a response
+def remove_java_markers(code):
+    lines = [line for line in code.strip().split('\n') if not FENCE_PATTERN.match(line)]
+    return '\n'.join(lines).strip()
+
+
+# Function to describe a table's primary key for prompts, e.g. "id int"
+def describe_primary_key(table_info):
+    if table_info is None or not table_info.primary_key:
+        return None
+    return ", ".join(f"{name} {table_info.columns_by_name[name].column_type}" for name in table_info.primary_key)
+
+
+def _uses_key_only_prompt(layer, primary_key):
+    return layer in KEY_ONLY_LAYERS and primary_key is not None
+
+
+# Function to validate one layer's code, recording the outcome with the other timings
+def validate_layer(layer, code, framework):
+    with instrumentation.timed("app", "validate layer", chars=len(code)) as attributes:
+        problems = check_code(code, framework)
+        attributes["outcome"] = "failed" if problems else "passed"
+    return problems
+
+
+# Function to generate one layer with the model. Code that fails validation is re-requested (only this
+# layer, with the problems spelled out) up to `retries` times; InvalidCodeError is raised if it never passes,
+# so nothing broken reaches save_code_to_file. Only code that passed is cached.
+def generate_layer_code(layer, class_name, property_names, framework, use_cache=True, primary_key=None,
+                        session="default", retries=VALIDATION_RETRIES):
+    key_only = _uses_key_only_prompt(layer, primary_key)
+    prompt_inputs = {"primary_key": primary_key} if key_only else {"property_names": normalize_property_names(property_names)}
+    cache_key = make_key(MODEL_NAME, TEMPERATURE, "layer", prompt_version=PROMPT_VERSION, layer=layer,
+                         class_name=class_name, framework=framework, **prompt_inputs)
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        if cached is not None and not validate_layer(layer, remove_java_markers(cached), framework):
+            return remove_java_markers(cached)
+
+    if key_only:
+        prompt = f"""
+    Generate {layer} code in {framework} for a class named {class_name} whose primary key is {primary_key}. 
+    Use the {class_name}Entity and {class_name}DTO classes of the other layers; do not redeclare their fields. 
+    Provide appropriate annotations and methods for this layer. 
+    Only provide code relevant to the {layer}. Do not include code for other layers.
+    """
+    else:
+        prompt = f"""
+    Generate {layer} code in {framework} for a class named {class_name} with properties: {property_names}. 
+    Provide appropriate annotations and methods for this layer. 
+    Only provide code relevant to the {layer}. Do not include code for other layers.
+    """
+
+    code = complete(get_llm(), prompt, name=f"layer {layer}", session=session).strip()
+    problems = validate_layer(layer, remove_java_markers(code), framework)
+    for attempt in range(retries):
+        if not problems:
+            break
+        language = "C#" if language_for(framework) == "csharp" else "Java"
+        retry_prompt = (f"{prompt}\n    Your previous answer for this layer could not be used: {describe_problems(problems)}. "
+                        f"Return only the complete {language} source file, with no explanations and no Markdown fences.")
+        code = complete(get_llm(), retry_prompt, name=f"layer {layer} retry", session=session).strip()
+        problems = validate_layer(layer, remove_java_markers(code), framework)
+    if problems:
+        raise InvalidCodeError(layer, problems, retries + 1)
+
+    llm_cache.put(cache_key, code)
+    return remove_java_markers(code)
+
+
+def layer_file_path(layer, class_name, base_dir=None):
+    folder_path = os.path.join(base_dir or BASE_DIR, LAYER_FOLDERS.get(layer, ''))
+    # File name based on layer and class name
+    return os.path.join(folder_path, f"{class_name}{layer}.java")
+
+
+# Function to save one layer. With a BulkWriter the file is only staged (grouped by class) and written
+# when the writer publishes; without one it is published on its own. Identical content is never rewritten.
+def save_code_to_file(layer, class_name, code, base_dir=None, writer=None, on_publish=None):
+    file_path = layer_file_path(layer, class_name, base_dir)
+    if writer is not None:
+        writer.stage(file_path, code, group=class_name, on_publish=on_publish)
+        return file_path
+
+    writer = BulkWriter(base_dir or BASE_DIR)
+    writer.stage(file_path, code, on_publish=on_publish)
+    writer.publish()
+    return file_path
+
+
+# Function to fingerprint the inputs one layer is generated from
+def layer_fingerprint(layer, class_name, property_names, framework, table_info=None, templated=False, base_dir=None,
+                      single_call=False):
+    primary_key = describe_primary_key(table_info)
+    inputs = {
+        "prompt_version": PROMPT_VERSION,
+        "model": MODEL_NAME,
+        "layer": layer,
+        "class_name": class_name,
+        "framework": framework,
+    }
+    if templated:
+        inputs["template_version"] = TEMPLATE_VERSION
+        inputs["package"] = base_package(base_dir or BASE_DIR)
+    if single_call:
+        inputs["single_call"] = True
+    if _uses_key_only_prompt(layer, primary_key) and not single_call:
+        inputs["primary_key"] = primary_key
+    elif table_info is not None:
+        inputs["columns"] = [
+            [column.name, column.column_type, column.nullable, column.is_primary_key]
+            + ([column.extra] if templated else [])
+            for column in table_info.columns if column.name not in table_info.foreign_keys
+        ]
+        inputs["foreign_keys"] = sorted(
+            [fk.column, fk.referenced_table, fk.referenced_column] for fk in table_info.foreign_keys.values()
+        )
+    else:
+        inputs["property_names"] = normalize_property_names(property_names)
+    return compute_fingerprint(inputs)
+
+
+# Function to check whether a layer's file on disk was generated from the inputs it would be generated from now
+def layer_is_current(layer, class_name, property_names, framework, fingerprints, table_info=None, use_template=False,
+                     base_dir=None):
+    templated = use_template and table_info is not None and can_render(layer, framework, table_info)
+    fingerprint = layer_fingerprint(layer, class_name, property_names, framework, table_info, templated, base_dir)
+    return fingerprints.is_current(class_name, layer, fingerprint, layer_file_path(layer, class_name, base_dir))
+
+
+# Function to generate one layer and write it to disk; runs on a worker thread.
+# Returns (file_path, generated); with a FingerprintStore, unchanged layers are skipped (unless `regenerate`,
+# which still records the new fingerprint).
+# With use_template, boilerplate layers are rendered locally from the table's columns instead of by the model.
+def generate_and_save_layer(layer, class_name, property_names, framework, use_cache=True, base_dir=None,
+                            table_info=None, fingerprints=None, use_template=False, writer=None, session="default",
+                            regenerate=False):
+    templated = use_template and table_info is not None and can_render(layer, framework, table_info)
+    file_path = layer_file_path(layer, class_name, base_dir)
+    fingerprint = layer_fingerprint(layer, class_name, property_names, framework, table_info, templated, base_dir)
+    if fingerprints is not None and not regenerate and fingerprints.is_current(class_name, layer, fingerprint,
+                                                                              file_path):
+        return file_path, False
+
+    if templated:
+        generated_code = render_layer(layer, class_name, table_info, framework, base_dir or BASE_DIR)
+    else:
+        generated_code = generate_layer_code(layer, class_name, property_names, framework, use_cache,
+                                             describe_primary_key(table_info), session)
+    # The fingerprint is only recorded once the file is really on disk
+    on_publish = None
+    if fingerprints is not None:
+        on_publish = lambda: fingerprints.update(class_name, layer, fingerprint, file_path)
+    save_code_to_file(layer, class_name, generated_code, base_dir, writer, on_publish)
+    return file_path, True
+
+
+# Function to generate several layers with one model call. The response holds one delimited block per layer;
+# each block is validated and saved to its layer's file as soon as it is complete, and
+# `on_update(layer, code, finished)` sees every block while it streams in. A layer whose block is invalid or
+# missing is re-requested on its own in a worker pool while the rest of the response streams in.
+# Returns (generated, unchanged, failed): layer -> file path for the first two, layer -> reason for the last.
+def generate_layers_single_call(layers, class_name, property_names, framework, use_cache=True, base_dir=None,
+                                table_info=None, fingerprints=None, writer=None, session="default", on_update=None):
+    fingerprints_by_layer = {
+        layer: layer_fingerprint(layer, class_name, property_names, framework, table_info, base_dir=base_dir,
+                                 single_call=True)
+        for layer in layers
+    }
+    unchanged = {}
+    if fingerprints is not None:
+        for layer in layers:
+            file_path = layer_file_path(layer, class_name, base_dir)
+            if fingerprints.is_current(class_name, layer, fingerprints_by_layer[layer], file_path):
+                unchanged[layer] = file_path
+    layers = [layer for layer in layers if layer not in unchanged]
+    if not layers:
+        return {}, unchanged, {}
+
+    cache_key = make_key(MODEL_NAME, TEMPERATURE, "multi_file", prompt_version=PROMPT_VERSION, layers=layers,
+                         class_name=class_name, framework=framework,
+                         property_names=normalize_property_names(property_names))
+    cached = llm_cache.get(cache_key) if use_cache else None
+
+    prompt = f"""
+    Generate the {', '.join(layers)} layers in {framework} for a class named {class_name} with properties: {property_names}. 
+    Name each class {class_name} followed by its layer name, and have the layers use each other. 
+    Provide appropriate annotations and methods for each layer. 
+    {block_instructions(layers)}
+    """
+
+    splitter = LayerStreamSplitter(layers)
+    generated = {}
+    failed = {}
+    repairs = {}
+    primary_key = describe_primary_key(table_info)
+
+    def save(layer, code):
+        on_publish = None
+        if fingerprints is not None:
+            file_path = layer_file_path(layer, class_name, base_dir)
+            on_publish = (lambda layer=layer, file_path=file_path:
+                          fingerprints.update(class_name, layer, fingerprints_by_layer[layer], file_path))
+        generated[layer] = save_code_to_file(layer, class_name, code, base_dir, writer, on_publish)
+
+    # The block counts as the layer's first attempt, so a repair gets one request fewer
+    def repair(layer, reason):
+        if VALIDATION_RETRIES < 1:
+            failed[layer] = reason
+        else:
+            repairs[layer] = executor.submit(generate_layer_code, layer, class_name, property_names, framework,
+                                             use_cache, primary_key, session, VALIDATION_RETRIES - 1)
+
+    def route(updates):
+        for layer, code, finished in updates:
+            if on_update is not None:
+                on_update(layer, code, finished)
+            if finished:
+                problems = validate_layer(layer, code, framework)
+                if problems:
+                    repair(layer, describe_problems(problems))
+                else:
+                    save(layer, code)
+
+    with ThreadPoolExecutor(max_workers=GENERATION_CONCURRENCY) as executor:
+        chunks = [cached] if cached is not None else stream_completion(get_llm(), prompt, name="multi_file",
+                                                                        session=session)
+        response = []
+        for chunk in chunks:
+            response.append(chunk)
+            route(splitter.feed(chunk))
+        route(splitter.close())
+        first_pass_complete = not repairs and not failed and all(layer in generated for layer in layers)
+        for layer in layers:
+            if layer not in generated and layer not in repairs and layer not in failed:
+                repair(layer, "the response had no block for it")
+
+        for layer, future in repairs.items():
+            try:
+                save(layer, future.result())
+            except Exception as e:
+                failed[layer] = str(e)
+
+    # Only a response whose every block was usable is worth replaying
+    if cached is None and first_pass_complete:
+        llm_cache.put(cache_key, "".join(response))
+    return generated, unchanged, failed
+
+
+# Function to derive a class name from a table name, e.g. employee_details -> EmployeeDetails
+def class_name_for_table(table_name):
+    return "".join(part[:1].upper() + part[1:] for part in table_name.replace("-", "_").split("_") if part)
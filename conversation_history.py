@@ -0,0 +1,44 @@
+import os
+import time
+import zlib
+from collections import deque
+
+# Compressed bytes of generated code kept per session before the oldest entries are dropped
+HISTORY_MAX_BYTES = int(os.environ.get("CRUD_HISTORY_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# Entries listed per page of the history browser
+HISTORY_PAGE_SIZE = 10
+
+
+# Per-session history of generated answers, stored zlib-compressed and capped by total size
+class ConversationHistory:
+    def __init__(self, max_bytes=HISTORY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.dropped = 0
+        self._entries = deque()   # (title, created_at, compressed text), oldest first
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, title, text):
+        compressed = zlib.compress(text.encode("utf-8"))
+        self._entries.append((title, time.time(), compressed))
+        self.total_bytes += len(compressed)
+        # Always keep the newest entry, even if it alone exceeds the cap
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, _, oldest = self._entries.popleft()
+            self.total_bytes -= len(oldest)
+            self.dropped += 1
+
+    # Function to list one page of entries, newest first, as (index, title, created_at)
+    def page(self, page_number, page_size=HISTORY_PAGE_SIZE):
+        newest_first = range(len(self._entries) - 1, -1, -1)
+        indexes = newest_first[page_number * page_size:(page_number + 1) * page_size]
+        return [(index, self._entries[index][0], self._entries[index][1]) for index in indexes]
+
+    def page_count(self, page_size=HISTORY_PAGE_SIZE):
+        return max(1, -(-len(self._entries) // page_size))
+
+    def get_text(self, index):
+        return zlib.decompress(self._entries[index][2]).decode("utf-8")
@@ -1,110 +1,116 @@
-import os
+from startup_timer import start_run_timer
+
+# Started before the heavy imports so the measurement covers them
+run_timer = start_run_timer("crud_app_final_v10.3")
+
 import time
-import mysql.connector
-from constants import api_key, spring_datasource_url, spring_datasource_username, spring_datasource_password
-from langchain_google_genai import GoogleGenerativeAI
+import uuid
+import datasource
+import instrumentation
+from conversation_history import ConversationHistory
+from crud_generation import stream_crud_code
+from codegen import LAYER_FOLDERS, LAYERS
+from layer_splitter import LayerStreamSplitter
+from llm_cache import llm_cache
+from llm_scheduler import SchedulerBusy, scheduler
+from prefetch import PREFETCH_FRAMEWORK, prefetcher
+from schema_model import get_table_info, get_table_names
+from schema_sources import SchemaSourceError, describe_source
+from table_index import table_picker
 import streamlit as st
 
-# Set up Google API Key
-os.environ["GOOGLE_API_KEY"] = api_key
-
-# Initialize Generative AI Model
-llm = GoogleGenerativeAI(model="gemini-pro", temperature=0.8)
-
-def generate_crud_code(property_names, framework):
-    prompt = f"""
-    Generate CRUD operations controller, service and it implemented class, repository, DTO, and model layer,provide field level 
-    annotation in framework: {framework}, 
-    for a class with properties: {property_names}. 
-    Ensure that the controller methods use ResponseEntity to handle HTTP status codes appropriately.
-    """
-
-    response = llm(prompt)
-    
-    # Check if the response is in a format that contains the generated text
-    if isinstance(response, dict) and 'text' in response:
-        return response['text'].strip()
-    elif isinstance(response, str):
-        return response.strip()
-    else:
-        raise ValueError("Unexpected response format from the generative model")
+# Function to show a per-layer answer with one tab per layer, filling each tab as its block streams in
+def show_layer_blocks(chunks):
+    tabs = dict(zip(LAYERS, st.tabs(LAYERS)))
+    previews = {layer: tabs[layer].empty() for layer in LAYERS}
+    splitter = LayerStreamSplitter(LAYERS)
+    response = []
+    for chunk in chunks:
+        response.append(chunk)
+        for layer, code, _ in splitter.feed(chunk):
+            previews[layer].code(code)
+    for layer, code, _ in splitter.close():
+        previews[layer].code(code)
+    for layer in LAYERS:
+        if layer in splitter.files:
+            tabs[layer].caption(f"📁 {LAYER_FOLDERS[layer]}/")
+        else:
+            previews[layer].warning(f"The response had no block for {layer}.")
+    return "".join(response).strip()
 
 def fetch_table_columns(table):
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-    
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-
-    # Get all columns
-    cursor.execute(f"DESCRIBE {table}")
-    all_columns = cursor.fetchall()
-
-    # Fetch foreign key columns
-    cursor.execute(f"""
-        SELECT COLUMN_NAME
-        FROM information_schema.KEY_COLUMN_USAGE
-        WHERE TABLE_NAME = '{table}' 
-        AND TABLE_SCHEMA = '{database}'
-        AND REFERENCED_COLUMN_NAME IS NOT NULL;
-    """)
-    fk_columns = [column[0] for column in cursor.fetchall()]
-
-    # Exclude foreign key columns
-    non_fk_columns = [column[0] for column in all_columns if column[0] not in fk_columns]
-
-    cursor.close()
-    connection.close()
-    
-    return non_fk_columns
+    return get_table_info(table).non_fk_columns
 
 def fetch_table_list():
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-    
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-    cursor.execute("SHOW TABLES")
-    tables = [table[0] for table in cursor.fetchall()]
-    cursor.close()
-    connection.close()
-    return tables
-
-def stream_data(data):
-    for word in data.split(" "):
-        time.sleep(0.01)
-        yield word + " "
+    return get_table_names()
+
+# Function to browse earlier answers one page at a time; only the chosen entry is decompressed and rendered
+def show_history(history):
+    with st.expander(f"🕘 Earlier answers ({len(history)})"):
+        page_number = 0
+        page_count = history.page_count()
+        # The byte cap can drop entries between reruns, so keep the remembered page within range
+        if "history_page" in st.session_state:
+            st.session_state["history_page"] = min(st.session_state["history_page"], page_count)
+        if page_count > 1:
+            page_number = st.number_input("Page", min_value=1, max_value=page_count, key="history_page") - 1
+        entries = history.page(page_number)
+        labels = {index: f"{title} · {time.strftime('%H:%M:%S', time.localtime(created_at))}"
+                  for index, title, created_at in entries}
+        selected = st.selectbox("Answer", list(labels), format_func=labels.get, key="history_entry")
+        if selected is not None:
+            with st.chat_message(name="Agent", avatar="🤖"):
+                st.write(history.get_text(selected))
+        if history.dropped:
+            st.caption(f"{history.dropped} older answers were dropped to stay within the history size limit.")
 
 # Streamlit app setup
 st.title("🛠️𝐂𝐑𝐔𝐃 𝐎𝐩𝐞𝐫𝐚𝐭𝐢𝐨𝐧 𝐂𝐨𝐝𝐞 𝐆𝐞𝐧𝐞𝐫𝐚𝐭𝐨𝐫✍")
+run_timer.mark("first_paint")
+
+# Identifies this browser session to the shared model scheduler
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
 
 st.write("➡️ Select a table to fetch columns and generate CRUD operations.")
 
+# Untick to ask the model for a fresh sample instead of a cached response
+use_cache = st.sidebar.checkbox("♻️ Reuse cached responses", value=True)
+cache_stats = llm_cache.get_stats()
+st.sidebar.caption(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+
+# Split the answer into one block per layer, shown in its own tab
+per_layer = st.sidebar.checkbox("🗂️ One block per layer", value=False)
+
 # Option to fetch columns from the selected table
-tables = fetch_table_list()
-selected_table = st.selectbox("📊 Select Table", tables)
+# Without a reachable database the app still starts; CRUD_SCHEMA_SOURCE can point at a DDL dump or JSON snapshot
+st.sidebar.caption(f"🗄️ Schema: {describe_source()}")
+try:
+    tables = fetch_table_list()
+except (datasource.Error, SchemaSourceError) as e:
+    st.error(f"⚠️ Couldn't read the table list: {e}")
+    tables = []
+# Search-as-you-type: only one page of matching tables is rendered, however large the schema
+selected_table = table_picker(st, "📊 Select Table", tables, key="selected_table")
+
+# The selection starts loading its columns right away. With CRUD_PREFETCH_WARM=1 the default framework's answer
+# is cached too; it's the same prompt as the Generate button, so a Generate while it's in flight joins that call.
+def warm_answer(table_info, session=st.session_state['session_id'], per_layer=per_layer):
+    "".join(stream_crud_code(",".join(table_info.non_fk_columns), PREFETCH_FRAMEWORK, True, session, per_layer))
+
+prefetcher.prefetch(st.session_state['session_id'], selected_table, warm=warm_answer if use_cache else None)
 
 if st.button("🔍 Fetch Columns", key="fetch_columns_button"):
     if selected_table:
         with st.spinner("Fetching table columns..."):
             try: 
+                prefetcher.wait(st.session_state['session_id'], selected_table)
                 columns = fetch_table_columns(selected_table)
                 property_names = ",".join(columns)
                 st.session_state['property_names'] = property_names
+                st.session_state['table_name'] = selected_table
                 st.write(f"Fetched columns: {property_names}")
-            except mysql.connector.Error as e:
+            except (datasource.Error, SchemaSourceError) as e:
                 st.error(f"⚠️ Error: {e}")
     else:
         st.error("Please select a table.")
@@ -124,30 +130,36 @@ if 'property_names' in st.session_state:
         options=["Spring Boot", ".NET Core"]
     )
 
+    if 'conversation_history' not in st.session_state:
+        st.session_state['conversation_history'] = ConversationHistory()
+    history = st.session_state['conversation_history']
+
+    # Earlier answers are collapsed; rendering them costs the same however long the session gets
+    if len(history):
+        show_history(history)
+
     if st.button("⚙️ Generate Code", key="generate_code_button"):
         with st.spinner(f"🛠️ Generating {framework} CRUD operations..."):
             try:
-                generated_code = generate_crud_code(property_names, framework)
-                last_output = generated_code
-                len_stor = len(st.session_state.get('conversation_history', []))
+                # Stream the new answer token by token
+                with st.chat_message(name="Agent", avatar="🤖"):
+                    chunks = stream_crud_code(property_names, framework, use_cache, st.session_state['session_id'],
+                                              per_layer)
+                    generated_code = show_layer_blocks(chunks) if per_layer else st.write_stream(chunks)
 
                 # Update conversation history
-                if 'conversation_history' not in st.session_state:
-                    st.session_state['conversation_history'] = []
-                st.session_state['conversation_history'].append(f"{framework} CRUD Operation Code:\n{generated_code}")
-
-                if len_stor == 0:
-                    with st.chat_message(name="Agent", avatar="🤖"):
-                        st.write_stream(stream_data(last_output))
-
-                elif len_stor > 0:
-                    for i in range(0, len_stor):
-                        with st.chat_message(name="Agent", avatar="🤖"):
-                            st.write(st.session_state['conversation_history'][i])
-                    
-                    with st.chat_message(name="Agent", avatar="🤖"):
-                        st.write_stream(stream_data(last_output))
-            except ValueError as e:
+                title = f"{framework} CRUD Operation Code for {st.session_state.get('table_name', 'table')}"
+                history.add(title, generated_code)
+            except (ValueError, SchedulerBusy) as e:
                 st.error(f"⚠️ Error: {e}")
 else:
     st.info("Please fetch table columns or enter property names first.")
+
+# Startup / rerun timing, also appended to the startup log for tracking
+run_stats = run_timer.finish()
+st.sidebar.caption(f"⏱️ {run_stats['kind'].replace('_', ' ')}: first paint {run_stats['first_paint_ms']} ms, "
+                   f"full run {run_stats['run_ms']} ms")
+
+# Per-call latency of LLM calls, DB queries and file writes
+instrumentation.render_debug_panel(st.sidebar, {"DB pool": datasource.get_pool_stats(), "LLM scheduler": scheduler.get_stats(),
+                                              "Prefetch": prefetcher.get_stats()})
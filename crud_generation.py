@@ -0,0 +1,159 @@
+import queue
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from codegen import GENERATION_CONCURRENCY, LAYERS, class_name_for_table
+from generation_plan import plan_generation_levels, split_relationship_key, table_dependencies
+from layer_splitter import block_instructions
+from llm_cache import llm_cache, make_key, normalize_property_names
+from llm_client import MODEL_NAME, TEMPERATURE, get_llm, stream_completion
+from schema_model import get_fk_graph, get_table_info
+
+# Seconds between preview refreshes while tables stream in
+STREAM_REFRESH_SECONDS = 0.1
+
+INVERSE_RELATIONSHIPS = {"OneToMany": "ManyToOne", "ManyToOne": "OneToMany"}
+
+
+# Function to stream CRUD code for a class as the model produces it (v10.3); a cached response is yielded in
+# one piece. With per_layer the model is asked for one delimited block per layer.
+def stream_crud_code(property_names, framework, use_cache=True, session="default", per_layer=False):
+    cache_key = make_key(MODEL_NAME, TEMPERATURE, "crud_per_layer" if per_layer else "crud", framework=framework,
+                         property_names=normalize_property_names(property_names))
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    prompt = f"""
+    Generate CRUD operations controller, service and it implemented class, repository, DTO, and model layer,provide field level 
+    annotation in framework: {framework}, 
+    for a class with properties: {property_names}. 
+    Ensure that the controller methods use ResponseEntity to handle HTTP status codes appropriately.
+    """
+    if per_layer:
+        prompt += block_instructions(LAYERS)
+
+    chunks = []
+    for chunk in stream_completion(get_llm(), prompt, name="crud", session=session):
+        chunks.append(chunk)
+        yield chunk
+
+    llm_cache.put(cache_key, "".join(chunks).strip())
+
+
+def generate_crud_code(property_names, framework, use_cache=True, session="default"):
+    return "".join(stream_crud_code(property_names, framework, use_cache, session)).strip()
+
+
+# Function to stream CRUD code for a table with relationships as the model produces it (v6.3)
+def stream_related_crud_code(property_names, framework, relationships, relationship_direction, use_cache=True,
+                             existing_entities=(), session="default"):
+    cache_key = make_key(MODEL_NAME, TEMPERATURE, "crud_with_relationships", framework=framework,
+                         property_names=normalize_property_names(property_names),
+                         relationships=relationships or {}, relationship_direction=relationship_direction,
+                         existing_entities=list(existing_entities))
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    relationship_info = f" It has {relationship_direction} relationships with other tables: {relationships}." if relationships else ""
+    entity_info = f" The entity classes {', '.join(existing_entities)} already exist; reference them by name and do not redefine them." if existing_entities else ""
+
+    prompt = f"""
+    Generate CRUD operations controller, service and its implemented class, repository, DTO, and model layer provide field level 
+    annotation in framework: {framework}, for a class with properties: {property_names}.{relationship_info}{entity_info} 
+    Ensure that the controller methods use ResponseEntity to handle HTTP status codes appropriately.
+    """
+
+    chunks = []
+    for chunk in stream_completion(get_llm(), prompt, name="crud_with_relationships", session=session):
+        chunks.append(chunk)
+        yield chunk
+
+    llm_cache.put(cache_key, "".join(chunks).strip())
+
+
+# Function to generate CRUD code for a table with relationships; `on_chunk(code so far)` sees it stream in
+def generate_related_crud_code(property_names, framework, relationships, relationship_direction, use_cache=True,
+                               existing_entities=(), session="default", on_chunk=None):
+    code = ""
+    for chunk in stream_related_crud_code(property_names, framework, relationships, relationship_direction, use_cache,
+                                          existing_entities, session):
+        code += chunk
+        if on_chunk is not None:
+            on_chunk(code)
+    return code.strip()
+
+
+# Function to collect one table's relationships for its prompt: those detected from foreign keys
+# (other table -> "Kind via ..."), overridden by the relationships defined in the UI
+# ("{table1}-{table2}" -> (type, direction); `tables` are the names a key may contain)
+def table_relationships(table, detected_relationships, manual_relationships, tables):
+    relationships = dict(detected_relationships)
+    directions = set()
+    for key, (relationship_type, direction) in manual_relationships.items():
+        pair = split_relationship_key(key, tables)
+        if pair is None or table not in pair or relationship_type == "-select-":
+            continue
+        if pair[0] == table:
+            relationships[pair[1]] = relationship_type
+        else:
+            # Seen from the second table, OneToMany reads as ManyToOne and vice versa
+            relationships[pair[0]] = INVERSE_RELATIONSHIPS.get(relationship_type, relationship_type)
+        if direction != "-Select-":
+            directions.add(direction)
+    return relationships, "/".join(sorted(directions))
+
+
+# Function to generate related tables in dependency order: referenced tables first, the tables of one level
+# concurrently. Yields ("streaming", table, code so far), ("generated", table, code) and ("failed", table, error)
+# from the calling thread, so a Streamlit script can render them; schema errors are raised before anything runs.
+def generate_related_tables(selected_tables, manual_relationships, tables, framework, use_cache=True,
+                            session="default"):
+    property_names, fk_relationships = {}, {}
+    fk_graph = get_fk_graph()
+    for table in selected_tables:
+        property_names[table] = ",".join(get_table_info(table).non_fk_columns)
+        fk_relationships[table] = fk_graph.references(table)
+    dependencies = table_dependencies(selected_tables, fk_relationships, manual_relationships)
+
+    generated = set()
+    for level in plan_generation_levels(dependencies):
+        updates = queue.Queue()
+        with ThreadPoolExecutor(max_workers=GENERATION_CONCURRENCY) as executor:
+            futures = {}
+            for table in level:
+                detected_relationships = fk_graph.describe_relationships(table, set(selected_tables))
+                relationships, direction = table_relationships(table, detected_relationships, manual_relationships,
+                                                               tables)
+                # Entities generated in an earlier level are referenced by name instead of described again
+                existing_entities = [class_name_for_table(other) for other in sorted(dependencies[table]) if other in generated]
+                future = executor.submit(generate_related_crud_code, property_names[table], framework, relationships,
+                                         direction, use_cache, existing_entities, session,
+                                         lambda code, table=table: updates.put((table, code)))
+                futures[future] = table
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=STREAM_REFRESH_SECONDS, return_when=FIRST_COMPLETED)
+                # Only the latest text of each table is shown; a finished table's chunks are all queued by now
+                latest = {}
+                while True:
+                    try:
+                        table, code = updates.get_nowait()
+                    except queue.Empty:
+                        break
+                    latest[table] = code
+                for table, code in latest.items():
+                    yield "streaming", table, code
+                for future in done:
+                    table = futures[future]
+                    try:
+                        code = future.result()
+                        generated.add(table)
+                        yield "generated", table, code
+                    except Exception as e:
+                        yield "failed", table, e
@@ -1,145 +1,139 @@
-import os
-import time
-import mysql.connector
-from constants import api_key, spring_datasource_url, spring_datasource_username, spring_datasource_password
-from langchain_google_genai import GoogleGenerativeAI
+from startup_timer import start_run_timer
+
+# Started before the heavy imports so the measurement covers them
+run_timer = start_run_timer("crud_operation_generator_final_v24.2")
+
+import uuid
+import datasource
+import instrumentation
+from codegen import LAYERS
+from generation_jobs import table_payload
+from job_queue import ACTIVE_STATUSES, AUTOSTART_WORKERS, JOB_POLL_SECONDS, ensure_workers, job_queue
+from llm_cache import llm_cache
+from llm_scheduler import scheduler
+from prefetch import prefetcher
+from templates import TEMPLATE_LAYERS
+from schema_model import get_table_info, get_table_names
+from schema_sources import SchemaSourceError, describe_source
+from table_index import table_picker
 import streamlit as st
 
-# Set up Google API Key
-os.environ["GOOGLE_API_KEY"] = api_key
-
-# Initialize Generative AI Model
-llm = GoogleGenerativeAI(model="gemini-pro", temperature=0.8)
-
-# Base directory to save generated files
-BASE_DIR = r"C:\Users\Public\Downloads\SBMS_workspace\SBMS_WORK\Report_App\src\main\java\com\ty"
-
-def remove_java_markers(code):
-    lines = code.strip().split('\n')
-    if lines and lines[0].startswith('```java'):
-        lines.pop(0)
-    if lines and lines[-1] == '```':
-        lines.pop()
-    return '\n'.join(lines)
-
-def generate_layer_code(layer, class_name, property_names, framework):
-    prompt = f"""
-    Generate {layer} code in {framework} for a class named {class_name} with properties: {property_names}. 
-    Provide appropriate annotations and methods for this layer. 
-    Only provide code relevant to the {layer}. Do not include code for other layers.
-    """
-    
-    response = llm(prompt)
-    
-    if isinstance(response, dict) and 'text' in response:
-        code = response['text'].strip()
-    elif isinstance(response, str):
-        code = response.strip()
-    else:
-        raise ValueError("Unexpected response format from the generative model")
-    
-    return remove_java_markers(code)  
-        
-
 def fetch_table_columns(table):
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-    
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-
-    # Get all columns
-    cursor.execute(f"DESCRIBE {table}")
-    all_columns = cursor.fetchall()
-
-    # Fetch foreign key columns
-    cursor.execute(f"""
-        SELECT COLUMN_NAME
-        FROM information_schema.KEY_COLUMN_USAGE
-        WHERE TABLE_NAME = '{table}' 
-        AND TABLE_SCHEMA = '{database}'
-        AND REFERENCED_COLUMN_NAME IS NOT NULL;
-    """)
-    fk_columns = [column[0] for column in cursor.fetchall()]
-
-    # Exclude foreign key columns
-    non_fk_columns = [column[0] for column in all_columns if column[0] not in fk_columns]
-
-    cursor.close()
-    connection.close()
-    
-    return non_fk_columns
+    return get_table_info(table).non_fk_columns
 
 def fetch_table_list():
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-    
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-    cursor.execute("SHOW TABLES")
-    tables = [table[0] for table in cursor.fetchall()]
-    cursor.close()
-    connection.close()
-    return tables
-
-def stream_data(data):
-    for word in data.split(" "):
-        time.sleep(0.01)
-        yield word + " "
-
-def save_code_to_file(layer, class_name, code):
-    layer_map = {
-        "Controller": "controller",
-        "Service": "service",
-        "ServiceImplementation": "service/impl",
-        "Repository": "repository",
-        "DTO": "dto",
-        "Entity": "entity"
-    }
-    
-    # Create the folder if it doesn't exist
-    folder_path = os.path.join(BASE_DIR, layer_map.get(layer, ''))
-    os.makedirs(folder_path, exist_ok=True)
-
-    # File name based on layer and class name
-    file_name = f"{class_name}{layer}.java"
-    file_path = os.path.join(folder_path, file_name)
-
-    with open(file_path, "w") as f:
-        f.write(code)
-
-    return file_path
+    return get_table_names()
+
+# Function to show a generation job's state: queue position, per-layer progress, then the outcome.
+# Returns whether the job is still queued or running.
+def show_layer_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        st.warning(f"⚠️ No generation job {job_id}; finished jobs are only kept for a while.")
+        return False
+    layers = (job['result'] or job['progress'] or {}).get('layers', {})
+    st.caption(f"🧾 Job {job_id} ({job['payload']['framework']}, class {job['payload']['class_name']})")
+
+    if job['status'] == 'queued':
+        st.info(f"⏳ Waiting for a worker, {job_queue.position(job_id)} jobs ahead")
+        if st.button("✖️ Cancel", key=f"cancel_job_{job_id}") and job_queue.cancel(job_id):
+            st.rerun()
+    elif job['status'] == 'running':
+        finished = sum(1 for state in layers.values() if state['status'] != 'running')
+        st.progress(finished / len(LAYERS), text=f"🛠️ Generating {job['payload']['framework']} CRUD operations... "
+                                                 f"{finished}/{len(LAYERS)} layers")
+
+    for layer, state in layers.items():
+        if state['status'] == 'generated':
+            st.success(f"✅{layer} code generated for {state['path']}")
+        elif state['status'] == 'unchanged':
+            st.info(f"⏭️{layer} unchanged since the last run: {state['path']}")
+        elif state['status'] == 'failed':
+            st.error(f"⚠️ Error generating {layer}: {state['error']}")
+        elif state.get('preview'):
+            # Single-call blocks stream into the job's progress while the response arrives
+            st.caption(f"✍️ {layer}")
+            st.code(state['preview'])
+
+    if job['status'] == 'done':
+        result = job['result']
+        if result['publish_error']:
+            st.error(f"⚠️ Error saving the generated files, none were replaced: {result['publish_error']}")
+        else:
+            st.success(f"💾 {len(result['written'])} files written, {len(result['unchanged'])} already up to date")
+    elif job['status'] == 'failed':
+        st.error(f"⚠️ Generation job failed: {job['error']}")
+    elif job['status'] == 'cancelled':
+        st.info("Generation job cancelled.")
+    return job['status'] in ACTIVE_STATUSES
+
+# Re-runs on its own every poll interval while the job is active, then reruns the page once it's finished
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_layer_job(job_id):
+    if not show_layer_job(job_id):
+        st.rerun()
 
 # Streamlit app setup
 st.title("🛠️ ᴄʀᴜᴅ ᴏᴘᴇʀᴀᴛɪᴏɴ ᴄᴏᴅᴇ ɢᴇɴᴇʀᴀᴛᴏʀ ᴡɪᴛʜ ᴄᴜꜱᴛᴏᴍ ᴘᴀᴛʜ ꜱᴀᴠɪɴɢ")
+run_timer.mark("first_paint")
+
+# Identifies this browser session to the shared model scheduler
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
 
 st.write("You can select a table to fetch columns to generate CRUD operations.")
 
+# Untick to ask the model for a fresh sample instead of a cached response
+use_cache = st.sidebar.checkbox("♻️ Reuse cached responses", value=True)
+cache_stats = llm_cache.get_stats()
+st.sidebar.caption(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+
+# Layers whose columns, framework and prompt haven't changed since the last run are skipped
+regenerate_unchanged = st.sidebar.checkbox("🔁 Regenerate unchanged layers", value=False)
+
+# Boilerplate layers are rendered from local templates unless switched to the model
+st.sidebar.write("🧩 Layer generator")
+template_layers = {
+    layer for layer in TEMPLATE_LAYERS
+    if st.sidebar.radio(layer, ["Template", "LLM"], horizontal=True, key=f"generator_{layer}") == "Template"
+}
+
+# Ask for all model-generated layers in one response instead of one call per layer
+single_call = st.sidebar.checkbox("📦 One model call for all layers", value=False)
+
+# Generation runs on the job queue's workers; a job id in the URL or pasted here reopens its results
+if 'layer_job' not in st.session_state and st.query_params.get("job"):
+    st.session_state['layer_job'] = st.query_params["job"]
+opened_job = st.sidebar.text_input("🧾 Open job by id", key="open_job_id").strip()
+if opened_job and opened_job != st.session_state.get('opened_job'):
+    st.session_state['opened_job'] = opened_job
+    st.session_state['layer_job'] = opened_job
+    st.query_params["job"] = opened_job
+
 # Option to fetch columns from the selected table
-tables = fetch_table_list()
-selected_table = st.selectbox("🔍 Select Table", tables)
+# Without a reachable database the app still starts; CRUD_SCHEMA_SOURCE can point at a DDL dump or JSON snapshot
+st.sidebar.caption(f"🗄️ Schema: {describe_source()}")
+try:
+    tables = fetch_table_list()
+except (datasource.Error, SchemaSourceError) as e:
+    st.error(f"⚠️ Couldn't read the table list: {e}")
+    tables = []
+# Search-as-you-type: only one page of matching tables is rendered, however large the schema
+selected_table = table_picker(st, "🔍 Select Table", tables, key="selected_table")
+# The selection starts loading its columns right away, so Fetch Columns reads them from the schema cache
+prefetcher.prefetch(st.session_state['session_id'], selected_table)
 
 if st.button("📊 Fetch Columns", key="fetch_columns_button"):
     if selected_table:
         with st.spinner("Fetching table columns..."):
             try: 
+                prefetcher.wait(st.session_state['session_id'], selected_table)
                 columns = fetch_table_columns(selected_table)
                 property_names = ",".join(columns)
                 st.session_state['property_names'] = property_names
+                st.session_state['table_name'] = selected_table
                 st.write(f"Fetched columns: {property_names}")
-            except mysql.connector.Error as e:
+            except (datasource.Error, SchemaSourceError) as e:
                 st.error(f"⚠️ Error: {e}")
     else:
         st.error("⚠️ Please select a table.")
@@ -157,15 +151,46 @@ if 'property_names' in st.session_state:
     )
 
     if class_name and st.button("⚙️ Generate Code", key="generate_code_button"):
-        with st.spinner(f"🛠️ Generating {framework} CRUD operations..."):
-            try:
-                # Generate and save code for each layer
-                for layer in ["Controller", "Service", "ServiceImplementation", "Repository", "DTO", "Entity"]:
-                    generated_code = generate_layer_code(layer, class_name, property_names, framework)
-                    file_path = save_code_to_file(layer, class_name, generated_code)
-                    st.success(f"✅{layer} code saved at {file_path}")
-
-            except ValueError as e:
-                st.error(f"⚠️ Error: {e}")
+        try:
+            table_info = get_table_info(st.session_state['table_name']) if 'table_name' in st.session_state else None
+        except (datasource.Error, SchemaSourceError) as e:
+            st.error(f"⚠️ Error: {e}")
+        else:
+            payload = {
+                "class_name": class_name,
+                "property_names": property_names,
+                "framework": framework,
+                "table_name": st.session_state.get('table_name'),
+                # The worker generates from this snapshot, not from its own (possibly stale) schema cache
+                "table": table_payload(table_info) if table_info is not None else None,
+                "use_cache": use_cache,
+                "template_layers": sorted(template_layers),
+                "regenerate_unchanged": regenerate_unchanged,
+                "single_call": single_call,
+                "session": st.session_state['session_id'],
+            }
+            ensure_workers()
+            job_id = job_queue.submit("layers", payload, st.session_state['session_id'])
+            st.session_state['layer_job'] = job_id
+            st.query_params["job"] = job_id
+            if not AUTOSTART_WORKERS and not job_queue.live_workers():
+                st.warning("⚠️ No job workers are running; start them with `python job_queue.py worker`.")
 else:
     st.info("Please fetch table columns or enter property names and class name first.")
+
+# Progress and results of the latest generation job; they survive reruns, refreshes and disconnects
+if 'layer_job' in st.session_state:
+    layer_job = job_queue.get(st.session_state['layer_job'])
+    if layer_job is not None and layer_job['status'] in ACTIVE_STATUSES:
+        poll_layer_job(st.session_state['layer_job'])
+    else:
+        show_layer_job(st.session_state['layer_job'])
+
+# Startup / rerun timing, also appended to the startup log for tracking
+run_stats = run_timer.finish()
+st.sidebar.caption(f"⏱️ {run_stats['kind'].replace('_', ' ')}: first paint {run_stats['first_paint_ms']} ms, "
+                   f"full run {run_stats['run_ms']} ms")
+
+# Per-call latency of LLM calls, DB queries and file writes
+instrumentation.render_debug_panel(st.sidebar, {"DB pool": datasource.get_pool_stats(), "LLM scheduler": scheduler.get_stats(),
+                                              "Job queue": job_queue.get_stats(), "Prefetch": prefetcher.get_stats()})
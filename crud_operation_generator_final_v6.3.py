@@ -1,229 +1,112 @@
-import os
-import time
-import mysql.connector
-from constants import api_key, spring_datasource_url, spring_datasource_username, spring_datasource_password
-from langchain_google_genai import GoogleGenerativeAI
+from startup_timer import start_run_timer
+
+# Started before the heavy imports so the measurement covers them
+run_timer = start_run_timer("crud_operation_generator_final_v6.3")
+
+import uuid
+import datasource
+import instrumentation
+from crud_generation import generate_related_tables
+from llm_cache import llm_cache
+from llm_scheduler import scheduler
+from datasource import get_cursor
+from online_ddl import (RENAME_COLUMN_UNSUPPORTED_ERRNO, DDLRefused, execute_online_alter, plan_algorithm,
+                        rename_clauses_as_change)
+from prefetch import prefetcher
+from schema_cache import schema_cache
+from schema_model import get_fk_graph, get_table_names
+from schema_sources import SchemaSourceError, describe_source
+from table_index import table_picker
 import streamlit as st
 
-# Set up Google API Key
-os.environ["GOOGLE_API_KEY"] = api_key
-
-# Initialize Generative AI Model
-llm = GoogleGenerativeAI(model="gemini-pro", temperature=0.8)
-
 # Function to fetch existing tables from the database
 def fetch_existing_tables():
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-    
-    cursor.execute("SHOW TABLES")
-    tables = [table[0] for table in cursor.fetchall()]
-    
-    cursor.close()
-    connection.close()
-    
-    return tables
+    return get_table_names()
 
 # Function to create a table in the database
 def create_table_in_db(table_name, columns):
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-
-    # Create table SQL command
-    create_table_sql = f"CREATE TABLE {table_name} ({', '.join(columns)});"
-    cursor.execute(create_table_sql)
-    connection.commit()
-
-    cursor.close()
-    connection.close()
+    with get_cursor(commit=True) as cursor:
+        # Create table SQL command
+        create_table_sql = f"CREATE TABLE {table_name} ({', '.join(columns)});"
+        cursor.execute(create_table_sql)
+    schema_cache.invalidate_table(table_name, table_list=True)
 
     st.success(f"Table '{table_name}' created successfully in the database.")
 
-# Function to generate CRUD code
-def generate_crud_code(property_names, framework, relationships, relationship_direction):
-    relationship_info = f" It has {relationship_direction} relationships with other tables: {relationships}." if relationships else ""
-    
-    prompt = f"""
-    Generate CRUD operations controller, service and its implemented class, repository, DTO, and model layer provide field level 
-    annotation in framework: {framework}, for a class with properties: {property_names}.{relationship_info} 
-    Ensure that the controller methods use ResponseEntity to handle HTTP status codes appropriately.
-    """
-
-    response = llm(prompt)
-    
-    if isinstance(response, dict) and 'text' in response:
-        return response['text'].strip()
-    elif isinstance(response, str):
-        return response.strip()
-    else:
-        raise ValueError("Unexpected response format from the generative model")
-
-# Function to fetch table columns excluding foreign keys
-def fetch_table_columns(table):
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-    
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-
-    # Get all columns
-    cursor.execute(f"DESCRIBE {table}")
-    all_columns = cursor.fetchall()
-
-    # Fetch foreign key columns
-    cursor.execute(f"""
-        SELECT COLUMN_NAME, REFERENCED_TABLE_NAME
-        FROM information_schema.KEY_COLUMN_USAGE
-        WHERE TABLE_NAME = '{table}' 
-        AND TABLE_SCHEMA = '{database}'
-        AND REFERENCED_COLUMN_NAME IS NOT NULL;
-    """)
-    fk_columns = cursor.fetchall()
-
-    # Exclude foreign key columns and extract relationship info
-    non_fk_columns = [column[0] for column in all_columns if column[0] not in [fk[0] for fk in fk_columns]]
-    relationships = {fk[0]: fk[1] for fk in fk_columns}
-
-    cursor.close()
-    connection.close()
-    
-    return non_fk_columns, relationships
+# ALTER TABLE clauses for single column changes; several of them can share one statement
+def add_column_clause(column_name, datatype):
+    # if is_primary:
+    #     add_column_sql += " PRIMARY KEY"
+    # if is_foreign:
+    #     referenced_table = st.text_input("Referenced Table")
+    #     referenced_column = st.text_input("Referenced Column")
+    #     add_column_sql += f" REFERENCES {referenced_table}({referenced_column})"
+    return f"ADD {column_name} {datatype}"
+
+def drop_column_clause(column_name):
+    return f"DROP COLUMN {column_name}"
+
+# RENAME COLUMN keeps the column's type and attributes, so a rename never turns into a copying type change
+def rename_column_clause(old_column_name, new_column_name):
+    return f"RENAME COLUMN {old_column_name} TO {new_column_name}"
+
+def build_alter_statement(table_name, clauses):
+    return f"ALTER TABLE {table_name} {', '.join(clauses)};"
+
+def _execute_alter(cursor, table_name, clauses, online, plan=None):
+    if online:
+        return execute_online_alter(cursor, table_name, clauses, plan)
+    cursor.execute(build_alter_statement(table_name, clauses))
+    return "default algorithm", []
+
+# Function to apply several column changes in one ALTER TABLE, so the table is rebuilt once instead of per change.
+# In online mode it asks for ALGORITHM=INSTANT / INPLACE with LOCK=NONE and refuses to copy large tables.
+def alter_table(table_name, clauses, online=True):
+    with get_cursor(commit=True) as cursor:
+        try:
+            algorithm, warnings = _execute_alter(cursor, table_name, clauses, online)
+        except datasource.Error as e:
+            if getattr(e, "errno", None) != RENAME_COLUMN_UNSUPPORTED_ERRNO or \
+                    not any(clause.startswith("RENAME COLUMN ") for clause in clauses):
+                raise
+            # MySQL before 8.0: still planned as a rename, since CHANGE to the same definition needs no table copy
+            algorithm, warnings = _execute_alter(cursor, table_name, rename_clauses_as_change(cursor, table_name, clauses),
+                                                 online, plan_algorithm(clauses))
+    schema_cache.invalidate_table(table_name)
+
+    for warning in warnings:
+        st.warning(f"⚠️ {warning}")
+    return algorithm
 
 # Function to remove a column from a table
-def remove_column_from_table(table_name, column_name):
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-
-    # Remove column SQL command
-    remove_column_sql = f"ALTER TABLE {table_name} DROP COLUMN {column_name};"
-    cursor.execute(remove_column_sql)
-    connection.commit()
-
-    cursor.close()
-    connection.close()
+def remove_column_from_table(table_name, column_name, online=True):
+    alter_table(table_name, [drop_column_clause(column_name)], online)
 
     st.success(f"Column '{column_name}' removed successfully from table '{table_name}'.")
 
 # Function to rename a column in a table
-def rename_column_in_table(table_name, old_column_name, new_column_name):
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-
-    # Rename column SQL command
-    rename_column_sql = f"ALTER TABLE {table_name} CHANGE {old_column_name} {new_column_name} VARCHAR(255);"
-    cursor.execute(rename_column_sql)
-    connection.commit()
-
-    cursor.close()
-    connection.close()
+def rename_column_in_table(table_name, old_column_name, new_column_name, online=True):
+    alter_table(table_name, [rename_column_clause(old_column_name, new_column_name)], online)
 
     st.success(f"Column '{old_column_name}' renamed to '{new_column_name}' successfully in table '{table_name}'.")   
 
 # Function to add a column to a table
-def add_column_to_table(table_name, column_name, datatype):
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-
-    # Add column SQL command
-    add_column_sql = f"ALTER TABLE {table_name} ADD {column_name} {datatype}"
-    # if is_primary:
-    #     add_column_sql += " PRIMARY KEY"
-    # if is_foreign:
-    #     referenced_table = st.text_input("Referenced Table")
-    #     referenced_column = st.text_input("Referenced Column")
-    #     add_column_sql += f" REFERENCES {referenced_table}({referenced_column})"
-    # add_column_sql += ";"
-    
-    cursor.execute(add_column_sql)
-    connection.commit()
-
-    cursor.close()
-    connection.close()
+def add_column_to_table(table_name, column_name, datatype, online=True):
+    alter_table(table_name, [add_column_clause(column_name, datatype)], online)
 
     st.success(f"Column '{column_name}' added successfully to table '{table_name}'.")
 
 # Function to delete a table from the database
 def delete_table_from_db(table_name):
-    db_info = spring_datasource_url.split("/")
-    host = db_info[2].split(":")[0]
-    database = db_info[3].split("?")[0]
-
-    connection = mysql.connector.connect(
-        host=host,
-        user=spring_datasource_username,
-        password=spring_datasource_password,
-        database=database
-    )
-    cursor = connection.cursor()
-
-    # Delete table SQL command
-    delete_table_sql = f"DROP TABLE IF EXISTS {table_name};"
-    cursor.execute(delete_table_sql)
-    connection.commit()
-
-    cursor.close()
-    connection.close()
+    with get_cursor(commit=True) as cursor:
+        # Delete table SQL command
+        delete_table_sql = f"DROP TABLE IF EXISTS {table_name};"
+        cursor.execute(delete_table_sql)
+    schema_cache.invalidate_table(table_name, table_list=True)
 
     st.success(f"Table '{table_name}' deleted successfully from the database.")
 
 
-# Function to stream data
-def stream_data(data):
-    for word in data.split(" "):
-        time.sleep(0.03)
-        yield word + " "
-
 # Initialize session state for columns, relationships, and CRUD generation if not already set
 if 'columns' not in st.session_state:
     st.session_state['columns'] = []
@@ -231,13 +114,23 @@ if 'relationships' not in st.session_state:
     st.session_state['relationships'] = {}
 if 'property_names' not in st.session_state:
     st.session_state['property_names'] = ""
-if 'property_names_1' not in st.session_state:
-    st.session_state['property_names_1'] = ""
-if 'property_names_2' not in st.session_state:
-    st.session_state['property_names_2'] = ""
+if 'staged_changes' not in st.session_state:
+    st.session_state['staged_changes'] = {}
+# Identifies this browser session to the shared model scheduler
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
 
 # Streamlit app setup
 st.title("🛠️ Dʏɴᴀᴍɪᴄ ᴛᴀʙʟᴇ ᴄʀᴇᴀᴛᴏʀ, ʀᴇʟᴀᴛɪᴏɴꜱʜɪᴘ ᴍᴀɴᴀɢᴇʀ & ᴄʀᴜᴅ ɢᴇɴᴇʀᴀᴛᴏʀ ✍") #Dynamic Table Creator, Relationship Manager & CRUD Generator
+run_timer.mark("first_paint")
+
+# Untick to ask the model for a fresh sample instead of a cached response
+use_cache = st.sidebar.checkbox("♻️ Reuse cached responses", value=True)
+cache_stats = llm_cache.get_stats()
+st.sidebar.caption(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+
+# Online DDL asks MySQL for INSTANT / INPLACE changes without locking and refuses to copy large tables
+online_ddl = st.sidebar.checkbox("⚡ Online schema changes", value=True)
 
 # Input for table name
 table_name = st.sidebar.text_input("📝 Enter Table Name")
@@ -305,12 +198,23 @@ if st.button("✅ Execute Operation"):
             create_table_in_db(table_name, st.session_state['columns'])
         else:
             st.error("❗ Please enter a table name and add at least one property.")
+    elif table_operation in ("Remove Column", "Rename Column", "Add Column") and not table_name:
+        st.error("❗ Please provide a table name.")
     elif table_operation == "Remove Column" and remove_column_name:
-        remove_column_from_table(table_name, remove_column_name)
+        try:
+            remove_column_from_table(table_name, remove_column_name, online_ddl)
+        except (DDLRefused, ValueError, datasource.Error) as e:
+            st.error(f"⚠️ Error: {e}")
     elif table_operation == "Rename Column" and old_column_name and new_column_name:
-        rename_column_in_table(table_name, old_column_name, new_column_name)
+        try:
+            rename_column_in_table(table_name, old_column_name, new_column_name, online_ddl)
+        except (DDLRefused, ValueError, datasource.Error) as e:
+            st.error(f"⚠️ Error: {e}")
     elif table_operation == "Add Column" and new_column_name:
-        add_column_to_table(table_name, new_column_name, new_datatype) # add_column_to_table(table_name, new_column_name, new_datatype, is_primary_key, is_foreign_key)
+        try:
+            add_column_to_table(table_name, new_column_name, new_datatype, online_ddl) # add_column_to_table(table_name, new_column_name, new_datatype, is_primary_key, is_foreign_key)
+        except (DDLRefused, ValueError, datasource.Error) as e:
+            st.error(f"⚠️ Error: {e}")
     elif table_operation == "Delete Table":
         if table_name:
             delete_table_from_db(table_name)
@@ -319,6 +223,36 @@ if st.button("✅ Execute Operation"):
     else:
         st.error("❗ Please provide all necessary inputs for the selected operation.")
 
+# Column changes can be staged and applied together as one ALTER TABLE
+if table_operation in ("Remove Column", "Rename Column", "Add Column") and st.button("📥 Stage Change"):
+    if not table_name:
+        st.error("❗ Please provide a table name.")
+    elif table_operation == "Remove Column" and remove_column_name:
+        st.session_state['staged_changes'].setdefault(table_name, []).append(drop_column_clause(remove_column_name))
+    elif table_operation == "Rename Column" and old_column_name and new_column_name:
+        st.session_state['staged_changes'].setdefault(table_name, []).append(rename_column_clause(old_column_name, new_column_name))
+    elif table_operation == "Add Column" and new_column_name:
+        st.session_state['staged_changes'].setdefault(table_name, []).append(add_column_clause(new_column_name, new_datatype))
+    else:
+        st.error("❗ Please provide all necessary inputs for the selected operation.")
+
+staged_clauses = st.session_state['staged_changes'].get(table_name, [])
+if staged_clauses:
+    st.write(f"🗂️ Staged changes for '{table_name}' ({len(staged_clauses)}):")
+    st.code(build_alter_statement(table_name, staged_clauses), language="sql")
+    if online_ddl:
+        st.caption(f"Expected algorithm: {plan_algorithm(staged_clauses).upper()}")
+    apply_column, clear_column = st.columns(2)
+    if apply_column.button("🚀 Apply Staged Changes"):
+        try:
+            algorithm = alter_table(table_name, staged_clauses, online_ddl)
+            del st.session_state['staged_changes'][table_name]
+            st.success(f"Applied {len(staged_clauses)} changes to table '{table_name}' in a single ALTER TABLE ({algorithm}).")
+        except (DDLRefused, ValueError, datasource.Error) as e:
+            st.error(f"⚠️ Error: {e}")
+    if clear_column.button("🧹 Clear Staged Changes"):
+        del st.session_state['staged_changes'][table_name]
+
 # Button to perform selected table operation
 # if st.button("Perform Table Operation"):
 #     if table_operation == "Create Table":
@@ -333,21 +267,36 @@ if st.button("✅ Execute Operation"):
 #             st.error("Please provide a table name.")
 
 # Fetch existing tables
-tables = fetch_existing_tables()
+# Without a reachable database the app still starts; CRUD_SCHEMA_SOURCE can point at a DDL dump or JSON snapshot
+st.sidebar.caption(f"🗄️ Schema: {describe_source()}")
+try:
+    tables = fetch_existing_tables()
+except (datasource.Error, SchemaSourceError) as e:
+    st.error(f"⚠️ Couldn't read the table list: {e}")
+    tables = []
 
 # Dropdown to select two tables for relationship management
 st.write("🔗 Manage Relationships Between Tables")
 if len(tables) >= 2:
     # table1 = st.selectbox("Select First Table", tables, key="table1")
     # table2 = st.selectbox("Select Second Table", tables, key="table2")
-    # Add "-select-" as the default option
-    tables_with_select = ["-select-"] + tables
+    # Searchable pickers with "-select-" as the default option; each renders one page of matches
 
-# Select box for the first table
-    table1 = st.selectbox("➡️ Select First Table", tables_with_select, key="table1")
+# Picker for the first table
+    table1 = table_picker(st, "➡️ Select First Table", tables, key="table1", empty_option="-select-")
 
-# Select box for the second table
-    table2 = st.selectbox("➡️ Select Second Table", tables_with_select, key="table2")
+# Picker for the second table
+    table2 = table_picker(st, "➡️ Select Second Table", tables, key="table2", empty_option="-select-")
+
+    # A foreign key between the two tables preselects the relationship type
+    detected = None
+    if table1 and table2:
+        try:
+            detected = get_fk_graph().relationship_between(table1, table2)
+        except (datasource.Error, SchemaSourceError):
+            pass
+    if detected is not None:
+        st.caption(f"🔍 From foreign keys: {table1} → {table2} is {detected.describe()}")
 
     # Dropdown to choose the relationship type
     # relationship_type = st.selectbox(
@@ -361,7 +310,8 @@ if len(tables) >= 2:
 # Select box for relationship type
     relationship_type = st.selectbox(
     "➡️ Select Relationship Type",
-    relationship_types
+    relationship_types,
+    index=relationship_types.index(detected.kind) if detected is not None else 0
 )
 
     # Dropdown to choose the relationship direction 
@@ -387,73 +337,78 @@ if st.session_state['relationships']:
 
 # Generate CRUD operations based on selected tables and relationships
 st.write("Generate CRUD Operations")
-
-# Option to fetch columns from the selected table
-if st.button("📊 Fetch Columns for First Table", key="fetch_columns_button_1"):
-    if table1:
-        with st.spinner("Fetching table columns for the first table..."):
-            try:
-                columns, relationships = fetch_table_columns(table1)
-                property_names = ",".join(columns)
-                st.session_state['property_names_1'] = property_names
-                st.session_state['relationships_1'] = relationships
-                st.write(f"Fetched columns for first table: {property_names}")
-                if relationships:
-                    st.write(f"Table relationships: {relationships}")
-            except mysql.connector.Error as e:
-                st.error(f"Error: {e}")
-    else:
-        st.error("Please select the first table.")
-
-# Option to fetch columns from the second table
-if st.button("📊 Fetch Columns for Second Table", key="fetch_columns_button_2"):
-    if table2:
-        with st.spinner("Fetching table columns for the second table..."):
-            try:
-                columns, relationships = fetch_table_columns(table2)
-                property_names = ",".join(columns)
-                st.session_state['property_names_2'] = property_names
-                st.session_state['relationships_2'] = relationships
-                st.write(f"Fetched columns for second table: {property_names}")
-                if relationships:
-                    st.write(f"Table relationships: {relationships}")
-            except mysql.connector.Error as e:
-                st.error(f"Error: {e}")
-    else:
-        st.error("Please select the second table.")
+# Tables are searched and added one at a time, so the list widget only holds the chosen ones
+chosen_tables = st.session_state.get('generate_tables', [])
+table_to_add = table_picker(st, "📚 Find a Table to Generate", tables, key="generate_table_search")
+# The table found is loaded with the FK graph in the background while the user adds it
+prefetcher.prefetch(st.session_state['session_id'], table_to_add, fk_graph=True)
+if st.button("➕ Add Table", key="add_generate_table") and table_to_add and table_to_add not in chosen_tables:
+    st.session_state['generate_tables'] = chosen_tables = chosen_tables + [table_to_add]
+selected_tables = st.multiselect("📚 Tables to Generate", chosen_tables, key="generate_tables")
+
+# Relationships among the chosen tables are read from the FK graph; the ones defined above take precedence
+if selected_tables:
+    try:
+        fk_graph = get_fk_graph()
+        with st.expander("🔍 Relationships detected from foreign keys"):
+            detected_any = False
+            for table in selected_tables:
+                for other, description in fk_graph.describe_relationships(table, set(selected_tables)).items():
+                    st.write(f"{table} → {other}: {description}")
+                    detected_any = True
+            if not detected_any:
+                st.caption("No foreign keys link the chosen tables.")
+    except (datasource.Error, SchemaSourceError) as e:
+        st.warning(f"⚠️ Couldn't read foreign keys: {e}")
 
 # Button to generate CRUD code
 if st.button("⚙️ Generate CRUD Code"):
-    if st.session_state['property_names_1'] or st.session_state['property_names_2']:
+    if selected_tables:
         with st.spinner("Generating CRUD code..."):
+            generated = {}
+            previews = {}
+            started = False
             try:
-                # Generate CRUD code for the first table
-                if st.session_state['property_names_1']:
-                    crud_code_1 = generate_crud_code(
-                        st.session_state['property_names_1'], ".NET Core", 
-                        st.session_state['relationships_1'], relationship_direction
-                    )
-                    st.session_state['crud_code_1'] = crud_code_1
-                    st.success("✅ CRUD code for the first table generated successfully.")
-                    
-
-                # Generate CRUD code for the second table
-                if st.session_state['property_names_2']:
-                    crud_code_2 = generate_crud_code(
-                        st.session_state['property_names_2'], ".NET Core", 
-                        st.session_state['relationships_2'], relationship_direction
-                    )
-                    st.session_state['crud_code_2'] = crud_code_2
-                    st.success("✅ CRUD code for the second table generated successfully.")
-
-            except Exception as e:
-                st.error(f"Error generating CRUD code: {e}")                
+                # Referenced tables are generated first; the tables of one level are generated concurrently and
+                # each streams into its own preview
+                for event, table, value in generate_related_tables(selected_tables, st.session_state['relationships'],
+                                                                    tables, ".NET Core", use_cache,
+                                                                    st.session_state['session_id']):
+                    started = True
+                    if event == "streaming":
+                        if table not in previews:
+                            previews[table] = st.empty()
+                        previews[table].code(value)
+                        continue
+                    if table in previews:
+                        previews.pop(table).empty()
+                    if event == "generated":
+                        generated[table] = value
+                        st.success(f"✅ CRUD code for '{table}' generated successfully.")
+                    else:
+                        st.error(f"Error generating CRUD code for '{table}': {value}")
+            except (datasource.Error, SchemaSourceError) as e:
+                st.error(f"Error: {e}")
+            # The previous results are kept when nothing could be generated (e.g. the schema couldn't be read)
+            if started:
+                st.session_state['crud_codes'] = generated
+    else:
+        st.error("Please select at least one table.")
 
 # Display generated CRUD code
-if 'crud_code_1' in st.session_state:
-    st.write("### 📝Generated CRUD Code for First Table")
-    st.code(st.session_state['crud_code_1'])
-
-if 'crud_code_2' in st.session_state:
-    st.write("### 📝Generated CRUD Code for Second Table")
-    st.code(st.session_state['crud_code_2'])
+for table, crud_code in st.session_state.get('crud_codes', {}).items():
+    st.write(f"### 📝Generated CRUD Code for {table}")
+    st.code(crud_code)
+
+# Startup / rerun timing, also appended to the startup log for tracking
+run_stats = run_timer.finish()
+st.sidebar.caption(f"⏱️ {run_stats['kind'].replace('_', ' ')}: first paint {run_stats['first_paint_ms']} ms, "
+                   f"full run {run_stats['run_ms']} ms")
+
+# Per-call latency of LLM calls, DB queries and file writes
+instrumentation.render_debug_panel(st.sidebar, {
+    "DB pool": datasource.get_pool_stats(),
+    "LLM scheduler": scheduler.get_stats(),
+    "Schema cache": schema_cache.get_stats(),
+    "Prefetch": prefetcher.get_stats(),
+})
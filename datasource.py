@@ -0,0 +1,172 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import instrumentation
+from constants import spring_datasource_url, spring_datasource_username, spring_datasource_password
+
+# Maximum number of pooled connections shared by every session of the process
+POOL_SIZE = int(os.environ.get("CRUD_DB_POOL_SIZE", "5"))
+
+# How long a caller waits for a free connection before giving up (seconds)
+POOL_TIMEOUT = float(os.environ.get("CRUD_DB_POOL_TIMEOUT", "30"))
+
+# Counters exposed for monitoring the pool
+pool_stats = {
+    "hits": 0,          # a connection was free immediately
+    "waits": 0,         # caller had to wait for a connection to be returned
+    "wait_time": 0.0,   # total seconds spent waiting
+    "timeouts": 0,      # caller gave up waiting
+    "reconnects": 0,    # health check found a dead connection and reconnected
+}
+
+_stats_lock = threading.Lock()
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(POOL_SIZE)
+_pool = None
+
+
+# Function to parse a jdbc:mysql://host:port/database?params URL into connect() arguments
+def parse_datasource_url(url):
+    db_info = url.split("/")
+    host_port = db_info[2].split(":")
+    database = db_info[3].split("?")[0]
+    config = {"host": host_port[0], "database": database}
+    if len(host_port) > 1 and host_port[1]:
+        config["port"] = int(host_port[1])
+    return config
+
+
+# Parsed once at import; Streamlit reruns reuse the cached module
+DB_CONFIG = parse_datasource_url(spring_datasource_url)
+DATABASE = DB_CONFIG["database"]
+
+
+# mysql.connector is imported on first use so importing this module stays cheap;
+# `datasource.Error` resolves to mysql.connector.Error for except clauses
+def __getattr__(name):
+    if name == "Error":
+        import mysql.connector
+        return mysql.connector.Error
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        pool_stats[name] += amount
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from mysql.connector import pooling
+
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="crud_generator_pool",
+                    pool_size=POOL_SIZE,
+                    pool_reset_session=True,
+                    user=spring_datasource_username,
+                    password=spring_datasource_password,
+                    **DB_CONFIG
+                )
+    return _pool
+
+
+def _acquire_slot():
+    if _slots.acquire(blocking=False):
+        _count("hits")
+        return
+    _count("waits")
+    started = time.perf_counter()
+    acquired = _slots.acquire(timeout=POOL_TIMEOUT)
+    _count("wait_time", time.perf_counter() - started)
+    instrumentation.record("db", "pool wait", time.perf_counter() - started,
+                           None if acquired else "timeout")
+    if not acquired:
+        _count("timeouts")
+        from mysql.connector.errors import PoolError
+
+        raise PoolError(
+            f"No database connection became available within {POOL_TIMEOUT} seconds"
+        )
+
+
+# Function to check a pooled connection is still alive before handing it out
+def _ensure_healthy(connection):
+    import mysql.connector
+
+    try:
+        connection.ping(reconnect=False)
+    except mysql.connector.Error:
+        _count("reconnects")
+        connection.reconnect(attempts=2, delay=0.5)
+
+
+@contextmanager
+def get_connection():
+    _acquire_slot()
+    try:
+        connection = get_pool().get_connection()
+    except Exception:
+        _slots.release()
+        raise
+    try:
+        _ensure_healthy(connection)
+        yield connection
+    finally:
+        # close() hands a pooled connection back to the pool
+        connection.close()
+        _slots.release()
+
+
+_TARGET_PATTERN = re.compile(r"\b(?:FROM|TABLE|INTO|UPDATE)\s+([`\w.]+)", re.IGNORECASE)
+
+
+# Function to name a query for the metrics by its kind, e.g. "ALTER" or "SELECT information_schema.COLUMNS".
+# User table names are left out: every table would start its own series, and a schema can have thousands.
+def query_label(sql):
+    words = sql.split()
+    verb = words[0].upper() if words else "?"
+    match = _TARGET_PATTERN.search(sql)
+    target = match.group(1).strip("`") if match else ""
+    if not target.lower().startswith("information_schema."):
+        target = ""
+    return f"{verb} {target}".strip()
+
+
+# Cursor wrapper that times every execute() for the instrumentation panel
+class InstrumentedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=None):
+        with instrumentation.timed("db", query_label(sql)):
+            if params is None:
+                return self._cursor.execute(sql)
+            return self._cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+@contextmanager
+def get_cursor(commit=False):
+    with get_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            yield InstrumentedCursor(cursor)
+            if commit:
+                connection.commit()
+        finally:
+            cursor.close()
+
+
+def get_pool_stats():
+    with _stats_lock:
+        stats = dict(pool_stats)
+    stats["pool_size"] = POOL_SIZE
+    return stats
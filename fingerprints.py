@@ -0,0 +1,34 @@
+import hashlib
+import json
+import os
+
+from json_store import locked, read_json, write_json
+
+# Stored next to the generated sources, under the output base directory
+FINGERPRINT_FILE = ".crud_fingerprints.json"
+
+
+# Function to hash everything a layer's output depends on
+def compute_fingerprint(inputs):
+    encoded = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+# Per-class, per-layer fingerprints of the inputs the current files were generated from. Several processes
+# (app sessions, job workers, batch runs) share the file, so each update re-reads it and merges under a file lock.
+class FingerprintStore:
+    def __init__(self, base_dir):
+        self.path = os.path.join(base_dir, FINGERPRINT_FILE)
+        # A corrupt file only means every layer is regenerated once
+        self._entries = read_json(self.path, {})
+
+    def is_current(self, class_name, layer, fingerprint, file_path):
+        entry = self._entries.get(f"{class_name}/{layer}")
+        return entry is not None and entry["fingerprint"] == fingerprint and os.path.exists(file_path)
+
+    def update(self, class_name, layer, fingerprint, file_path):
+        with locked(self.path):
+            entries = read_json(self.path, {})
+            entries[f"{class_name}/{layer}"] = {"fingerprint": fingerprint, "path": file_path}
+            write_json(self.path, entries)
+            self._entries = entries
@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+
+# Relationship kinds, named the way the prompts and the v6.3 relationship picker name them
+ONE_TO_ONE, ONE_TO_MANY, MANY_TO_ONE, MANY_TO_MANY = "OneToOne", "OneToMany", "ManyToOne", "ManyToMany"
+
+
+# One foreign-key constraint: table(columns) -> referenced_table(referenced_columns)
+@dataclass(frozen=True)
+class Edge:
+    constraint_name: str
+    table: str
+    columns: tuple
+    referenced_table: str
+    referenced_columns: tuple
+    one_to_one: bool = False    # the FK columns are the table's primary key or a unique column
+    on_update: str = ""
+    on_delete: str = ""
+
+
+# A relationship seen from `table`, read as "table <kind> target"
+@dataclass(frozen=True)
+class Relationship:
+    table: str
+    kind: str
+    target: str
+    edge: Edge                  # the FK it comes from; for ManyToMany, the join table's FK to `table`
+    join_table: str = None
+    owning: bool = False        # the side that holds the FK (for ManyToMany, the join table's first FK)
+
+    def describe(self):
+        if self.join_table:
+            return f"{self.kind} via {self.join_table}"
+        return f"{self.kind} via {self.edge.table}.{','.join(self.edge.columns)}"
+
+
+def _is_one_to_one(table, columns):
+    if set(columns) == set(table.primary_key):
+        return True
+    column = table.columns_by_name.get(columns[0]) if len(columns) == 1 else None
+    return column is not None and column.is_unique
+
+
+# A join table links exactly two tables and holds nothing but the two FKs and its primary key
+# (either the FK pair itself or a surrogate id); it must also not be referenced itself
+def _is_join_table(table, edges):
+    if len(edges) != 2 or any(edge.one_to_one for edge in edges):
+        return False
+    fk_columns = {column for edge in edges for column in edge.columns}
+    return set(table.column_names) - fk_columns <= set(table.primary_key)
+
+
+# Function to build one table's outbound edges; composite FKs are grouped by constraint name
+def _table_edges(table):
+    constraints = {}
+    for fk in table.foreign_keys.values():
+        constraints.setdefault(fk.constraint_name or fk.column, []).append(fk)
+    edges = []
+    for name, fks in constraints.items():
+        columns = tuple(fk.column for fk in fks)
+        edges.append(Edge(name, table.name, columns, fks[0].referenced_table,
+                          tuple(fk.referenced_column for fk in fks), _is_one_to_one(table, columns),
+                          fks[0].on_update, fks[0].on_delete))
+    return edges
+
+
+# Foreign keys of the whole schema, indexed both ways: outbound edges per referencing table and
+# inbound edges per referenced table, with OneToOne / OneToMany / ManyToMany inferred from keys
+class ForeignKeyGraph:
+    # join_shaped: tables whose own columns and FKs make them a join table, if nothing references them
+    def __init__(self, edges=(), join_shaped=()):
+        self.edges = list(edges)
+        self.join_shaped = frozenset(join_shaped)
+        self._outbound = {}
+        self._inbound = {}
+        for edge in self.edges:
+            self._outbound.setdefault(edge.table, []).append(edge)
+            self._inbound.setdefault(edge.referenced_table, []).append(edge)
+        # join table -> (FK to first table, FK to second table)
+        self.join_tables = {
+            name: tuple(self._outbound[name]) for name in self.join_shaped
+            if name in self._outbound and name not in self._inbound
+        }
+
+    # Function to build the graph from a SchemaSnapshot
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls().replace_tables(snapshot.tables)
+
+    # Function to return a graph with the outbound FKs of `tables` (name -> TableInfo, or None for a dropped
+    # table) re-read from them; every other table's edges are kept as they are
+    def replace_tables(self, tables):
+        edges = [edge for edge in self.edges if edge.table not in tables]
+        join_shaped = set(self.join_shaped) - set(tables)
+        for name, table in tables.items():
+            if table is None:
+                continue
+            table_edges = _table_edges(table)
+            edges += table_edges
+            if _is_join_table(table, table_edges):
+                join_shaped.add(name)
+        return ForeignKeyGraph(edges, join_shaped)
+
+    def outbound(self, table):
+        return list(self._outbound.get(table, ()))
+
+    def inbound(self, table):
+        return list(self._inbound.get(table, ()))
+
+    # Function to list every relationship of a table: its own FKs, FKs pointing at it, and
+    # ManyToMany links through join tables (instead of OneToMany to the join table itself)
+    def relationships(self, table):
+        found = []
+        for edge in self._outbound.get(table, ()):
+            found.append(Relationship(table, ONE_TO_ONE if edge.one_to_one else MANY_TO_ONE, edge.referenced_table,
+                                      edge, owning=True))
+        for edge in self._inbound.get(table, ()):
+            pair = self.join_tables.get(edge.table)
+            if pair is not None:
+                other = pair[1] if edge is pair[0] else pair[0]
+                found.append(Relationship(table, MANY_TO_MANY, other.referenced_table, edge, edge.table,
+                                          owning=edge is pair[0]))
+            else:
+                found.append(Relationship(table, ONE_TO_ONE if edge.one_to_one else ONE_TO_MANY, edge.table, edge))
+        return found
+
+    def relationship_between(self, table, other):
+        for relationship in self.relationships(table):
+            if relationship.target == other:
+                return relationship
+        return None
+
+    # Function to get a table's FKs as {column(s): referenced table}, the shape TableInfo.relationships has
+    def references(self, table):
+        return {",".join(edge.columns): edge.referenced_table for edge in self._outbound.get(table, ())}
+
+    # Function to describe a table's relationships for a prompt as {other table: "Kind via ..."}. Its own FKs
+    # are always included; inbound and ManyToMany links only when the other table is in `among`.
+    def describe_relationships(self, table, among=None):
+        described = {}
+        for relationship in self.relationships(table):
+            own_fk = relationship.owning and relationship.join_table is None
+            if not own_fk and among is not None and relationship.target not in among:
+                continue
+            text = relationship.describe()
+            if relationship.target in described:
+                text = f"{described[relationship.target]}; {text}"
+            described[relationship.target] = text
+        return described
+
+    def get_stats(self):
+        return {"edges": len(self.edges), "tables": len(set(self._outbound) | set(self._inbound)),
+                "join_tables": len(self.join_tables)}
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from codegen import BASE_DIR, GENERATION_CONCURRENCY, LAYERS, generate_and_save_layer, generate_layers_single_call
+from fingerprints import FingerprintStore
+from output_writer import BulkWriter
+from schema_model import SchemaSnapshot, get_table_info
+from schema_sources import snapshot_from_json, snapshot_to_json
+from templates import can_render
+
+# Seconds between progress writes while single-call blocks stream in; each write is a SQLite update the UI polls
+JOB_PREVIEW_INTERVAL = float(os.environ.get("CRUD_JOB_PREVIEW_INTERVAL", "0.5"))
+
+
+# Function to describe the table a job generates from, as the submitting app sees it. Workers have their own
+# schema caches, which DDL run from the app doesn't invalidate, so they use this instead of looking it up.
+def table_payload(table_info):
+    return snapshot_to_json(SchemaSnapshot("", {table_info.name: table_info}))
+
+
+def _payload_table(payload):
+    if not payload.get("table_name"):
+        return None
+    if payload.get("table"):
+        return snapshot_from_json(payload["table"]).get_table(payload["table_name"])
+    return get_table_info(payload["table_name"])
+
+
+# Function to run a "layers" job on a queue worker: every layer of one class, generated concurrently and
+# published together at the end. `report(progress)` stores {"layers": {layer: state}} for the UI to poll;
+# a state is {"status": "running" | "generated" | "unchanged" | "failed", "path": ..., "error": ...}, and a
+# single-call layer still streaming has {"status": "running", "preview": code so far}.
+#
+# Payload: class_name, property_names, framework, table_name and table (optional, see table_payload), use_cache,
+# template_layers, regenerate_unchanged, single_call, session
+def run_layers_job(payload, report):
+    class_name, property_names, framework = payload["class_name"], payload["property_names"], payload["framework"]
+    use_cache = payload.get("use_cache", True)
+    template_layers = set(payload.get("template_layers", []))
+    session = payload.get("session", "default")
+    table_info = _payload_table(payload)
+    fingerprints = None if payload.get("regenerate_unchanged") else FingerprintStore(BASE_DIR)
+    # Layers are staged while they generate and written together at the end
+    writer = BulkWriter(BASE_DIR)
+
+    states = {layer: {"status": "running"} for layer in LAYERS}
+    lock = threading.Lock()
+
+    def update(layer, status, path=None, error=None):
+        with lock:
+            states[layer] = {"status": status, "path": path, "error": error}
+            report({"layers": dict(states)})
+
+    report({"layers": dict(states)})
+
+    last_preview = [0.0]
+
+    # Partial blocks are reported at most every JOB_PREVIEW_INTERVAL seconds, and once more when they finish
+    def show_block(layer, code, finished):
+        with lock:
+            states[layer] = {"status": "running"} if finished else {"status": "running", "preview": code}
+            now = time.monotonic()
+            if finished or now - last_preview[0] >= JOB_PREVIEW_INTERVAL:
+                last_preview[0] = now
+                report({"layers": dict(states)})
+
+    # In single-call mode the model layers come from one streamed response, split into files as it arrives
+    single_call_layers = []
+    if payload.get("single_call"):
+        single_call_layers = [
+            layer for layer in LAYERS
+            if not (layer in template_layers and table_info is not None and can_render(layer, framework, table_info))
+        ]
+
+    with ThreadPoolExecutor(max_workers=GENERATION_CONCURRENCY) as executor:
+        futures = {
+            executor.submit(generate_and_save_layer, layer, class_name, property_names, framework, use_cache,
+                            None, table_info, fingerprints, layer in template_layers, writer, session): layer
+            for layer in LAYERS if layer not in single_call_layers
+        }
+
+        if single_call_layers:
+            try:
+                block_paths, unchanged_paths, failed = generate_layers_single_call(
+                    single_call_layers, class_name, property_names, framework, use_cache, None, table_info,
+                    fingerprints, writer, session, show_block
+                )
+                for layer, file_path in block_paths.items():
+                    update(layer, "generated", file_path)
+                for layer, file_path in unchanged_paths.items():
+                    update(layer, "unchanged", file_path)
+                for layer, reason in failed.items():
+                    update(layer, "failed", error=reason)
+            except Exception as e:
+                for layer in single_call_layers:
+                    update(layer, "failed", error=str(e))
+
+        for future in as_completed(futures):
+            layer = futures[future]
+            try:
+                file_path, generated = future.result()
+                update(layer, "generated" if generated else "unchanged", file_path)
+            except Exception as e:
+                # A failed layer doesn't affect the layers that succeeded
+                update(layer, "failed", error=str(e))
+
+    result = {"layers": states, "written": [], "unchanged": [], "publish_error": None}
+    try:
+        published = writer.publish()
+        result["written"], result["unchanged"] = published["written"], published["unchanged"]
+    except (OSError, ValueError) as e:
+        result["publish_error"] = str(e)
+    return result
@@ -0,0 +1,97 @@
+# Relationship types where the second table of a "{table1}-{table2}" pair refers to the first
+REFERS_TO_FIRST = {"OneToMany", "OneToOne", "ManyToMany"}
+
+
+# Function to split a "{table1}-{table2}" relationship key; table names may contain '-' themselves
+def split_relationship_key(key, tables):
+    for table in tables:
+        if key.startswith(f"{table}-") and key[len(table) + 1:] in tables:
+            return table, key[len(table) + 1:]
+    return None
+
+
+# Function to work out which selected tables each table refers to, from real FKs and manual relationships.
+# fk_relationships: table -> {column: referenced table}; manual_relationships: "{t1}-{t2}" -> (type, direction)
+def table_dependencies(tables, fk_relationships, manual_relationships):
+    selected = set(tables)
+    dependencies = {table: set() for table in tables}
+    for table in tables:
+        for referenced_table in fk_relationships.get(table, {}).values():
+            if referenced_table in selected and referenced_table != table:
+                dependencies[table].add(referenced_table)
+    for key, (relationship_type, _) in manual_relationships.items():
+        pair = split_relationship_key(key, selected)
+        if pair is None or pair[0] == pair[1]:
+            continue
+        first, second = pair
+        if relationship_type in REFERS_TO_FIRST:
+            dependencies[second].add(first)
+        elif relationship_type == "ManyToOne":
+            dependencies[first].add(second)
+    return dependencies
+
+
+# Function to find the reference cycles: groups of tables that all (indirectly) refer to each other, as
+# {table: the sorted tuple of its group}; a table outside any cycle is a group of its own
+def _cycle_groups(dependencies):
+    groups, index, low, stack, on_stack = {}, {}, {}, [], set()
+
+    # Tarjan's algorithm, iterative so long reference chains don't hit the recursion limit
+    for root in sorted(dependencies):
+        if root in index:
+            continue
+        work = [(root, iter(sorted(dependencies[root])))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            table, referenced = work[-1]
+            for other in referenced:
+                if other not in dependencies:
+                    continue
+                if other not in index:
+                    index[other] = low[other] = len(index)
+                    stack.append(other)
+                    on_stack.add(other)
+                    work.append((other, iter(sorted(dependencies[other]))))
+                    break
+                if other in on_stack:
+                    low[table] = min(low[table], index[other])
+            else:
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[table])
+                if low[table] == index[table]:
+                    group = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        group.append(member)
+                        if member == table:
+                            break
+                    group = tuple(sorted(group))
+                    for member in group:
+                        groups[member] = group
+    return groups
+
+
+# Function to group tables into levels: every table comes after the tables it refers to, and the
+# tables of one level are independent of each other so they can be generated concurrently.
+# The tables of a reference cycle can't be ordered, so they share a level; tables referring to the
+# cycle still come after it.
+def plan_generation_levels(dependencies):
+    groups = _cycle_groups(dependencies)
+    remaining = {
+        group: {groups[other] for table in group for other in dependencies[table]
+                if other in groups and groups[other] != group}
+        for group in set(groups.values())
+    }
+    levels = []
+    while remaining:
+        ready = [group for group, referenced in remaining.items() if not referenced]
+        levels.append(sorted(table for group in ready for table in group))
+        for group in ready:
+            del remaining[group]
+        for referenced in remaining.values():
+            referenced.difference_update(ready)
+    return levels
@@ -0,0 +1,188 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Number of most recent samples kept per (kind, name) for percentiles
+WINDOW_SIZE = int(os.environ.get("CRUD_METRICS_WINDOW", "1000"))
+
+# Where metrics.json and metrics.prom are written
+METRICS_DIR = os.environ.get(
+    "CRUD_METRICS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".metrics")
+)
+
+# Seconds between automatic exports, written by a background thread; 0 disables them
+EXPORT_INTERVAL = float(os.environ.get("CRUD_METRICS_EXPORT_INTERVAL", "30"))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Series:
+    def __init__(self):
+        self.durations = deque(maxlen=WINDOW_SIZE)
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.totals = defaultdict(float)      # numeric attributes: bytes, chars, approx tokens, rows
+        self.outcomes = defaultdict(int)      # e.g. cache=hit / cache=miss
+        self.last_error = None
+
+
+_series = defaultdict(_Series)
+_lock = threading.Lock()
+_exporter = [None]
+_export_lock = threading.Lock()
+
+
+def _percentile(ordered, quantile):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(quantile * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Rough token estimate for text sent to / received from the model (~4 characters per token)
+def approx_tokens(text):
+    return (len(text) + 3) // 4
+
+
+# Function to record one operation: kind is "llm", "llm_cache", "db", "file" or "app", name says which one
+def record(kind, name, duration, error=None, **attributes):
+    with _lock:
+        series = _series[(kind, name)]
+        series.count += 1
+        series.total_seconds += duration
+        series.durations.append(duration)
+        if error is not None:
+            series.errors += 1
+            series.last_error = str(error)[:200]
+        for key, value in attributes.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                series.outcomes[f"{key}={value}"] += 1
+            else:
+                series.totals[key] += value
+        # Exports run on their own thread, started by the first recorded operation, so no caller waits on the disk
+        if EXPORT_INTERVAL and _exporter[0] is None:
+            _exporter[0] = threading.Thread(target=_export_periodically, name="metrics-export", daemon=True)
+            _exporter[0].start()
+
+
+def _export_periodically():
+    while True:
+        time.sleep(EXPORT_INTERVAL)
+        try:
+            export_metrics()
+        except OSError:
+            pass
+
+
+# Times the enclosed block; attributes added to the yielded dict are recorded with it
+@contextmanager
+def timed(kind, name, **attributes):
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        record(kind, name, time.perf_counter() - started, error, **attributes)
+
+
+def snapshot():
+    with _lock:
+        items = [(key, series, sorted(series.durations)) for key, series in _series.items()]
+    result = []
+    for (kind, name), series, ordered in sorted(items, key=lambda item: item[0]):
+        entry = {
+            "kind": kind,
+            "name": name,
+            "count": series.count,
+            "errors": series.errors,
+            "total_seconds": round(series.total_seconds, 6),
+            "last_error": series.last_error,
+        }
+        for quantile in QUANTILES:
+            entry[f"p{int(quantile * 100)}"] = round(_percentile(ordered, quantile), 6)
+        entry.update({key: value for key, value in series.totals.items()})
+        entry.update({key: value for key, value in series.outcomes.items()})
+        result.append(entry)
+    return result
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def prometheus_text(entries=None):
+    entries = snapshot() if entries is None else entries
+    lines = [
+        "# HELP crud_operation_duration_seconds Duration of LLM calls, DB queries and file writes.",
+        "# TYPE crud_operation_duration_seconds summary",
+    ]
+    for entry in entries:
+        labels = f'kind="{_label(entry["kind"])}",name="{_label(entry["name"])}"'
+        for quantile in QUANTILES:
+            lines.append(f'crud_operation_duration_seconds{{{labels},quantile="{quantile}"}} '
+                         f'{entry[f"p{int(quantile * 100)}"]}')
+        lines.append(f"crud_operation_duration_seconds_sum{{{labels}}} {entry['total_seconds']}")
+        lines.append(f"crud_operation_duration_seconds_count{{{labels}}} {entry['count']}")
+    lines += ["# TYPE crud_operation_errors_total counter"]
+    for entry in entries:
+        lines.append(f'crud_operation_errors_total{{kind="{_label(entry["kind"])}",name="{_label(entry["name"])}"}} '
+                     f'{entry["errors"]}')
+    lines += ["# TYPE crud_operation_attribute_total counter"]
+    for entry in entries:
+        for key, value in entry.items():
+            if key in ("kind", "name", "count", "errors", "total_seconds", "last_error") or re.match(r"p\d+$", key):
+                continue
+            attribute, _, outcome = key.partition("=")
+            lines.append(f'crud_operation_attribute_total{{kind="{_label(entry["kind"])}",name="{_label(entry["name"])}",'
+                         f'attribute="{_label(attribute)}",value="{_label(outcome)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+# Function to write metrics.json and metrics.prom (Prometheus text format) to METRICS_DIR
+def export_metrics(directory=None):
+    directory = directory or METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    entries = snapshot()
+    for file_name, content in (
+        ("metrics.json", json.dumps({"generated_at": time.time(), "operations": entries}, indent=2)),
+        ("metrics.prom", prometheus_text(entries)),
+    ):
+        path = os.path.join(directory, file_name)
+        # The export thread, the panel's button and other processes may all write here
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with _export_lock:
+            with open(temp_path, "w") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+    return directory
+
+
+def reset():
+    with _lock:
+        _series.clear()
+
+
+# Function to draw the debug panel (pass st.sidebar or any Streamlit container)
+def render_debug_panel(container, extra_stats=None):
+    panel = container.expander("🐞 Performance")
+    entries = snapshot()
+    if entries:
+        rows = [
+            {key: entry.get(key) for key in ("kind", "name", "count", "errors", "p50", "p95", "p99")}
+            for entry in entries
+        ]
+        panel.dataframe(rows, hide_index=True)
+    else:
+        panel.caption("No operations recorded yet.")
+    for title, stats in (extra_stats or {}).items():
+        panel.caption(f"{title}: " + ", ".join(f"{key} {value}" for key, value in stats.items()))
+    if panel.button("💾 Export metrics", key="export_metrics_button"):
+        panel.caption(f"Written to {export_metrics()}")
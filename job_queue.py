@@ -0,0 +1,362 @@
+import argparse
+import heapq
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import instrumentation
+
+# SQLite file holding queued, running and finished generation jobs; shared by the app and its workers
+JOB_QUEUE_PATH = os.environ.get(
+    "CRUD_JOB_QUEUE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".crud_jobs.sqlite3")
+)
+
+# Worker processes serving the queue; the app starts them on demand unless they're run separately
+# (CRUD_JOB_AUTOSTART_WORKERS=0 and `python job_queue.py worker --processes N`)
+JOB_WORKERS = int(os.environ.get("CRUD_JOB_WORKERS", "2"))
+AUTOSTART_WORKERS = os.environ.get("CRUD_JOB_AUTOSTART_WORKERS", "1") == "1"
+
+# A running job whose worker stops renewing its lease is handed to another worker, up to JOB_MAX_ATTEMPTS runs
+JOB_LEASE_SECONDS = float(os.environ.get("CRUD_JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("CRUD_JOB_MAX_ATTEMPTS", "2"))
+
+# Seconds between queue polls (workers) and progress polls (UI); idle workers exit after WORKER_IDLE_EXIT
+JOB_POLL_SECONDS = float(os.environ.get("CRUD_JOB_POLL_SECONDS", "1.0"))
+WORKER_IDLE_EXIT = float(os.environ.get("CRUD_JOB_WORKER_IDLE_EXIT", "900"))
+
+# Finished jobs are kept this long so their results can still be opened by id
+JOB_RETENTION_SECONDS = float(os.environ.get("CRUD_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# Job kind -> "module:function" the workers run; the function gets (payload, report_progress) and returns the result
+JOB_HANDLERS = {
+    "layers": "generation_jobs:run_layers_job",
+}
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _decode(row):
+    if row is None:
+        return None
+    job = dict(row)
+    for key in ("payload", "progress", "result"):
+        job[key] = json.loads(job[key]) if job[key] else None
+    return job
+
+
+# Persistent FIFO of jobs. Sessions take turns: the next job claimed is the oldest one of the session
+# with the fewest jobs running, so one user's batch doesn't hold everybody else up.
+class JobQueue:
+    def __init__(self, path=JOB_QUEUE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " session TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " progress TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " worker TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " lease_until REAL,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, pid INTEGER NOT NULL, last_seen REAL NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    # Claims and status changes run in an IMMEDIATE transaction so two workers never take the same job
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def submit(self, kind, payload, session="default"):
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, kind, session, payload, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, kind, session, json.dumps(payload), time.time()),
+            )
+        instrumentation.record("app", f"job {kind} submitted", 0.0)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _decode(row)
+
+    # Function to count the queued jobs that will be claimed before this one (0 once it's running), replaying
+    # claim()'s order: the oldest job of the session with the fewest running jobs goes next. Jobs claimed
+    # along the way are assumed to still be running, and jobs submitted later can only move it back.
+    def position(self, job_id):
+        with self._lock:
+            connection = self._connect()
+            if connection.execute("SELECT 1 FROM jobs WHERE id = ? AND status = 'queued'", (job_id,)).fetchone() is None:
+                return 0
+            running = dict(connection.execute(
+                "SELECT session, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY session"
+            ).fetchall())
+            queued = connection.execute(
+                "SELECT id, session, created_at FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+
+        by_session = {}
+        for row in queued:
+            by_session.setdefault(row["session"], deque()).append((row["created_at"], row["id"]))
+        heads = [(running.get(session, 0), jobs[0][0], session) for session, jobs in by_session.items()]
+        heapq.heapify(heads)
+        ahead = 0
+        while heads:
+            running_count, _, session = heapq.heappop(heads)
+            _, claimed_id = by_session[session].popleft()
+            if claimed_id == job_id:
+                return ahead
+            ahead += 1
+            if by_session[session]:
+                heapq.heappush(heads, (running_count + 1, by_session[session][0][0], session))
+        return ahead
+
+    def list_jobs(self, session=None, limit=20):
+        query, params = "SELECT * FROM jobs", ()
+        if session is not None:
+            query, params = query + " WHERE session = ?", (session,)
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY created_at DESC LIMIT ?", params + (limit,)).fetchall()
+        return [_decode(row) for row in rows]
+
+    # Function to cancel a job that hasn't started; returns whether it was cancelled
+    def cancel(self, job_id):
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+        return cursor.rowcount > 0
+
+    # Function to take the next job for `worker`, after re-queuing running jobs whose worker went away
+    def claim(self, worker):
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,"
+                " error = CASE WHEN attempts >= ? THEN 'The worker running this job stopped responding.' END,"
+                " finished_at = CASE WHEN attempts >= ? THEN ? END, worker = NULL"
+                " WHERE status = 'running' AND lease_until < ?",
+                (JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, now, now),
+            )
+            row = connection.execute(
+                "SELECT id FROM jobs AS queued WHERE status = 'queued' ORDER BY"
+                " (SELECT COUNT(*) FROM jobs AS running WHERE running.status = 'running'"
+                "  AND running.session = queued.session), created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, started_at = ?,"
+                " lease_until = ? WHERE id = ?",
+                (worker, now, now + JOB_LEASE_SECONDS, row[0]),
+            )
+            job = connection.execute("SELECT * FROM jobs WHERE id = ?", (row[0],)).fetchone()
+        return _decode(job)
+
+    # Function to renew a running job's lease, optionally storing its latest progress
+    def heartbeat(self, job_id, worker, progress=None):
+        now = time.time()
+        with self._transaction() as connection:
+            if progress is None:
+                connection.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                                   (now + JOB_LEASE_SECONDS, job_id, worker))
+            else:
+                connection.execute(
+                    "UPDATE jobs SET lease_until = ?, progress = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                    (now + JOB_LEASE_SECONDS, json.dumps(progress), job_id, worker),
+                )
+            connection.execute("INSERT OR REPLACE INTO workers (id, pid, last_seen) VALUES (?, ?, ?)",
+                               (worker, os.getpid(), now))
+
+    def finish(self, job_id, worker, result=None, error=None):
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                ("failed" if error else "done", json.dumps(result), error, time.time(), job_id, worker),
+            )
+
+    def worker_seen(self, worker):
+        with self._transaction() as connection:
+            connection.execute("INSERT OR REPLACE INTO workers (id, pid, last_seen) VALUES (?, ?, ?)",
+                               (worker, os.getpid(), time.time()))
+
+    def worker_gone(self, worker):
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM workers WHERE id = ?", (worker,))
+
+    # Function to count workers that polled the queue or renewed a lease recently
+    def live_workers(self):
+        stale_after = max(10.0, 5 * JOB_POLL_SECONDS, JOB_LEASE_SECONDS / 2)
+        with self._lock:
+            row = self._connect().execute("SELECT COUNT(*) FROM workers WHERE last_seen > ?",
+                                          (time.time() - stale_after,)).fetchone()
+        return row[0]
+
+    def purge(self, max_age=JOB_RETENTION_SECONDS):
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND finished_at < ?",
+                               (time.time() - max_age,))
+
+    def get_stats(self):
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        stats = {status: 0 for status in ("queued", "running", "done", "failed")}
+        stats.update({row[0]: row[1] for row in rows})
+        stats["workers"] = self.live_workers()
+        return stats
+
+
+# Shared by every session of the process
+job_queue = JobQueue()
+
+
+def _handler(kind):
+    module_name, function_name = JOB_HANDLERS[kind].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+# Function to run one claimed job; its lease is renewed in the background for as long as it runs
+def _run_job(queue, worker, job):
+    stop = threading.Event()
+
+    def keep_lease():
+        while not stop.wait(JOB_LEASE_SECONDS / 3):
+            queue.heartbeat(job["id"], worker)
+
+    threading.Thread(target=keep_lease, daemon=True).start()
+    try:
+        with instrumentation.timed("app", f"job {job['kind']}"):
+            result = _handler(job["kind"])(job["payload"], lambda progress: queue.heartbeat(job["id"], worker, progress))
+        queue.finish(job["id"], worker, result)
+    except Exception as e:
+        queue.finish(job["id"], worker, error=f"{type(e).__name__}: {e}")
+    finally:
+        stop.set()
+
+
+# Function to claim and run the next job, if there is one; returns the claimed job (before it ran) or None
+def work_once(queue=None, worker=None):
+    queue = queue or job_queue
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    queue.worker_seen(worker)
+    job = queue.claim(worker)
+    if job is not None:
+        _run_job(queue, worker, job)
+    return job
+
+
+# Function to serve the queue until the worker has been idle for WORKER_IDLE_EXIT seconds (0: forever)
+def run_worker(queue=None, worker=None):
+    queue = queue or job_queue
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    queue.purge()
+    idle_since = time.monotonic()
+    try:
+        while True:
+            job = work_once(queue, worker)
+            if job is not None:
+                idle_since = time.monotonic()
+            elif WORKER_IDLE_EXIT and time.monotonic() - idle_since > WORKER_IDLE_EXIT:
+                break
+            else:
+                time.sleep(JOB_POLL_SECONDS)
+    finally:
+        queue.worker_gone(worker)
+
+
+# Function to start one worker process; each worker exports its metrics to its own folder. The model rate
+# limit needs no splitting: every process takes its tokens from the same bucket (llm_scheduler.RATE_LIMIT_PATH).
+def _start_worker(queue, number, log=None):
+    env = dict(os.environ,
+               CRUD_JOB_QUEUE_PATH=queue.path,
+               CRUD_METRICS_DIR=os.path.join(instrumentation.METRICS_DIR, f"job-worker-{number}"))
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            stdin=subprocess.DEVNULL, stdout=log, stderr=log)
+
+
+_spawned = []
+_spawn_lock = threading.Lock()
+
+
+# Function to start worker processes until `count` are serving the queue; returns how many were started.
+# Their output goes to a log file next to the queue.
+def ensure_workers(count=JOB_WORKERS, queue=None):
+    if not AUTOSTART_WORKERS:
+        return 0
+    queue = queue or job_queue
+    with _spawn_lock:
+        _spawned[:] = [process for process in _spawned if process.poll() is None]
+        missing = max(0, count - max(len(_spawned), queue.live_workers()))
+        if missing:
+            with open(queue.path + ".log", "a") as log:
+                for _ in range(missing):
+                    _spawned.append(_start_worker(queue, len(_spawned) + 1, log))
+        return missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve or inspect the generation job queue.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    worker = subcommands.add_parser("worker", help="run worker processes until they have been idle for a while")
+    worker.add_argument("--processes", type=int, default=1, help="worker processes to run (default: 1)")
+    subcommands.add_parser("status", help="print job counts by status")
+    subcommands.add_parser("purge", help="delete finished jobs older than CRUD_JOB_RETENTION_SECONDS")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        print(json.dumps(job_queue.get_stats(), indent=2))
+    elif args.command == "purge":
+        job_queue.purge()
+    elif args.processes > 1:
+        processes = [_start_worker(job_queue, number) for number in range(1, args.processes + 1)]
+        return max(process.wait() for process in processes)
+    else:
+        run_worker()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
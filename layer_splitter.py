@@ -0,0 +1,74 @@
+import re
+
+# Delimiters the model is asked to put around each file of a single-call response
+FILE_START = "=== FILE: {layer} ==="
+FILE_END = "=== END FILE ==="
+
+_START_PATTERN = re.compile(r"^\s*=+\s*FILE:\s*([\w.]+)\s*=+\s*$", re.IGNORECASE)
+_END_PATTERN = re.compile(r"^\s*=+\s*END\s+FILE\s*=+\s*$", re.IGNORECASE)
+FENCE_PATTERN = re.compile(r"^\s*```[\w#+.-]*\s*$")
+
+
+# Function to describe the block format in a prompt
+def block_instructions(layers):
+    example = "\n".join([FILE_START.format(layer=layers[0]), "<code>", FILE_END])
+    return (f"Return exactly one block per layer, in this order: {', '.join(layers)}. "
+            f"Start each block with a line '{FILE_START}' using the layer name, end it with a line "
+            f"'{FILE_END}', and put nothing outside the blocks. For example:\n{example}")
+
+
+# Incremental parser for single-call responses: feed it chunks as they stream in and it routes the
+# lines of each "=== FILE: <layer> ===" block to that layer. Code fences inside a block are dropped.
+class LayerStreamSplitter:
+    def __init__(self, layers):
+        self._layers = {layer.lower(): layer for layer in layers}
+        self._partial = ""
+        self._current = None
+        self._lines = []
+        self.files = {}     # layer -> code, for completed blocks
+
+    # Function to consume one chunk; returns [(layer, code so far, block finished)] for the blocks it touched
+    def feed(self, chunk):
+        text = self._partial + chunk
+        *lines, self._partial = text.split("\n")
+        updates = {}
+        for line in lines:
+            self._consume(line, updates)
+        return list(updates.values())
+
+    # Function to flush the last line and any block the response left unterminated
+    def close(self):
+        updates = {}
+        if self._partial:
+            self._consume(self._partial, updates)
+            self._partial = ""
+        if self._current is not None:
+            self._finish_block(updates)
+        return list(updates.values())
+
+    @property
+    def current_layer(self):
+        return self._current
+
+    def _consume(self, line, updates):
+        start = _START_PATTERN.match(line)
+        if start:
+            if self._current is not None:
+                self._finish_block(updates)
+            layer = self._layers.get(start.group(1).lower().removesuffix(".java").removesuffix(".cs"))
+            if layer is not None:
+                self._current, self._lines = layer, []
+            return
+        if self._current is None:
+            return
+        if _END_PATTERN.match(line):
+            self._finish_block(updates)
+        elif not FENCE_PATTERN.match(line):
+            self._lines.append(line)
+            updates[self._current] = (self._current, "\n".join(self._lines), False)
+
+    def _finish_block(self, updates):
+        code = "\n".join(self._lines).strip()
+        self.files[self._current] = code
+        updates[self._current] = (self._current, code, True)
+        self._current, self._lines = None, []
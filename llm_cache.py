@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import instrumentation
+
+# SQLite file holding cached model responses; survives restarts
+LLM_CACHE_PATH = os.environ.get(
+    "CRUD_LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache.sqlite3")
+)
+
+# Total size of cached responses before least recently used entries are evicted
+LLM_CACHE_MAX_BYTES = int(os.environ.get("CRUD_LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+
+# Function to normalize a comma separated property list so spacing differences share a key
+def normalize_property_names(property_names):
+    return ",".join(name.strip() for name in property_names.split(",") if name.strip())
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+# Function to build the content address of a request from the model settings and prompt inputs
+def make_key(model, temperature, kind, **inputs):
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "kind": kind,
+        "inputs": _normalize(inputs),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, key):
+        with instrumentation.timed("llm_cache", "lookup") as event, self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                event["outcome"] = "miss"
+                return None
+            connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            connection.commit()
+            self.stats["hits"] += 1
+            event["outcome"] = "hit"
+            return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self.stats["writes"] += 1
+            self._evict(connection)
+            connection.commit()
+
+    # Function to drop least recently used responses until the cache fits in max_bytes
+    def _evict(self, connection):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats["evictions"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            row = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        stats["entries"], stats["bytes"] = row
+        return stats
+
+
+# Shared by every session of the process
+llm_cache = LLMCache()
@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+
+import instrumentation
+from llm_scheduler import scheduler
+
+# Model settings shared by every app; part of the LLM cache key
+MODEL_NAME = "gemini-pro"
+TEMPERATURE = 0.8
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+# Function to get the process-wide model client, created on first use
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from constants import api_key
+                from langchain_google_genai import GoogleGenerativeAI
+
+                # Set up Google API Key
+                os.environ["GOOGLE_API_KEY"] = api_key
+                _llm = GoogleGenerativeAI(model=MODEL_NAME, temperature=TEMPERATURE)
+    return _llm
+
+
+# Function to turn one model response or streamed chunk into text
+def response_text(response):
+    if isinstance(response, str):
+        return response
+    if isinstance(response, dict) and 'text' in response:
+        return response['text']
+    raise ValueError("Unexpected response format from the generative model")
+
+
+# Function to run one prompt through the shared scheduler and return the response text, timed under `name`.
+# `session` identifies the caller for fair queueing between users.
+def complete(llm, prompt, name="completion", session="default"):
+    with instrumentation.timed("llm", name, prompt_chars=len(prompt),
+                               prompt_tokens_approx=instrumentation.approx_tokens(prompt)) as event:
+        text = scheduler.run(("complete", id(llm), prompt), lambda: response_text(llm(prompt)), session)
+        event["response_chars"] = len(text)
+        event["response_tokens_approx"] = instrumentation.approx_tokens(text)
+    return text
+
+
+def _text_chunks(llm, prompt):
+    for chunk in llm.stream(prompt):
+        text = response_text(chunk)
+        if text:
+            yield text
+
+
+# Function to yield the model's tokens as they arrive, unchanged (whitespace included), via the shared scheduler.
+# The whole stream is timed under `name` and the wait for the first chunk under "<name> first chunk".
+def stream_completion(llm, prompt, name="stream", session="default"):
+    started = time.perf_counter()
+    first_chunk = True
+    with instrumentation.timed("llm", name, prompt_chars=len(prompt),
+                               prompt_tokens_approx=instrumentation.approx_tokens(prompt)) as event:
+        response_chars = 0
+        for text in scheduler.stream(("stream", id(llm), prompt), lambda: _text_chunks(llm, prompt), session):
+            if first_chunk:
+                instrumentation.record("llm", f"{name} first chunk", time.perf_counter() - started)
+                first_chunk = False
+            response_chars += len(text)
+            event["response_chars"] = response_chars
+            event["response_tokens_approx"] = (response_chars + 3) // 4
+            yield text
@@ -0,0 +1,305 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+import instrumentation
+
+# Sustained model requests per second, and how many may be sent back to back
+RATE_PER_SECOND = float(os.environ.get("CRUD_LLM_RATE_PER_SECOND", "1.0"))
+BURST = int(os.environ.get("CRUD_LLM_BURST", "5"))
+
+# SQLite file holding the rate limit's tokens, so the app, its job workers and batch runs on this machine stay
+# within RATE_PER_SECOND together; empty keeps a separate limit per process
+RATE_LIMIT_PATH = os.environ.get(
+    "CRUD_LLM_RATE_LIMIT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_rate_limit.sqlite3")
+)
+
+# Upstream calls in flight at once, and callers allowed to wait for one before new ones are turned away
+MAX_CONCURRENCY = int(os.environ.get("CRUD_LLM_MAX_CONCURRENCY", "4"))
+MAX_QUEUED = int(os.environ.get("CRUD_LLM_MAX_QUEUED", "64"))
+
+# Retries of quota / server errors, with full-jitter exponential backoff (seconds)
+MAX_RETRIES = int(os.environ.get("CRUD_LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.environ.get("CRUD_LLM_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.environ.get("CRUD_LLM_BACKOFF_MAX", "30"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+                         "DeadlineExceeded", "BadGateway", "GatewayTimeout"}
+
+
+class SchedulerBusy(RuntimeError):
+    pass
+
+
+# Function to tell quota and transient server errors (worth retrying) from everything else
+def is_retryable(error):
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    for attribute in ("code", "status_code", "status"):
+        value = getattr(error, attribute, None)
+        value = value() if callable(value) else value
+        if isinstance(value, int) and value in RETRYABLE_STATUS_CODES:
+            return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "resource has been exhausted" in message
+
+
+def backoff_delay(attempt):
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    # Function to refill `tokens` up to `now` and take one; returns (tokens left, seconds to wait, 0 if taken)
+    def _refill_and_take(self, tokens, updated, now):
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / self.rate
+
+    def _take(self):
+        with self._lock:
+            now = self.clock()
+            self.tokens, delay = self._refill_and_take(self.tokens, self.updated, now)
+            self.updated = now
+        return delay
+
+    # Function to take one token, sleeping until one is available; returns the seconds waited
+    def acquire(self):
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            self.sleep(delay)
+            waited += delay
+
+
+# Token bucket kept in a SQLite row, shared by every process using the same file. A token is taken in an
+# IMMEDIATE transaction, so two processes never take the same one; the clock is wall time, common to all of them.
+class SharedTokenBucket(TokenBucket):
+    def __init__(self, path, rate, capacity, clock=time.time, sleep=time.sleep):
+        super().__init__(rate, capacity, clock, sleep)
+        self.path = path
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS bucket (id INTEGER PRIMARY KEY CHECK (id = 0),"
+                               " tokens REAL NOT NULL, updated REAL NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO bucket (id, tokens, updated) VALUES (0, ?, ?)",
+                               (float(self.capacity), self.clock()))
+            self._connection = connection
+        return self._connection
+
+    def _take(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, updated = connection.execute("SELECT tokens, updated FROM bucket WHERE id = 0").fetchone()
+                now = self.clock()
+                tokens, delay = self._refill_and_take(tokens, updated, now)
+                connection.execute("UPDATE bucket SET tokens = ?, updated = ? WHERE id = 0", (tokens, now))
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        return delay
+
+
+def make_bucket(rate=RATE_PER_SECOND, burst=BURST, path=RATE_LIMIT_PATH):
+    return SharedTokenBucket(path, rate, burst) if path else TokenBucket(rate, burst)
+
+
+# Chunks of one upstream stream, readable from the start by every caller that shares it
+class _SharedStream:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._condition = threading.Condition()
+
+    def append(self, chunk):
+        with self._condition:
+            self.chunks.append(chunk)
+            self._condition.notify_all()
+
+    def finish(self, error=None):
+        with self._condition:
+            self.done = True
+            self.error = error
+            self._condition.notify_all()
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self.chunks) and not self.done:
+                    self._condition.wait()
+                if index >= len(self.chunks):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                chunk = self.chunks[index]
+            index += 1
+            yield chunk
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Gate in front of the model: rate limit (shared with the other processes, see RATE_LIMIT_PATH), and within
+# this process a fair queue across sessions, retries and single-flight coalescing of identical prompts
+class LLMScheduler:
+    def __init__(self, rate=RATE_PER_SECOND, burst=BURST, max_concurrency=MAX_CONCURRENCY, max_queued=MAX_QUEUED,
+                 max_retries=MAX_RETRIES, bucket=None, sleep=time.sleep):
+        self.bucket = bucket or make_bucket(rate, burst)
+        self.sleep = sleep
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.max_retries = max_retries
+        self.stats = {"calls": 0, "coalesced": 0, "retries": 0, "rejected": 0, "queue_wait": 0.0}
+        self._condition = threading.Condition()
+        self._waiting = OrderedDict()   # session -> deque of tickets, in round-robin order
+        self._queued = 0
+        self._running = 0
+        self._inflight = {}             # coalescing key -> _Call or _SharedStream
+        self._inflight_lock = threading.Lock()
+
+    # Function to wait for an upstream slot; sessions take turns, so one session's batch can't starve another
+    def _acquire_slot(self, session):
+        ticket = object()
+        started = time.perf_counter()
+        with self._condition:
+            if self._queued >= self.max_queued:
+                self.stats["rejected"] += 1
+                raise SchedulerBusy("Too many model requests are queued; please try again shortly.")
+            self._waiting.setdefault(session, deque()).append(ticket)
+            self._queued += 1
+            while not (self._running < self.max_concurrency and self._next_ticket() is ticket):
+                self._condition.wait()
+            tickets = self._waiting.pop(session)
+            tickets.popleft()
+            if tickets:
+                # Back of the line for this session's next request
+                self._waiting[session] = tickets
+            self._queued -= 1
+            self._running += 1
+            self._condition.notify_all()
+        waited = time.perf_counter() - started + self.bucket.acquire()
+        self._count("queue_wait", waited)
+        instrumentation.record("llm", "queue wait", waited)
+
+    def _next_ticket(self):
+        for tickets in self._waiting.values():
+            return tickets[0]
+        return None
+
+    def _release_slot(self):
+        with self._condition:
+            self._running -= 1
+            self._condition.notify_all()
+
+    def _count(self, name, amount=1):
+        with self._condition:
+            self.stats[name] += amount
+
+    # Function to call upstream in a slot, retrying quota / server errors while `can_retry()` allows it
+    def _with_retries(self, session, call, can_retry=lambda: True):
+        attempt = 0
+        while True:
+            self._acquire_slot(session)
+            try:
+                self._count("calls")
+                return call()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e) or not can_retry():
+                    raise
+            finally:
+                self._release_slot()
+            self._count("retries")
+            self.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def _join(self, key, factory):
+        with self._inflight_lock:
+            shared = self._inflight.get(key)
+            if shared is not None:
+                self._count("coalesced")
+                return shared, False
+            shared = self._inflight[key] = factory()
+            return shared, True
+
+    def _leave(self, key):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+
+    # Function to run one request; identical requests already in flight share its result
+    def run(self, key, call, session="default"):
+        shared, leader = self._join(key, _Call)
+        if not leader:
+            shared.event.wait()
+            if shared.error is not None:
+                raise shared.error
+            return shared.result
+        try:
+            shared.result = self._with_retries(session, call)
+        except Exception as e:
+            shared.error = e
+            raise
+        finally:
+            self._leave(key)
+            shared.event.set()
+        return shared.result
+
+    # Function to stream one request; identical streams already in flight are replayed and followed.
+    # `open_stream` returns an iterator of text chunks. A stream is retried only before its first chunk.
+    def stream(self, key, open_stream, session="default"):
+        shared, leader = self._join(key, _SharedStream)
+        if leader:
+            threading.Thread(target=self._pump, args=(key, shared, open_stream, session), daemon=True).start()
+        return iter(shared)
+
+    def _pump(self, key, shared, open_stream, session):
+        def read_all():
+            for chunk in open_stream():
+                shared.append(chunk)
+
+        error = None
+        try:
+            # Once chunks have gone out a retry would repeat them, so only an empty stream is retried
+            self._with_retries(session, read_all, can_retry=lambda: not shared.chunks)
+        except Exception as e:
+            error = e
+        self._leave(key)
+        shared.finish(error)
+
+    def get_stats(self):
+        with self._condition:
+            stats = dict(self.stats, queued=self._queued, running=self._running)
+        stats["queue_wait"] = round(stats["queue_wait"], 2)
+        return stats
+
+
+# Shared by every session of the process
+scheduler = LLMScheduler()
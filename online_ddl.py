@@ -0,0 +1,153 @@
+import os
+import re
+
+import datasource
+
+# Tables larger than this (data + indexes, bytes) are never altered with a copying ALTER TABLE
+COPY_LIMIT_BYTES = int(os.environ.get("CRUD_DDL_COPY_LIMIT_BYTES", str(256 * 1024 * 1024)))
+
+# Tables with more rows than this get a warning before a rebuild or copy
+WARN_ROWS = int(os.environ.get("CRUD_DDL_WARN_ROWS", "1000000"))
+
+# MySQL errors meaning "this ALGORITHM/LOCK can't be used for this change"
+ALGORITHM_NOT_SUPPORTED_ERRNOS = {
+    1800,   # ER_UNKNOWN_ALTER_ALGORITHM (e.g. INSTANT before 8.0)
+    1845,   # ER_ALTER_OPERATION_NOT_SUPPORTED
+    1846,   # ER_ALTER_OPERATION_NOT_SUPPORTED_REASON
+}
+
+# MySQL before 8.0 rejects RENAME COLUMN with a parse error; CHANGE does the same rename there, but needs the
+# column's whole definition restated
+RENAME_COLUMN_UNSUPPORTED_ERRNO = 1064
+
+# Online attempts, cheapest first
+ONLINE_ALGORITHMS = ["ALGORITHM=INSTANT", "ALGORITHM=INPLACE, LOCK=NONE"]
+
+TABLE_SIZE_SQL = """
+    SELECT TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+"""
+
+
+class DDLRefused(Exception):
+    pass
+
+
+_COLUMN_LINE = re.compile(r"^\s*`((?:[^`]|``)+)`\s+(.*?),?\s*$")
+
+
+# Function to read each column's definition, as the server prints it, from SHOW CREATE TABLE output:
+# {"ename": "varchar(50) COLLATE utf8mb4_bin NOT NULL DEFAULT 'x' COMMENT 'Name'", ...}
+def column_definitions(create_table_sql):
+    definitions = {}
+    for line in create_table_sql.split("\n")[1:]:
+        match = _COLUMN_LINE.match(line)
+        # Column lines start with the quoted name; keys and constraints don't
+        if match:
+            definitions[match.group(1).replace("``", "`")] = match.group(2)
+    return definitions
+
+
+def change_column_clause(old_column_name, new_column_name, definition):
+    return f"CHANGE {old_column_name} {new_column_name} {definition}"
+
+
+# Function to restate the RENAME COLUMN clauses of a change as CHANGE clauses. The definitions come from
+# SHOW CREATE TABLE, so type, character set, collation, default, comment and generation expression are kept
+# and the rename doesn't turn into a definition change.
+def rename_clauses_as_change(cursor, table_name, clauses):
+    cursor.execute(f"SHOW CREATE TABLE {table_name}")
+    create_table_sql = cursor.fetchone()[1]
+    if isinstance(create_table_sql, (bytes, bytearray)):
+        create_table_sql = create_table_sql.decode("utf-8")
+    definitions = column_definitions(create_table_sql)
+    changed = []
+    for clause in clauses:
+        words = clause.split()
+        if words[:2] == ["RENAME", "COLUMN"]:
+            old_column_name, new_column_name = words[2], words[4]
+            if old_column_name not in definitions:
+                raise ValueError(f"Column '{old_column_name}' doesn't exist in '{table_name}' yet; "
+                                 f"apply the change that adds it first.")
+            clause = change_column_clause(old_column_name, new_column_name, definitions[old_column_name])
+        changed.append(clause)
+    return changed
+
+
+# Function to estimate the cheapest algorithm MySQL can use for one clause
+def classify_clause(clause):
+    words = clause.upper().split()
+    if words[:2] == ["RENAME", "COLUMN"]:
+        return "instant"
+    if words[0] == "ADD":
+        # A new primary key forces a rebuild
+        return "inplace" if "PRIMARY" in words else "instant"
+    if words[:2] == ["DROP", "COLUMN"]:
+        # INSTANT from 8.0.29, an in-place rebuild before that
+        return "instant"
+    # CHANGE / MODIFY may change the column type, which needs a full table copy
+    return "copy"
+
+
+def plan_algorithm(clauses):
+    kinds = {classify_clause(clause) for clause in clauses}
+    for kind in ("copy", "inplace", "instant"):
+        if kind in kinds:
+            return kind
+
+
+def fetch_table_size(cursor, table_name):
+    cursor.execute(TABLE_SIZE_SQL, (datasource.DATABASE, table_name))
+    row = cursor.fetchone()
+    if row is None:
+        return {"rows": 0, "bytes": 0}
+    rows, data_length, index_length = row
+    return {"rows": rows or 0, "bytes": (data_length or 0) + (index_length or 0)}
+
+
+# Function to check the table size before a change and refuse copies of large tables; `plan` overrides the
+# estimate when the caller knows better (a CHANGE that only renames a column)
+def preflight(cursor, table_name, clauses, plan=None):
+    size = fetch_table_size(cursor, table_name)
+    plan = plan or plan_algorithm(clauses)
+    warnings = []
+    if plan == "copy":
+        _check_copy_allowed(table_name, size)
+        warnings.append(f"'{table_name}' will be copied to apply this change ({size['rows']} rows).")
+    elif plan == "inplace" and size["rows"] > WARN_ROWS:
+        warnings.append(f"'{table_name}' will be rebuilt in place ({size['rows']} rows); reads and writes continue.")
+    return size, plan, warnings
+
+
+def _check_copy_allowed(table_name, size):
+    if size["bytes"] > COPY_LIMIT_BYTES:
+        raise DDLRefused(
+            f"Refusing to copy '{table_name}' ({size['bytes'] // (1024 * 1024)} MB, {size['rows']} rows): "
+            f"the change needs ALGORITHM=COPY and the table is above the {COPY_LIMIT_BYTES // (1024 * 1024)} MB limit."
+        )
+
+
+# Function to run an ALTER TABLE with the cheapest algorithm the server accepts.
+# Returns (algorithm used, warnings).
+def execute_online_alter(cursor, table_name, clauses, plan=None):
+    size, plan, warnings = preflight(cursor, table_name, clauses, plan)
+    statement = f"ALTER TABLE {table_name} {', '.join(clauses)}"
+
+    if plan != "copy":
+        for algorithm in ONLINE_ALGORITHMS:
+            if plan == "inplace" and algorithm == "ALGORITHM=INSTANT":
+                continue
+            try:
+                cursor.execute(f"{statement}, {algorithm};")
+                return algorithm, warnings
+            except datasource.Error as e:
+                if getattr(e, "errno", None) not in ALGORITHM_NOT_SUPPORTED_ERRNOS:
+                    raise
+
+    # Only a copying ALTER is left; the size limit applies whatever the clauses looked like
+    _check_copy_allowed(table_name, size)
+    if plan != "copy":
+        warnings.append(f"The server couldn't apply this change online; '{table_name}' was copied.")
+    cursor.execute(f"{statement}, ALGORITHM=COPY;")
+    return "ALGORITHM=COPY", warnings
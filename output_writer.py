@@ -0,0 +1,133 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+import instrumentation
+from json_store import locked, read_json, write_json
+
+# Stored under the output base directory: content hash of every published file and what the last publish changed
+OUTPUT_MANIFEST = ".crud_output_manifest.json"
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return content_hash(f.read())
+    except FileNotFoundError:
+        return None
+
+
+# Function to keep the current bytes of `path` under `backup_path` (a hard link where the filesystem allows
+# it, a copy otherwise); returns None when there is no file to keep
+def _backup(path, backup_path):
+    if not os.path.exists(path):
+        return None
+    try:
+        os.link(path, backup_path)
+    except OSError:
+        shutil.copy2(path, backup_path)
+    return backup_path
+
+
+def _remove_quietly(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# Collects the generated files of a run and publishes them together: files whose bytes are unchanged are
+# left alone (mtime included), the rest are written to temp files first and only then renamed into place,
+# with the replaced files backed up until every rename has succeeded.
+class BulkWriter:
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.manifest_path = os.path.join(base_dir, OUTPUT_MANIFEST)
+        self.written = []
+        self.unchanged = []
+        self._staged = {}   # path -> (bytes, group, on_publish callbacks)
+        self._lock = threading.Lock()
+
+    def stage(self, path, content, group=None, on_publish=None):
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        with self._lock:
+            self._staged[path] = (data, group, [on_publish] if on_publish else [])
+
+    # Function to publish the staged files (only those of `group` when given).
+    # Returns {"written": [...], "unchanged": [...]} for this publish.
+    def publish(self, group=None):
+        with self._lock:
+            paths = [path for path, (_, staged_group, _) in self._staged.items() if group is None or staged_group == group]
+            entries = {path: self._staged.pop(path) for path in paths}
+
+        hashes = {path: content_hash(data) for path, (data, _, _) in entries.items()}
+        changed = [path for path in entries if file_hash(path) != hashes[path]]
+        with instrumentation.timed("file", "publish", files=len(changed),
+                                   bytes=sum(len(entries[path][0]) for path in changed)):
+            self._write_all(changed, entries)
+
+        for _, _, callbacks in entries.values():
+            for callback in callbacks:
+                callback()
+
+        result = {"written": sorted(changed), "unchanged": sorted(set(entries) - set(changed))}
+        with self._lock:
+            self.written += result["written"]
+            self.unchanged += result["unchanged"]
+        self._update_manifest(hashes, result)
+        return result
+
+    # Every changed file is fully written to a temp file before any of them replaces its target, and each
+    # target is hard-linked to a backup before it is replaced; a failure at any point restores the
+    # replaced targets and removes the new ones, so the previous layer set is left in place
+    def _write_all(self, paths, entries):
+        suffix = f"{os.getpid()}.{threading.get_ident()}"
+        temp_paths = {}
+        backups = {}    # path -> backup path, or None when the file is new
+        replaced = []
+        try:
+            for path in paths:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{suffix}.tmp"
+                temp_paths[path] = temp_path
+                with open(temp_path, "wb") as f:
+                    f.write(entries[path][0])
+                    f.flush()
+                    os.fsync(f.fileno())
+            for path in paths:
+                backups[path] = _backup(path, f"{path}.{suffix}.bak")
+            for path, temp_path in temp_paths.items():
+                os.replace(temp_path, path)
+                replaced.append(path)
+        except BaseException:
+            for path in replaced:
+                if backups[path] is None:
+                    os.remove(path)
+                else:
+                    os.replace(backups.pop(path), path)
+            _remove_quietly(list(temp_paths.values()) + [backup for backup in backups.values() if backup])
+            raise
+        _remove_quietly([backup for backup in backups.values() if backup])
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.base_dir).replace(os.sep, "/")
+
+    # Function to merge this publish into the manifest; other processes publishing to the same base
+    # directory (job workers, batch runs) merge theirs under the same file lock
+    def _update_manifest(self, hashes, result):
+        with locked(self.manifest_path):
+            manifest = read_json(self.manifest_path, {})
+            manifest.setdefault("files", {}).update({self._relative(path): digest for path, digest in hashes.items()})
+            manifest["last_publish"] = {
+                "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "written": [self._relative(path) for path in result["written"]],
+                "unchanged": [self._relative(path) for path in result["unchanged"]],
+            }
+            write_json(self.manifest_path, manifest)
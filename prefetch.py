@@ -0,0 +1,166 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from schema_cache import FK_GRAPH_KEY, schema_cache
+from schema_model import get_fk_graph, get_table_info
+
+# Start reading a table's metadata as soon as it is selected, so "Fetch Columns" finds it in the schema cache
+PREFETCH_ENABLED = os.environ.get("CRUD_PREFETCH", "1") == "1"
+
+# Background threads shared by every session for prefetches
+PREFETCH_WORKERS = int(os.environ.get("CRUD_PREFETCH_WORKERS", "2"))
+
+# Separate threads for warm-up model calls, so slow warm-ups never hold up the metadata prefetches
+PREFETCH_WARM_WORKERS = int(os.environ.get("CRUD_PREFETCH_WARM_WORKERS", "2"))
+
+# Also ask the model for the default framework's answer ahead of time (it costs a model call per selection);
+# only selections still current after PREFETCH_WARM_DELAY seconds are warmed
+PREFETCH_WARM = os.environ.get("CRUD_PREFETCH_WARM", "0") == "1"
+PREFETCH_WARM_DELAY = float(os.environ.get("CRUD_PREFETCH_WARM_DELAY", "2.0"))
+PREFETCH_FRAMEWORK = os.environ.get("CRUD_PREFETCH_FRAMEWORK", "Spring Boot")
+
+# Sessions whose last finished prefetch is remembered, so reruns on the same selection don't repeat it
+PREFETCH_MAX_SESSIONS = int(os.environ.get("CRUD_PREFETCH_MAX_SESSIONS", "1000"))
+
+
+class _Request:
+    def __init__(self, session, table):
+        self.session = session
+        self.table = table
+        self.future = None
+        self.warm_timer = None
+        self.superseded = threading.Event()
+        self.loaded = threading.Event()
+
+
+# Per-session speculative prefetch. Each session has at most one current request: selecting another table
+# cancels the previous one if it hasn't started, and skips whatever of it is left (the warm step) if it has.
+# A request is dropped once it has finished; its table is then remembered (for the PREFETCH_MAX_SESSIONS most
+# recent sessions) until the session selects another table or the table's metadata leaves the schema cache.
+class Prefetcher:
+    def __init__(self, workers=PREFETCH_WORKERS, enabled=PREFETCH_ENABLED, warm_enabled=PREFETCH_WARM,
+                 warm_delay=PREFETCH_WARM_DELAY, warm_workers=PREFETCH_WARM_WORKERS):
+        self.enabled = enabled
+        self.warm_enabled = warm_enabled
+        self.warm_delay = warm_delay
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._warm_executor = ThreadPoolExecutor(max_workers=warm_workers, thread_name_prefix="prefetch-warm")
+        self._current = {}              # session -> _Request still queued, loading or warming
+        self._finished = OrderedDict()  # session -> table of its last finished request, least recent first
+        self._lock = threading.Lock()
+        self.stats = {"requested": 0, "cancelled": 0, "superseded": 0, "completed": 0, "failed": 0, "warmed": 0,
+                      "waited": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    # Function to prefetch `table` for `session`; calling it again for the same table (every rerun) is a no-op
+    # while the request is in flight, and after it finished for as long as its results are still cached.
+    # `warm(table_info)` runs after the metadata is loaded when warming is switched on.
+    def prefetch(self, session, table, warm=None, fk_graph=False):
+        if not self.enabled or not table:
+            return
+        with self._lock:
+            previous = self._current.get(session)
+            if previous is not None and previous.table == table:
+                return
+            if previous is None and self._finished.get(session) == table and self._still_cached(table, fk_graph):
+                return
+            request = self._current[session] = _Request(session, table)
+            self.stats["requested"] += 1
+            if previous is not None:
+                previous.superseded.set()
+                if previous.warm_timer is not None:
+                    previous.warm_timer.cancel()
+                if previous.future.cancel():
+                    self.stats["cancelled"] += 1
+            request.future = self._executor.submit(self._run, request, warm if self.warm_enabled else None,
+                                                   fk_graph)
+
+    @staticmethod
+    def _still_cached(table, fk_graph):
+        if schema_cache.peek(("table", table)) is None:
+            return False
+        return not fk_graph or (schema_cache.peek(FK_GRAPH_KEY) is not None and not schema_cache.fk_stale_tables())
+
+    # Function to forget a finished request, unless the session has moved on to another one already; a request
+    # that loaded its table is remembered so the same selection isn't prefetched again
+    def _finish(self, request, loaded=True):
+        with self._lock:
+            if self._current.get(request.session) is not request:
+                return
+            del self._current[request.session]
+            self._finished.pop(request.session, None)
+            if loaded:
+                self._finished[request.session] = request.table
+                while len(self._finished) > PREFETCH_MAX_SESSIONS:
+                    self._finished.popitem(last=False)
+
+    def _run(self, request, warm, fk_graph):
+        if request.superseded.is_set():
+            self._count("superseded")
+            return
+        try:
+            try:
+                with instrumentation.timed("app", "prefetch table"):
+                    table_info = get_table_info(request.table)
+                    if fk_graph:
+                        get_fk_graph()
+            finally:
+                request.loaded.set()
+            self._count("completed")
+        except Exception:
+            # A failed prefetch is only a missed head start; the user's own fetch reports the error
+            self._count("failed")
+            self._finish(request, loaded=False)
+            return
+        if warm is None:
+            self._finish(request)
+            return
+        # A model call can't be taken back once sent, so only a selection the user stayed on is warmed. The
+        # delay runs on a timer rather than a prefetch thread, and the call itself on the warm-up threads.
+        with self._lock:
+            if request.superseded.is_set():
+                return
+            request.warm_timer = threading.Timer(self.warm_delay, self._start_warm, (request, warm, table_info))
+            request.warm_timer.daemon = True
+            request.warm_timer.start()
+
+    def _start_warm(self, request, warm, table_info):
+        if request.superseded.is_set():
+            return
+        self._warm_executor.submit(self._warm, request, warm, table_info)
+
+    def _warm(self, request, warm, table_info):
+        try:
+            if request.superseded.is_set():
+                return
+            with instrumentation.timed("app", "prefetch warm"):
+                warm(table_info)
+            self._count("warmed")
+        except Exception:
+            self._count("failed")
+        finally:
+            self._finish(request)
+
+    # Function to wait (up to `timeout` seconds) for a prefetch of `table` that is already queued or running,
+    # so the user's fetch reads its result from the cache instead of querying the same metadata again
+    def wait(self, session, table, timeout=10.0):
+        with self._lock:
+            request = self._current.get(session)
+        if request is None or request.table != table or request.future.cancelled() or request.loaded.is_set():
+            return
+        self._count("waited")
+        request.loaded.wait(timeout)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, sessions=len(self._current))
+
+
+# Shared by every Streamlit session of the process
+prefetcher = Prefetcher()
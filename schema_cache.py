@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds before a cached schema lookup is re-read from the database
+SCHEMA_CACHE_TTL = float(os.environ.get("CRUD_SCHEMA_CACHE_TTL", "600"))
+
+# Upper bound on cached entries; least recently used entries are dropped first. A full schema read raises it
+# to fit every table of the schema, so this only matters before the first read
+SCHEMA_CACHE_MAX_ENTRIES = int(os.environ.get("CRUD_SCHEMA_CACHE_MAX_ENTRIES", "1024"))
+
+# Key used for the list of tables; per-table keys are (kind, table_name)
+TABLE_LIST_KEY = ("tables", None)
+
+# Key of the schema-wide foreign-key graph; DDL marks the changed table stale in it instead of dropping it,
+# so only that table's edges are re-read
+FK_GRAPH_KEY = ("fk_graph", None)
+
+
+# Process-wide TTL + LRU cache for schema metadata. Keys are (kind, table) tuples so
+# DDL helpers can drop exactly the entries that belong to the table they changed.
+class MetadataCache:
+    def __init__(self, max_entries=SCHEMA_CACHE_MAX_ENTRIES, ttl=SCHEMA_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._fk_stale = {}         # table changed since the FK graph was built -> change number
+        self._fk_changes = 0
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    # Function to read an entry without counting it or refreshing its LRU position (for bulk scans)
+    def peek(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    # Function to make room for at least `entries` entries; the bound only grows (the schema got larger)
+    def reserve(self, entries):
+        with self._lock:
+            self.max_entries = max(self.max_entries, entries)
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    # Function to drop every cached entry for a table and mark it stale in the FK graph; the table list
+    # is only dropped when the set of tables itself changed (CREATE / DROP TABLE)
+    def invalidate_table(self, table_name, table_list=False):
+        with self._lock:
+            stale = [key for key in self._entries if key[1] == table_name]
+            self._fk_changes += 1
+            self._fk_stale[table_name] = self._fk_changes
+            if table_list:
+                stale.append(TABLE_LIST_KEY)
+            for key in stale:
+                if self._entries.pop(key, None) is not None:
+                    self.stats["invalidations"] += 1
+
+    # Function to list the tables changed since the FK graph was built, as {table: change number}
+    def fk_stale_tables(self):
+        with self._lock:
+            return dict(self._fk_stale)
+
+    # Function to forget stale tables once the FK graph has been refreshed (or rebuilt) after `stale`, what
+    # fk_stale_tables returned before the read; a table changed again during the read stays stale
+    def fk_refreshed(self, stale):
+        with self._lock:
+            for table_name, change in stale.items():
+                if self._fk_stale.get(table_name) == change:
+                    del self._fk_stale[table_name]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._fk_stale.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        return stats
+
+
+# Shared by every Streamlit session of the process
+schema_cache = MetadataCache()
@@ -0,0 +1,227 @@
+import threading
+from dataclasses import dataclass, field
+
+from datasource import DATABASE, get_cursor
+from fk_graph import ForeignKeyGraph
+from schema_cache import FK_GRAPH_KEY, TABLE_LIST_KEY, schema_cache
+
+COLUMNS_SQL = """
+    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT, EXTRA
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = %s
+"""
+
+# Every foreign-key constraint with its columns in key order and its ON UPDATE / ON DELETE rules
+FOREIGN_KEYS_SQL = """
+    SELECT k.TABLE_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME, k.CONSTRAINT_NAME,
+           r.UPDATE_RULE, r.DELETE_RULE
+    FROM information_schema.REFERENTIAL_CONSTRAINTS r
+    JOIN information_schema.KEY_COLUMN_USAGE k
+      ON k.CONSTRAINT_SCHEMA = r.CONSTRAINT_SCHEMA
+     AND k.TABLE_NAME = r.TABLE_NAME
+     AND k.CONSTRAINT_NAME = r.CONSTRAINT_NAME
+    WHERE r.CONSTRAINT_SCHEMA = %s
+"""
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    data_type: str          # e.g. varchar
+    column_type: str        # e.g. varchar(255), same as DESCRIBE's Type column
+    nullable: bool
+    is_primary_key: bool
+    default: object = None
+    extra: str = ""
+    is_unique: bool = False     # has a single-column UNIQUE index
+
+
+@dataclass
+class ForeignKey:
+    column: str
+    referenced_table: str
+    referenced_column: str
+    constraint_name: str = ""
+    on_update: str = ""
+    on_delete: str = ""
+
+
+@dataclass
+class TableInfo:
+    name: str
+    columns: list = field(default_factory=list)
+    columns_by_name: dict = field(default_factory=dict)
+    foreign_keys: dict = field(default_factory=dict)   # column name -> ForeignKey
+
+    def add_column(self, column):
+        self.columns.append(column)
+        self.columns_by_name[column.name] = column
+
+    @property
+    def column_names(self):
+        return [column.name for column in self.columns]
+
+    @property
+    def primary_key(self):
+        return [column.name for column in self.columns if column.is_primary_key]
+
+    @property
+    def non_fk_columns(self):
+        return [column.name for column in self.columns if column.name not in self.foreign_keys]
+
+    # Column name -> referenced table, the shape the generator prompts use
+    @property
+    def relationships(self):
+        return {fk.column: fk.referenced_table for fk in self.foreign_keys.values()}
+
+
+# Indexed view of a whole schema: table name -> TableInfo
+class SchemaSnapshot:
+    def __init__(self, database, tables=None):
+        self.database = database
+        self.tables = tables or {}
+
+    @property
+    def table_names(self):
+        return list(self.tables)
+
+    def get_table(self, table_name):
+        return self.tables.get(table_name)
+
+
+def _text(value):
+    # Some connector versions hand back information_schema text columns as bytes
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8")
+    return value
+
+
+# Function to read columns and foreign keys for the whole schema (or one table) in two queries
+def load_schema_snapshot(cursor, database, table_name=None):
+    params = (database, table_name) if table_name else (database,)
+    tables = {}
+
+    cursor.execute(COLUMNS_SQL + (" AND TABLE_NAME = %s" if table_name else "") + " ORDER BY TABLE_NAME, ORDINAL_POSITION",
+                   params)
+    for row in cursor.fetchall():
+        name = _text(row[0])
+        table = tables.get(name)
+        if table is None:
+            table = tables[name] = TableInfo(name)
+        table.add_column(ColumnInfo(
+            name=_text(row[1]),
+            data_type=_text(row[2]).lower(),
+            column_type=_text(row[3]).lower(),
+            nullable=_text(row[4]) == "YES",
+            is_primary_key=_text(row[5]) == "PRI",
+            default=_text(row[6]),
+            extra=_text(row[7]) or "",
+            is_unique=_text(row[5]) == "UNI",
+        ))
+
+    cursor.execute(FOREIGN_KEYS_SQL + (" AND k.TABLE_NAME = %s" if table_name else "")
+                   + " ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION", params)
+    for row in cursor.fetchall():
+        table = tables.get(_text(row[0]))
+        if table is not None:
+            column = _text(row[1])
+            table.foreign_keys[column] = ForeignKey(column, _text(row[2]), _text(row[3]), _text(row[4]),
+                                                    _text(row[5]) or "", _text(row[6]) or "")
+
+    return SchemaSnapshot(database, tables)
+
+
+# Function to read the schema from the configured source: the live database, or a DDL / JSON file held in memory
+def _read_snapshot(table_name=None):
+    from schema_sources import file_source
+
+    source = file_source()
+    if source is not None:
+        snapshot = source.snapshot()
+        if table_name is None:
+            return snapshot
+        table = snapshot.get_table(table_name)
+        return SchemaSnapshot(snapshot.database, {table_name: table} if table is not None else {})
+    with get_cursor() as cursor:
+        return load_schema_snapshot(cursor, DATABASE, table_name)
+
+
+# Full-schema reads are single-flight: callers that miss the cache at the same time share one read
+_full_load_lock = threading.Lock()
+
+
+def _load_full_snapshot():
+    stale = schema_cache.fk_stale_tables()
+    snapshot = _read_snapshot()
+    # One bulk read seeds every per-table entry, so later lookups never hit the database; the cache grows to
+    # hold all of them next to the table list and FK graph, with room for tables created later
+    schema_cache.reserve(2 * len(snapshot.tables) + 2)
+    for name, table in snapshot.tables.items():
+        schema_cache.put(("table", name), table)
+    graph = ForeignKeyGraph.from_snapshot(snapshot)
+    schema_cache.put(FK_GRAPH_KEY, graph)
+    schema_cache.fk_refreshed(stale)
+    return snapshot.table_names, graph
+
+
+def get_table_names():
+    names = schema_cache.get(TABLE_LIST_KEY)
+    if names is None:
+        with _full_load_lock:
+            names = schema_cache.peek(TABLE_LIST_KEY)
+            if names is None:
+                names = _load_full_snapshot()[0]
+                schema_cache.put(TABLE_LIST_KEY, names)
+    return names
+
+
+# Function to get the foreign-key graph of the whole schema; built from the same bulk read as the table list.
+# After DDL only the changed tables are re-read and their edges replaced, so relationship lookups stay
+# in-memory graph queries.
+def get_fk_graph():
+    graph = schema_cache.get(FK_GRAPH_KEY)
+    if graph is not None and not schema_cache.fk_stale_tables():
+        return graph
+    with _full_load_lock:
+        graph = schema_cache.peek(FK_GRAPH_KEY)
+        if graph is None:
+            names, graph = _load_full_snapshot()
+            if schema_cache.peek(TABLE_LIST_KEY) is None:
+                schema_cache.put(TABLE_LIST_KEY, names)
+            return graph
+        stale = schema_cache.fk_stale_tables()
+        if stale:
+            tables = {}
+            for name in stale:
+                # A table that no longer exists (DROP TABLE) loses its edges
+                tables[name] = _read_snapshot(name).get_table(name)
+                if tables[name] is not None:
+                    schema_cache.put(("table", name), tables[name])
+            graph = graph.replace_tables(tables)
+            schema_cache.put(FK_GRAPH_KEY, graph)
+            schema_cache.fk_refreshed(stale)
+    return graph
+
+
+def _load_single_table(table_name):
+    snapshot = _read_snapshot(table_name)
+    table = snapshot.get_table(table_name)
+    if table is None:
+        from mysql.connector.errors import ProgrammingError
+
+        raise ProgrammingError(
+            msg=f"Table '{DATABASE}.{table_name}' doesn't exist", errno=1146
+        )
+    return table
+
+
+# Function to look up one table; only tables invalidated by DDL (or expired) are re-read
+def get_table_info(table_name):
+    table = schema_cache.get(("table", table_name))
+    if table is None and schema_cache.get(TABLE_LIST_KEY) is None:
+        get_table_names()
+        table = schema_cache.get(("table", table_name))
+    if table is None:
+        table = _load_single_table(table_name)
+        schema_cache.put(("table", table_name), table)
+    return table
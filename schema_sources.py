@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+
+from schema_model import ColumnInfo, ForeignKey, SchemaSnapshot, TableInfo
+
+# Where table and column metadata comes from: "mysql" for the live database, or the path of a
+# `mysqldump --no-data` file (.sql) or a JSON snapshot (.json) served from memory
+SCHEMA_SOURCE = os.environ.get("CRUD_SCHEMA_SOURCE", "mysql")
+
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?((?:`[^`]+`|\w+)(?:\.(?:`[^`]+`|\w+))?)\s*\(",
+                           re.IGNORECASE)
+_DATABASE_NAME = re.compile(r"^(?:--.*Database:\s*(\S+)|USE\s+`?(\w+)`?\s*;)", re.IGNORECASE | re.MULTILINE)
+_IDENTIFIER = re.compile(r"`([^`]+)`|(\w+)")
+_FOREIGN_KEY = re.compile(
+    r"(?:CONSTRAINT\s+(`[^`]+`|\w+)\s+)?FOREIGN\s+KEY\s*(?:`[^`]+`|\w+)?\s*\(([^)]*)\)\s*REFERENCES\s+"
+    r"((?:`[^`]+`|\w+)(?:\.(?:`[^`]+`|\w+))?)\s*\(([^)]*)\)", re.IGNORECASE)
+_FK_RULE = re.compile(r"ON\s+(UPDATE|DELETE)\s+(RESTRICT|CASCADE|SET\s+NULL|SET\s+DEFAULT|NO\s+ACTION)", re.IGNORECASE)
+_PRIMARY_KEY = re.compile(r"PRIMARY\s+KEY\s*(?:USING\s+\w+\s*)?\(([^)]*)\)", re.IGNORECASE)
+_UNIQUE_KEY = re.compile(r"(?:CONSTRAINT\s+(?:`[^`]+`|\w+)\s+)?UNIQUE\s+(?:(?:KEY|INDEX)\s+)?(?:(?:`[^`]+`|\w+)\s*)?\(([^)]*)\)",
+                         re.IGNORECASE)
+_INDEX_ITEM = re.compile(r"(?:UNIQUE|KEY|INDEX|FULLTEXT|SPATIAL|CHECK|CONSTRAINT)\b", re.IGNORECASE)
+# Words that end the type part of a column definition
+_TYPE_END = re.compile(r"\s+(?:NOT|NULL|DEFAULT|AUTO_INCREMENT|COMMENT|CHARACTER|CHARSET|COLLATE|GENERATED|AS|"
+                       r"PRIMARY|UNIQUE|KEY|ON|INVISIBLE|VISIBLE|STORAGE|COLUMN_FORMAT|SRID|CHECK|REFERENCES)\b",
+                       re.IGNORECASE)
+_DEFAULT = re.compile(r"\bDEFAULT\s+('(?:[^']|'')*'|\S+)", re.IGNORECASE)
+
+
+# Raised when the configured schema file is missing or can't be parsed; the apps report it like a DB error
+class SchemaSourceError(RuntimeError):
+    pass
+
+
+def _unquote(name):
+    return name.strip().strip("`")
+
+
+def _names(column_list):
+    return [(match.group(1) or match.group(2)) for match in _IDENTIFIER.finditer(column_list)]
+
+
+# Function to split a CREATE TABLE body on top-level commas (not inside parentheses or quotes)
+def _split_items(body):
+    items, depth, quote, start = [], 0, None, 0
+    for index, char in enumerate(body):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            items.append(body[start:index].strip())
+            start = index + 1
+    items.append(body[start:].strip())
+    return [item for item in items if item]
+
+
+# Function to blank out comments (-- and # to the end of the line, /* ... */ including mysqldump's /*!...*/
+# directives) outside quotes, so text in them is never taken for a statement
+def _strip_comments(ddl):
+    parts, quote, index, length = [], None, 0, len(ddl)
+    while index < length:
+        char = ddl[index]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "#" or (ddl.startswith("--", index) and (index + 2 == length or ddl[index + 2].isspace())):
+            end = ddl.find("\n", index)
+            index = length if end < 0 else end
+            continue
+        elif ddl.startswith("/*", index):
+            end = ddl.find("*/", index + 2)
+            index = length if end < 0 else end + 2
+            parts.append(" ")
+            continue
+        parts.append(char)
+        index += 1
+    return "".join(parts)
+
+
+# Function to find the body of a CREATE TABLE, from just after its opening parenthesis to the matching one
+def _table_body(ddl, start):
+    depth, quote = 1, None
+    for index in range(start, len(ddl)):
+        char = ddl[index]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return ddl[start:index], index
+    raise ValueError("Unterminated CREATE TABLE statement")
+
+
+def _parse_column(item):
+    match = re.match(r"(`[^`]+`|\w+)\s+(.*)", item, re.DOTALL)
+    name, definition = _unquote(match.group(1)), " ".join(match.group(2).split())
+    end = _TYPE_END.search(" " + definition)
+    column_type = (definition if end is None else definition[:max(0, end.start() - 1)]).strip().lower()
+    options = definition[len(column_type):].upper()
+    default = _DEFAULT.search(definition[len(column_type):])
+    default = default.group(1) if default else None
+    if default is not None:
+        default = None if default.upper() == "NULL" else default.strip("'").replace("''", "'")
+    is_primary_key = "PRIMARY KEY" in options
+    return ColumnInfo(
+        name=name,
+        data_type=re.match(r"\w+", column_type).group(0),
+        column_type=column_type,
+        nullable="NOT NULL" not in options and not is_primary_key,
+        is_primary_key=is_primary_key,
+        default=default,
+        extra="auto_increment" if "AUTO_INCREMENT" in options else (
+            "on update current_timestamp" if "ON UPDATE" in options else ""
+        ),
+        is_unique=bool(re.search(r"\bUNIQUE\b", options)),
+    )
+
+
+# Function to parse the CREATE TABLE statements of a DDL dump into the same model the live database gives
+def parse_ddl(ddl, database=None):
+    if database is None:
+        match = _DATABASE_NAME.search(ddl)
+        database = (match.group(1) or match.group(2)) if match else ""
+    ddl = _strip_comments(ddl)
+    tables = {}
+    position = 0
+    while True:
+        match = _CREATE_TABLE.search(ddl, position)
+        if match is None:
+            break
+        body, position = _table_body(ddl, match.end())
+        table = TableInfo(_unquote(match.group(1).split(".")[-1]))
+        primary_key, unique_columns, unnamed_constraints = [], [], 0
+        for item in _split_items(body):
+            foreign_key = _FOREIGN_KEY.search(item)
+            if foreign_key:
+                columns, referenced_columns = _names(foreign_key.group(2)), _names(foreign_key.group(4))
+                referenced_table = _unquote(foreign_key.group(3).split(".")[-1])
+                constraint = _unquote(foreign_key.group(1) or "")
+                if not constraint:
+                    # Named the way MySQL names them, so the columns of one constraint stay together
+                    unnamed_constraints += 1
+                    constraint = f"{table.name}_ibfk_{unnamed_constraints}"
+                rules = {action.upper(): " ".join(rule.upper().split()) for action, rule in _FK_RULE.findall(item)}
+                for column, referenced_column in zip(columns, referenced_columns):
+                    table.foreign_keys[column] = ForeignKey(column, referenced_table, referenced_column, constraint,
+                                                            rules.get("UPDATE", ""), rules.get("DELETE", ""))
+            elif _PRIMARY_KEY.match(item):
+                primary_key += _names(_PRIMARY_KEY.match(item).group(1))
+            elif _UNIQUE_KEY.match(item):
+                names = _names(_UNIQUE_KEY.match(item).group(1))
+                if len(names) == 1:
+                    unique_columns += names
+            elif not _INDEX_ITEM.match(item):
+                table.add_column(_parse_column(item))
+        for name in primary_key:
+            column = table.columns_by_name.get(name)
+            if column is not None:
+                column.is_primary_key = True
+                column.nullable = False
+        for name in unique_columns:
+            column = table.columns_by_name.get(name)
+            if column is not None:
+                column.is_unique = True
+        tables[table.name] = table
+    return SchemaSnapshot(database, tables)
+
+
+def snapshot_to_json(snapshot):
+    return {
+        "database": snapshot.database,
+        "tables": {
+            name: {
+                "columns": [vars(column) for column in table.columns],
+                "foreign_keys": [vars(fk) for fk in table.foreign_keys.values()],
+            }
+            for name, table in snapshot.tables.items()
+        },
+    }
+
+
+def snapshot_from_json(data):
+    tables = {}
+    for name, entry in data.get("tables", {}).items():
+        table = TableInfo(name)
+        for column in entry.get("columns", []):
+            table.add_column(ColumnInfo(**column))
+        for fk in entry.get("foreign_keys", []):
+            table.foreign_keys[fk["column"]] = ForeignKey(**fk)
+        tables[name] = table
+    return SchemaSnapshot(data.get("database", ""), tables)
+
+
+# Schema read from a file once and served from memory; reloaded when the file changes
+class FileSchemaSource:
+    def __init__(self, path):
+        self.path = path
+        self._snapshot = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+            with self._lock:
+                if self._snapshot is None or mtime != self._mtime:
+                    with open(self.path, encoding="utf-8") as f:
+                        if self.path.lower().endswith(".json"):
+                            self._snapshot = snapshot_from_json(json.load(f))
+                        else:
+                            self._snapshot = parse_ddl(f.read())
+                    self._mtime = mtime
+                return self._snapshot
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            raise SchemaSourceError(f"Couldn't read the schema from {self.path}: {e}") from e
+
+    def describe(self):
+        return os.path.basename(self.path)
+
+
+_file_source = None
+_file_source_lock = threading.Lock()
+
+
+# Function to get the configured file source, or None when metadata comes from the live database
+def file_source():
+    global _file_source
+    if SCHEMA_SOURCE == "mysql":
+        return None
+    if _file_source is None:
+        with _file_source_lock:
+            if _file_source is None:
+                _file_source = FileSchemaSource(SCHEMA_SOURCE)
+    return _file_source
+
+
+def describe_source():
+    source = file_source()
+    return "live MySQL" if source is None else source.describe()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the schema as a JSON snapshot usable as CRUD_SCHEMA_SOURCE.")
+    parser.add_argument("output", help="JSON file to write")
+    parser.add_argument("--from-ddl", help="read a mysqldump --no-data file instead of the live database")
+    args = parser.parse_args(argv)
+    if args.from_ddl:
+        with open(args.from_ddl, encoding="utf-8") as f:
+            snapshot = parse_ddl(f.read())
+    else:
+        import datasource
+        from schema_model import load_schema_snapshot
+
+        with datasource.get_cursor() as cursor:
+            snapshot = load_schema_snapshot(cursor, datasource.DATABASE)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(snapshot_to_json(snapshot), f, indent=2, default=str)
+    print(f"{len(snapshot.tables)} tables written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
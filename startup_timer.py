@@ -0,0 +1,58 @@
+import json
+import os
+import threading
+import time
+
+import instrumentation
+
+# JSON-lines log of script run timings, one line per Streamlit run
+STARTUP_LOG = os.environ.get(
+    "CRUD_STARTUP_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".startup_times.jsonl")
+)
+
+# The log is rotated to <log>.1 (replacing the previous one) once it reaches this size, so reruns can't grow it
+# without bound
+STARTUP_LOG_MAX_BYTES = int(os.environ.get("CRUD_STARTUP_LOG_MAX_BYTES", str(1024 * 1024)))
+
+# Time this module was first imported, i.e. roughly when the server process loaded the first app
+PROCESS_STARTED = time.perf_counter()
+
+_apps_started = set()
+_log_lock = threading.Lock()
+
+
+# Times one run of an app script: first paint and the full run, split into cold start and rerun
+class RunTimer:
+    def __init__(self, app_name):
+        self.app_name = app_name
+        self.started = time.perf_counter()
+        self.cold = app_name not in _apps_started
+        _apps_started.add(app_name)
+        self.marks = {}
+
+    def mark(self, name):
+        self.marks[name] = round((time.perf_counter() - self.started) * 1000, 1)
+
+    def finish(self):
+        record = {
+            "app": self.app_name,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "kind": "cold_start" if self.cold else "rerun",
+            "run_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "since_process_start_ms": round((time.perf_counter() - PROCESS_STARTED) * 1000, 1),
+        }
+        record.update({f"{name}_ms": value for name, value in self.marks.items()})
+        instrumentation.record("app", f"{self.app_name} {record['kind']}", record["run_ms"] / 1000)
+        with _log_lock:
+            try:
+                if os.path.getsize(STARTUP_LOG) >= STARTUP_LOG_MAX_BYTES:
+                    os.replace(STARTUP_LOG, STARTUP_LOG + ".1")
+            except OSError:
+                pass
+            with open(STARTUP_LOG, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+
+
+def start_run_timer(app_name):
+    return RunTimer(app_name)
@@ -0,0 +1,161 @@
+import bisect
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import instrumentation
+from schema_cache import schema_cache
+
+# Matches listed per page of the table picker; only one page is ever sent to the browser
+PICKER_PAGE_SIZE = int(os.environ.get("CRUD_TABLE_PICKER_PAGE_SIZE", "25"))
+
+# Searches remembered per index, so paging through the results of a query doesn't search again
+_RECENT_SEARCHES = 32
+
+# Substring queries are answered from an index of 3-character slices; shorter queries match prefixes only
+_GRAM = 3
+
+# Ranks, best first: exact name, name prefix, word prefix ("addr" -> "emp_address"), inside the name, column name
+_EXACT, _PREFIX, _WORD_PREFIX, _SUBSTRING, _METADATA = range(5)
+
+_WORD_START = re.compile(r"(?<=[^0-9A-Za-z])[0-9A-Za-z]|(?<=[a-z])[A-Z]")
+
+
+def _grams(text):
+    return {text[index:index + _GRAM] for index in range(len(text) - _GRAM + 1)}
+
+
+# In-memory search over table names (and optional metadata such as column names or comments):
+# a sorted list of name and word suffixes answers prefix queries by bisection, and a 3-gram
+# index narrows substring queries down to the few tables that can contain them
+class TableIndex:
+    def __init__(self, names, metadata=None):
+        self.names = list(names)
+        self._lower = [name.lower() for name in self.names]
+        self._metadata = [(metadata or {}).get(name, "").lower() for name in self.names]
+
+        prefixes = []
+        for position, name in enumerate(self.names):
+            prefixes.append((self._lower[position], position, _PREFIX))
+            for match in _WORD_START.finditer(name):
+                prefixes.append((self._lower[position][match.start():], position, _WORD_PREFIX))
+        prefixes.sort()
+        self._prefixes = prefixes
+        self._prefix_keys = [key for key, _, _ in prefixes]
+
+        self._gram_index = {}
+        for position, name in enumerate(self._lower):
+            for gram in _grams(f"{name}\n{self._metadata[position]}"):
+                self._gram_index.setdefault(gram, set()).add(position)
+
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    # Function to list every table matching `query`, best matches first
+    def matches(self, query):
+        query = query.strip().lower()
+        if not query:
+            return self.names
+        with self._lock:
+            if query in self._recent:
+                self._recent.move_to_end(query)
+                return self._recent[query]
+
+        ranks = {}
+        start = bisect.bisect_left(self._prefix_keys, query)
+        for key, position, rank in self._prefixes[start:]:
+            if not key.startswith(query):
+                break
+            if key == self._lower[position]:
+                rank = _EXACT if key == query else _PREFIX
+            ranks[position] = min(rank, ranks.get(position, rank))
+
+        if len(query) >= _GRAM:
+            candidates = None
+            for gram in sorted(_grams(query), key=lambda gram: len(self._gram_index.get(gram, ()))):
+                positions = self._gram_index.get(gram, set())
+                candidates = set(positions) if candidates is None else candidates & positions
+                if not candidates:
+                    break
+            for position in candidates or ():
+                if position in ranks:
+                    continue
+                if query in self._lower[position]:
+                    ranks[position] = _SUBSTRING
+                elif query in self._metadata[position]:
+                    ranks[position] = _METADATA
+
+        found = [self.names[position]
+                 for position in sorted(ranks, key=lambda position: (ranks[position], self._lower[position]))]
+        with self._lock:
+            self._recent[query] = found
+            while len(self._recent) > _RECENT_SEARCHES:
+                self._recent.popitem(last=False)
+        return found
+
+    # Function to get one page of matches; returns (names on the page, total number of matches)
+    def search(self, query, page=0, page_size=PICKER_PAGE_SIZE):
+        found = self.matches(query)
+        return found[page * page_size:(page + 1) * page_size], len(found)
+
+
+# Function to collect column names of the tables whose metadata is already cached (never queries the database)
+def cached_column_names(names):
+    metadata = {}
+    for name in names:
+        table = schema_cache.peek(("table", name))
+        if table is not None:
+            metadata[name] = " ".join(table.column_names)
+    return metadata
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+# Function to get the index of a table list. get_table_names() hands out the same list until the
+# schema cache reloads it, so the index is rebuilt only when the list itself is replaced.
+def get_table_index(names):
+    global _index
+    with _index_lock:
+        if _index is None or _index.source is not names:
+            with instrumentation.timed("app", "table index build", tables=len(names)):
+                index = TableIndex(names, cached_column_names(names))
+            index.source = names
+            _index = index
+        return _index
+
+
+# Function to draw a search-as-you-type table picker in a Streamlit container (st, st.sidebar, a column...).
+# Only the current page of matches is rendered, however many tables there are. Returns the chosen table,
+# or None when `empty_option` (e.g. "-select-") is chosen.
+def table_picker(container, label, names, key, empty_option=None):
+    import streamlit as st
+
+    index = get_table_index(names)
+    query = container.text_input(label, key=f"{key}_query", placeholder=f"🔎 Type to search {len(names)} tables")
+    with instrumentation.timed("app", "table search"):
+        found = index.matches(query)
+
+    pages = max(1, -(-len(found) // PICKER_PAGE_SIZE))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = 1
+    page = 1
+    if pages > 1:
+        page = container.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key)
+    options = found[(page - 1) * PICKER_PAGE_SIZE:page * PICKER_PAGE_SIZE]
+
+    if query.strip() and not found:
+        container.caption(f"No table matches '{query.strip()}'.")
+    elif pages > 1 or query.strip():
+        first = (page - 1) * PICKER_PAGE_SIZE
+        container.caption(f"Showing {first + 1}–{first + len(options)} of {len(found)} matching tables")
+    if empty_option is not None:
+        options = [empty_option] + options
+    selected = container.selectbox(label, options, key=key, label_visibility="collapsed")
+    return None if selected == empty_option else selected
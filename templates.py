@@ -0,0 +1,362 @@
+import re
+
+# Layers that are a mechanical function of the column list and can be rendered without the model
+TEMPLATE_LAYERS = ["Repository", "DTO", "Entity"]
+
+# Bump when the rendered output changes so fingerprints pick it up
+TEMPLATE_VERSION = "1"
+
+# MySQL base type -> (Java type, C# type)
+TYPE_MAP = {
+    "int": ("Integer", "int"),
+    "integer": ("Integer", "int"),
+    "mediumint": ("Integer", "int"),
+    "smallint": ("Short", "short"),
+    "tinyint": ("Byte", "byte"),
+    "bigint": ("Long", "long"),
+    "bit": ("Boolean", "bool"),
+    "bool": ("Boolean", "bool"),
+    "boolean": ("Boolean", "bool"),
+    "decimal": ("BigDecimal", "decimal"),
+    "numeric": ("BigDecimal", "decimal"),
+    "float": ("Float", "float"),
+    "double": ("Double", "double"),
+    "real": ("Double", "double"),
+    "char": ("String", "string"),
+    "varchar": ("String", "string"),
+    "tinytext": ("String", "string"),
+    "text": ("String", "string"),
+    "mediumtext": ("String", "string"),
+    "longtext": ("String", "string"),
+    "enum": ("String", "string"),
+    "set": ("String", "string"),
+    "json": ("String", "string"),
+    "date": ("LocalDate", "DateTime"),
+    "datetime": ("LocalDateTime", "DateTime"),
+    "timestamp": ("LocalDateTime", "DateTime"),
+    "time": ("LocalTime", "TimeSpan"),
+    "year": ("Integer", "int"),
+    "binary": ("byte[]", "byte[]"),
+    "varbinary": ("byte[]", "byte[]"),
+    "blob": ("byte[]", "byte[]"),
+    "tinyblob": ("byte[]", "byte[]"),
+    "mediumblob": ("byte[]", "byte[]"),
+    "longblob": ("byte[]", "byte[]"),
+}
+
+JAVA_IMPORTS = {
+    "BigDecimal": "java.math.BigDecimal",
+    "LocalDate": "java.time.LocalDate",
+    "LocalDateTime": "java.time.LocalDateTime",
+    "LocalTime": "java.time.LocalTime",
+}
+
+# C# types that need a trailing ? to be nullable
+CSHARP_VALUE_TYPES = {"int", "short", "byte", "long", "bool", "decimal", "float", "double", "DateTime", "TimeSpan"}
+
+
+# Function to split a MySQL column type like "decimal(10,2) unsigned" into ("decimal", ["10", "2"])
+def parse_column_type(column_type):
+    match = re.match(r"\s*([a-z]+)\s*(?:\(([^)]*)\))?", column_type.lower())
+    if not match:
+        return column_type.lower(), []
+    arguments = [argument.strip() for argument in (match.group(2) or "").split(",") if argument.strip()]
+    return match.group(1), arguments
+
+
+def java_type(column):
+    base, arguments = parse_column_type(column.column_type)
+    # BOOLEAN columns are stored as tinyint(1)
+    if base == "tinyint" and arguments == ["1"]:
+        return "Boolean"
+    return TYPE_MAP.get(base, ("String", "string"))[0]
+
+
+def csharp_type(column):
+    base, arguments = parse_column_type(column.column_type)
+    if base == "tinyint" and arguments == ["1"]:
+        name = "bool"
+    else:
+        name = TYPE_MAP.get(base, ("String", "string"))[1]
+    if column.nullable and name in CSHARP_VALUE_TYPES and not column.is_primary_key:
+        name += "?"
+    return name
+
+
+def camel_case(name):
+    parts = [part for part in re.split(r"[_\W]+", name) if part]
+    if not parts:
+        return name
+    return parts[0][:1].lower() + parts[0][1:] + "".join(part[:1].upper() + part[1:] for part in parts[1:])
+
+
+def pascal_case(name):
+    camel = camel_case(name)
+    return camel[:1].upper() + camel[1:]
+
+
+# Function to derive the Java base package from an output directory such as .../src/main/java/com/ty
+def base_package(base_dir):
+    parts = [part for part in re.split(r"[\\/]+", base_dir) if part]
+    if "java" in parts:
+        package_parts = parts[len(parts) - parts[::-1].index("java"):]
+        if package_parts:
+            return ".".join(package_parts)
+    return "com.example"
+
+
+def _template_columns(table_info):
+    # Same column set the model is given: foreign key columns are left out
+    return [column for column in table_info.columns if column.name not in table_info.foreign_keys]
+
+
+def _primary_key(table_info):
+    for column in table_info.columns:
+        if column.is_primary_key:
+            return column
+    return None
+
+
+def _java_imports(columns):
+    return sorted({JAVA_IMPORTS[java_type(column)] for column in columns if java_type(column) in JAVA_IMPORTS})
+
+
+def _java_accessors(columns):
+    lines = []
+    for column in columns:
+        field, field_type = camel_case(column.name), java_type(column)
+        lines += [
+            "",
+            f"    public {field_type} get{pascal_case(column.name)}() {{",
+            f"        return {field};",
+            "    }",
+            "",
+            f"    public void set{pascal_case(column.name)}({field_type} {field}) {{",
+            f"        this.{field} = {field};",
+            "    }",
+        ]
+    return lines
+
+
+def _java_column_annotation(column):
+    base, arguments = parse_column_type(column.column_type)
+    attributes = [f'name = "{column.name}"']
+    if not column.nullable:
+        attributes.append("nullable = false")
+    if base in ("varchar", "char") and arguments:
+        attributes.append(f"length = {arguments[0]}")
+    if base in ("decimal", "numeric") and arguments:
+        attributes.append(f"precision = {arguments[0]}")
+        if len(arguments) > 1:
+            attributes.append(f"scale = {arguments[1]}")
+    return f"    @Column({', '.join(attributes)})"
+
+
+def render_java_entity(class_name, table_info, package):
+    columns = _template_columns(table_info)
+    lines = [f"package {package}.entity;", "", "import jakarta.persistence.*;"]
+    lines += [f"import {name};" for name in _java_imports(columns)]
+    lines += ["", "@Entity", f'@Table(name = "{table_info.name}")', f"public class {class_name}Entity {{"]
+    for column in columns:
+        lines.append("")
+        if column.is_primary_key:
+            lines.append("    @Id")
+            if "auto_increment" in column.extra.lower():
+                lines.append("    @GeneratedValue(strategy = GenerationType.IDENTITY)")
+        lines.append(_java_column_annotation(column))
+        lines.append(f"    private {java_type(column)} {camel_case(column.name)};")
+    lines += _java_accessors(columns)
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def render_java_dto(class_name, table_info, package):
+    columns = _template_columns(table_info)
+    lines = [f"package {package}.dto;", ""]
+    imports = _java_imports(columns)
+    if imports:
+        lines += [f"import {name};" for name in imports] + [""]
+    lines.append(f"public class {class_name}DTO {{")
+    lines += [""] + [f"    private {java_type(column)} {camel_case(column.name)};" for column in columns]
+    lines += _java_accessors(columns)
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def render_java_repository(class_name, table_info, package):
+    primary_key = _primary_key(table_info)
+    id_type = java_type(primary_key) if primary_key else "Long"
+    lines = [
+        f"package {package}.repository;",
+        "",
+        "import org.springframework.data.jpa.repository.JpaRepository;",
+        "import org.springframework.stereotype.Repository;",
+        f"import {package}.entity.{class_name}Entity;",
+    ]
+    if id_type in JAVA_IMPORTS:
+        lines.append(f"import {JAVA_IMPORTS[id_type]};")
+    lines += [
+        "",
+        "@Repository",
+        f"public interface {class_name}Repository extends JpaRepository<{class_name}Entity, {id_type}> {{",
+        "}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _csharp_namespace(package):
+    return ".".join(pascal_case(part) for part in package.split("."))
+
+
+def _csharp_properties(columns, with_attributes):
+    lines = []
+    for column in columns:
+        if with_attributes:
+            base, arguments = parse_column_type(column.column_type)
+            if column.is_primary_key:
+                lines.append("        [Key]")
+                if "auto_increment" in column.extra.lower():
+                    lines.append("        [DatabaseGenerated(DatabaseGeneratedOption.Identity)]")
+            if not column.nullable and not column.is_primary_key:
+                lines.append("        [Required]")
+            if base in ("varchar", "char") and arguments:
+                lines.append(f"        [MaxLength({arguments[0]})]")
+            if base in ("decimal", "numeric"):
+                lines.append(f'        [Column("{column.name}", TypeName = "{column.column_type}")]')
+            else:
+                lines.append(f'        [Column("{column.name}")]')
+        property_type = csharp_type(column)
+        initializer = " = string.Empty;" if property_type == "string" and not column.nullable else ""
+        if property_type == "string" and column.nullable:
+            property_type = "string?"
+        lines.append(f"        public {property_type} {pascal_case(column.name)} {{ get; set; }}{initializer}")
+        if with_attributes:
+            lines.append("")
+    if with_attributes and lines:
+        lines.pop()
+    return lines
+
+
+def render_csharp_entity(class_name, table_info, package):
+    lines = [
+        "using System;",
+        "using System.ComponentModel.DataAnnotations;",
+        "using System.ComponentModel.DataAnnotations.Schema;",
+        "",
+        f"namespace {_csharp_namespace(package)}.Entity",
+        "{",
+        f'    [Table("{table_info.name}")]',
+        f"    public class {class_name}Entity",
+        "    {",
+    ]
+    lines += _csharp_properties(_template_columns(table_info), with_attributes=True)
+    lines += ["    }", "}"]
+    return "\n".join(lines) + "\n"
+
+
+def render_csharp_dto(class_name, table_info, package):
+    lines = [
+        "using System;",
+        "",
+        f"namespace {_csharp_namespace(package)}.DTO",
+        "{",
+        f"    public class {class_name}DTO",
+        "    {",
+    ]
+    lines += _csharp_properties(_template_columns(table_info), with_attributes=False)
+    lines += ["    }", "}"]
+    return "\n".join(lines) + "\n"
+
+
+def render_csharp_repository(class_name, table_info, package):
+    namespace = _csharp_namespace(package)
+    primary_key = _primary_key(table_info)
+    id_type = csharp_type(primary_key).rstrip("?") if primary_key else "long"
+    entity = f"{class_name}Entity"
+    return "\n".join([
+        "using System.Collections.Generic;",
+        "using System.Threading.Tasks;",
+        "using Microsoft.EntityFrameworkCore;",
+        f"using {namespace}.Entity;",
+        "",
+        f"namespace {namespace}.Repository",
+        "{",
+        f"    public interface I{class_name}Repository",
+        "    {",
+        f"        Task<List<{entity}>> GetAllAsync();",
+        f"        Task<{entity}?> GetByIdAsync({id_type} id);",
+        f"        Task<{entity}> AddAsync({entity} entity);",
+        f"        Task UpdateAsync({entity} entity);",
+        f"        Task DeleteAsync({id_type} id);",
+        "    }",
+        "",
+        f"    public class {class_name}Repository : I{class_name}Repository",
+        "    {",
+        "        private readonly DbContext _context;",
+        "",
+        f"        public {class_name}Repository(DbContext context)",
+        "        {",
+        "            _context = context;",
+        "        }",
+        "",
+        f"        public Task<List<{entity}>> GetAllAsync() => _context.Set<{entity}>().ToListAsync();",
+        "",
+        f"        public async Task<{entity}?> GetByIdAsync({id_type} id) => await _context.Set<{entity}>().FindAsync(id);",
+        "",
+        f"        public async Task<{entity}> AddAsync({entity} entity)",
+        "        {",
+        f"            _context.Set<{entity}>().Add(entity);",
+        "            await _context.SaveChangesAsync();",
+        "            return entity;",
+        "        }",
+        "",
+        f"        public async Task UpdateAsync({entity} entity)",
+        "        {",
+        f"            _context.Set<{entity}>().Update(entity);",
+        "            await _context.SaveChangesAsync();",
+        "        }",
+        "",
+        f"        public async Task DeleteAsync({id_type} id)",
+        "        {",
+        f"            var entity = await _context.Set<{entity}>().FindAsync(id);",
+        "            if (entity != null)",
+        "            {",
+        f"                _context.Set<{entity}>().Remove(entity);",
+        "                await _context.SaveChangesAsync();",
+        "            }",
+        "        }",
+        "    }",
+        "}",
+    ]) + "\n"
+
+
+RENDERERS = {
+    ("Spring Boot", "Entity"): render_java_entity,
+    ("Spring Boot", "DTO"): render_java_dto,
+    ("Spring Boot", "Repository"): render_java_repository,
+    (".NET Core", "Entity"): render_csharp_entity,
+    (".NET Core", "DTO"): render_csharp_dto,
+    (".NET Core", "Repository"): render_csharp_repository,
+}
+
+
+# The templates map a table to an entity with a single @Id / [Key] property. Tables without a key, with a
+# composite key (needing an @IdClass / HasKey) or with a key column that is also a foreign key (left out of the
+# columns) are left to the model.
+def has_simple_primary_key(table_info):
+    return len(table_info.primary_key) == 1 and table_info.primary_key[0] not in table_info.foreign_keys
+
+
+# Function to check whether a layer can be rendered from a template, for this table when one is given
+def can_render(layer, framework, table_info=None):
+    if table_info is not None and not has_simple_primary_key(table_info):
+        return False
+    return (framework, layer) in RENDERERS
+
+
+# Function to render a boilerplate layer locally from the table's columns, without a model call
+def render_layer(layer, class_name, table_info, framework, base_dir):
+    renderer = RENDERERS.get((framework, layer))
+    if renderer is None:
+        raise ValueError(f"No template for the {layer} layer in {framework}")
+    return renderer(class_name, table_info, base_package(base_dir))
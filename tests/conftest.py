@@ -0,0 +1,19 @@
+import os
+import sys
+import types
+
+# The modules live at the top of the repository; no metrics files are written while testing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CRUD_METRICS_EXPORT_INTERVAL", "0")
+
+# constants.py holds the deployment's credentials and isn't part of the repository; the tests never connect,
+# they only need datasource to import
+try:
+    import constants  # noqa: F401
+except ImportError:
+    constants = types.ModuleType("constants")
+    constants.api_key = "test"
+    constants.spring_datasource_url = "jdbc:mysql://localhost:3306/test_db?useSSL=false"
+    constants.spring_datasource_username = "test"
+    constants.spring_datasource_password = "test"
+    sys.modules["constants"] = constants
@@ -0,0 +1,67 @@
+-- MySQL dump 10.13  Distrib 8.0.36, for Linux (x86_64)
+--
+-- Host: localhost    Database: hr
+-- ------------------------------------------------------
+-- Server version	8.0.36
+
+/*!40101 SET @OLD_CHARACTER_SET_CLIENT=@@CHARACTER_SET_CLIENT */;
+/*!50503 SET NAMES utf8mb4 */;
+/*!40014 SET @OLD_FOREIGN_KEY_CHECKS=@@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS=0 */;
+
+--
+-- Table structure for table `dept`
+--
+
+DROP TABLE IF EXISTS `dept`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `dept` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(100) COLLATE utf8mb4_bin NOT NULL COMMENT 'Dept''s name, e.g. "R&D (north)"',
+  `budget` decimal(12,2) DEFAULT '0.00',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_dept_name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+-- An old layout, kept for reference: CREATE TABLE legacy_emp (id int)
+/* CREATE TABLE scratch (id int) */
+
+--
+-- Table structure for table `emp`
+--
+
+CREATE TABLE `emp` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `first name` varchar(50) NOT NULL DEFAULT 'n/a',
+  `dept_id` int DEFAULT NULL,
+  `manager_id` int DEFAULT NULL,
+  `active` tinyint(1) NOT NULL DEFAULT '1',
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `fk_emp_dept` (`dept_id`),
+  KEY `fk_emp_manager` (`manager_id`),
+  CONSTRAINT `fk_emp_dept` FOREIGN KEY (`dept_id`) REFERENCES `dept` (`id`) ON DELETE SET NULL ON UPDATE CASCADE,
+  CONSTRAINT `fk_emp_manager` FOREIGN KEY (`manager_id`) REFERENCES `emp` (`id`),
+  CONSTRAINT `chk_emp_active` CHECK ((`active` in (0,1)))
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+--
+-- Table structure for table `emp_project`
+--
+
+CREATE TABLE IF NOT EXISTS hr.emp_project (
+  emp_id INT NOT NULL,
+  project_code CHAR(8) NOT NULL,
+  role ENUM('lead','member') DEFAULT 'member',
+  PRIMARY KEY (emp_id, project_code),
+  FOREIGN KEY (emp_id) REFERENCES emp (id) ON DELETE CASCADE
+);
+
+CREATE TABLE `project` (
+  `code` char(8) PRIMARY KEY,
+  `title` varchar(200) UNIQUE
+);
+/*!40014 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS */;
+
+-- Dump completed on 2024-05-01 10:00:00
@@ -0,0 +1,101 @@
+import pytest
+
+from code_validator import check_code, language_for
+
+JAVA_ENTITY = '''package com.ty.entity;
+
+import jakarta.persistence.*;
+
+// Employee's record; the "dept" column isn't mapped here {
+@Entity
+@Table(name = "emp")
+public class EmpEntity
+        implements java.io.Serializable {
+
+    @Id
+    @GeneratedValue(strategy = GenerationType.IDENTITY)
+    private Integer id;
+
+    private String pattern = "}{)";
+    private char quote = '\\'';
+    private char brace = '}';
+
+    /* A block comment with an unmatched ( paren */
+    private String query = """
+        SELECT * FROM emp WHERE name = '{'
+        """;
+
+    public Integer getId() {
+        return id;
+    }
+}
+'''
+
+CSHARP_ENTITY = '''using System;
+using System.ComponentModel.DataAnnotations;
+
+namespace Ty.Entity
+{
+    [Table("emp")]
+    public class EmpEntity
+    {
+        [Key]
+        public int Id { get; set; }
+
+        public string Path { get; set; } = @"C:\\{temp}\\";
+
+        public string Note { get; set; } = $"{Id} isn't {{closed";
+    }
+}
+'''
+
+
+@pytest.mark.parametrize("framework, code", [
+    ("Spring Boot", JAVA_ENTITY),
+    (".NET Core", CSHARP_ENTITY),
+    ("Spring Boot", "public interface EmpRepository extends JpaRepository<EmpEntity, Integer> {\n}\n"),
+    ("Spring Boot", "@Repository\npublic interface EmpRepository\n    extends JpaRepository<EmpEntity, Integer> {}\n"),
+    ("Spring Boot", "public record EmpDTO(Integer id, String name) {}\n"),
+])
+def test_valid_code_has_no_problems(framework, code):
+    assert check_code(code, framework) == []
+
+
+@pytest.mark.parametrize("code, problem", [
+    ("", "the response is empty"),
+    ("   \n", "the response is empty"),
+    ("```java\npublic class A {}\n```\n", "Markdown fence on line 1"),
+    ("=== FILE: A.java ===\npublic class A {}\n", "file block marker on line 1"),
+    ("Here is the entity you asked for:\npublic class A {}\n", "text outside the code on line 1"),
+    ("public class A {\n}\nThis class maps the emp table.\n", "text outside the code on line 3"),
+    ("public class A {\n    void f() {\n}\n", "'{' opened on line 1 is never closed"),
+    ("public class A {\n}\n}\n", "unbalanced '}' on line 3"),
+    ("public class A {\n    int[] a = new int[3);\n}\n", "unbalanced ')' on line 2"),
+    ("import java.util.List;\n", "no class, interface, enum or record declaration"),
+    ("public class A {\n}\n/* left open\n", "unterminated /* comment"),
+    ('public class A {\n    String s = """\n        never closed\n}\n', "unterminated multi-line string"),
+])
+def test_invalid_code_is_reported(code, problem):
+    problems = check_code(code, "Spring Boot")
+    assert any(found.startswith(problem) for found in problems), problems
+
+
+def test_a_class_name_in_a_comment_or_string_is_not_a_declaration():
+    code = '// class Emp\nimport java.util.List;\nString s = "class Emp";\n'
+    assert "no class, interface, enum or record declaration" in check_code(code)
+
+
+def test_braces_in_a_string_spanning_a_stray_quote_do_not_hide_later_code():
+    # An unterminated ordinary string ends with its line, so the unbalanced brace after it is still seen
+    code = 'public class A {\n    String s = "oops;\n    void f() {\n}\n'
+    assert any("never closed" in problem for problem in check_code(code))
+
+
+@pytest.mark.parametrize("framework, language", [
+    ("Spring Boot", "java"),
+    (".NET Core", "csharp"),
+    ("ASP.NET", "csharp"),
+    (None, "java"),
+])
+def test_language_for(framework, language):
+    assert language_for(framework) == language
@@ -0,0 +1,182 @@
+import copy
+
+import pytest
+
+import schema_model
+from fk_graph import MANY_TO_MANY, MANY_TO_ONE, ONE_TO_MANY, ONE_TO_ONE, ForeignKeyGraph
+from generation_plan import plan_generation_levels, table_dependencies
+from schema_cache import MetadataCache
+from schema_model import ColumnInfo, ForeignKey, SchemaSnapshot, TableInfo
+
+
+def table(name, columns, primary_key=("id",), foreign_keys=(), unique=()):
+    info = TableInfo(name)
+    for column in columns:
+        info.add_column(ColumnInfo(column, "int", "int", column not in primary_key, column in primary_key,
+                                   is_unique=column in unique))
+    for column, referenced_table, constraint in foreign_keys:
+        info.foreign_keys[column] = ForeignKey(column, referenced_table, "id", constraint)
+    return info
+
+
+# dept <- emp (with a manager self-reference), emp <-> project through emp_project, emp 1:1 badge
+def hr_schema():
+    return SchemaSnapshot("hr", {
+        "dept": table("dept", ["id", "name"]),
+        "emp": table("emp", ["id", "name", "dept_id", "manager_id"],
+                     foreign_keys=[("dept_id", "dept", "fk_emp_dept"), ("manager_id", "emp", "fk_emp_manager")]),
+        "project": table("project", ["id", "title"]),
+        "emp_project": table("emp_project", ["emp_id", "project_id"], primary_key=("emp_id", "project_id"),
+                             foreign_keys=[("emp_id", "emp", "fk_ep_emp"), ("project_id", "project", "fk_ep_project")]),
+        "badge": table("badge", ["id", "emp_id"], foreign_keys=[("emp_id", "emp", "fk_badge_emp")], unique=("emp_id",)),
+    })
+
+
+def kinds(graph, name):
+    return sorted((relationship.kind, relationship.target) for relationship in graph.relationships(name))
+
+
+def test_relationship_kinds():
+    graph = ForeignKeyGraph.from_snapshot(hr_schema())
+    assert kinds(graph, "dept") == [(ONE_TO_MANY, "emp")]
+    assert kinds(graph, "emp") == sorted([
+        (MANY_TO_ONE, "dept"), (MANY_TO_ONE, "emp"), (ONE_TO_MANY, "emp"), (ONE_TO_ONE, "badge"),
+        (MANY_TO_MANY, "project"),
+    ])
+    assert kinds(graph, "project") == [(MANY_TO_MANY, "emp")]
+    assert kinds(graph, "badge") == [(ONE_TO_ONE, "emp")]
+    assert list(graph.join_tables) == ["emp_project"]
+
+
+def test_self_reference():
+    graph = ForeignKeyGraph.from_snapshot(hr_schema())
+    assert graph.references("emp") == {"dept_id": "dept", "manager_id": "emp"}
+    assert graph.describe_relationships("emp", among={"emp"})["emp"] == (
+        "ManyToOne via emp.manager_id; OneToMany via emp.manager_id")
+
+
+def test_replace_tables_matches_a_full_rebuild():
+    schema = hr_schema()
+    graph = ForeignKeyGraph.from_snapshot(schema)
+    changed = copy.deepcopy(schema)
+    # emp_project gains a column of its own, so it is no longer a join table; badge is dropped
+    changed.tables["emp_project"].add_column(ColumnInfo("role", "int", "int", True, False))
+    del changed.tables["badge"]
+    refreshed = graph.replace_tables({"emp_project": changed.tables["emp_project"], "badge": None})
+    rebuilt = ForeignKeyGraph.from_snapshot(changed)
+    assert sorted(refreshed.edges, key=repr) == sorted(rebuilt.edges, key=repr)
+    assert refreshed.join_tables == rebuilt.join_tables == {}
+    assert kinds(refreshed, "project") == [(ONE_TO_MANY, "emp_project")]
+
+
+def test_a_referenced_join_shaped_table_is_not_a_join_table():
+    schema = hr_schema()
+    schema.tables["hours"] = table("hours", ["id", "ep_id"], foreign_keys=[("ep_id", "emp_project", "fk_hours_ep")])
+    assert ForeignKeyGraph.from_snapshot(schema).join_tables == {}
+
+
+def levels_for(schema, selected, manual=None):
+    graph = ForeignKeyGraph.from_snapshot(schema)
+    dependencies = table_dependencies(selected, {name: graph.references(name) for name in selected}, manual or {})
+    return plan_generation_levels(dependencies)
+
+
+def test_levels_put_referenced_tables_first():
+    assert levels_for(hr_schema(), ["emp_project", "project", "emp", "dept", "badge"]) == [
+        ["dept", "project"], ["emp"], ["badge", "emp_project"],
+    ]
+
+
+def test_a_self_reference_does_not_delay_a_table():
+    assert levels_for(hr_schema(), ["emp"]) == [["emp"]]
+
+
+def test_only_selected_tables_are_ordered():
+    assert levels_for(hr_schema(), ["badge", "dept"]) == [["badge", "dept"]]
+
+
+def test_a_cycle_shares_a_level_and_its_dependents_follow():
+    schema = hr_schema()
+    # dept.head_id -> emp closes the cycle dept <-> emp
+    schema.tables["dept"] = table("dept", ["id", "head_id"], foreign_keys=[("head_id", "emp", "fk_dept_head")])
+    assert levels_for(schema, ["badge", "emp", "dept", "project", "emp_project"]) == [
+        ["dept", "emp", "project"], ["badge", "emp_project"],
+    ]
+
+
+def test_manual_relationships_add_dependencies():
+    # "project-dept" OneToMany: dept refers to project
+    assert levels_for(hr_schema(), ["dept", "project"], {"project-dept": ("OneToMany", "-Select-")}) == [
+        ["project"], ["dept"],
+    ]
+
+
+@pytest.mark.parametrize("dependencies, levels", [
+    ({}, []),
+    ({"a": {"b"}, "b": {"c"}, "c": {"a"}, "d": {"c"}}, [["a", "b", "c"], ["d"]]),
+    ({"a": {"b"}, "b": {"a"}, "c": {"d"}, "d": {"c"}, "e": {"a", "c"}}, [["a", "b", "c", "d"], ["e"]]),
+    ({"a": {"a"}}, [["a"]]),
+    ({str(n): {str(n - 1)} if n else set() for n in range(3000)}, [[str(n)] for n in range(3000)]),
+])
+def test_plan_generation_levels(dependencies, levels):
+    assert plan_generation_levels(dependencies) == levels
+
+
+class FakeSource:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.reads = []
+
+    def read(self, table_name=None):
+        self.reads.append(table_name)
+        if table_name is None:
+            return copy.deepcopy(self.snapshot)
+        found = self.snapshot.get_table(table_name)
+        return SchemaSnapshot("hr", {table_name: copy.deepcopy(found)} if found is not None else {})
+
+
+@pytest.fixture
+def source(monkeypatch):
+    source = FakeSource(hr_schema())
+    cache = MetadataCache()
+    monkeypatch.setattr(schema_model, "schema_cache", cache)
+    monkeypatch.setattr(schema_model, "_read_snapshot", source.read)
+    return source
+
+
+def test_ddl_marks_only_the_changed_table_stale(source):
+    graph = schema_model.get_fk_graph()
+    assert source.reads == [None]
+    assert schema_model.get_fk_graph() is graph
+
+    source.snapshot.tables["project"] = table("project", ["id", "lead_id"],
+                                              foreign_keys=[("lead_id", "emp", "fk_project_lead")])
+    schema_model.schema_cache.invalidate_table("project")
+    assert schema_model.schema_cache.fk_stale_tables() == {"project": 1}
+
+    graph = schema_model.get_fk_graph()
+    assert source.reads == [None, "project"]
+    assert graph.references("project") == {"lead_id": "emp"}
+    assert schema_model.schema_cache.fk_stale_tables() == {}
+    assert schema_model.get_fk_graph() is graph
+
+
+def test_a_dropped_table_loses_its_edges(source):
+    schema_model.get_fk_graph()
+    del source.snapshot.tables["badge"]
+    schema_model.schema_cache.invalidate_table("badge", table_list=True)
+    graph = schema_model.get_fk_graph()
+    assert graph.references("badge") == {}
+    assert ("OneToOne", "badge") not in kinds(graph, "emp")
+
+
+def test_a_table_changed_during_a_refresh_stays_stale():
+    cache = MetadataCache()
+    cache.invalidate_table("emp")
+    stale = cache.fk_stale_tables()
+    # Changed again while the refresh read the first change
+    cache.invalidate_table("emp")
+    cache.fk_refreshed(stale)
+    assert cache.fk_stale_tables() == {"emp": 2}
+    cache.fk_refreshed(cache.fk_stale_tables())
+    assert cache.fk_stale_tables() == {}
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+import job_queue
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def submit(queue, session):
+    job_id = queue.submit("layers", {"class_name": "Emp"}, session)
+    # Claims are ordered by submission time; keep it strictly increasing
+    time.sleep(0.002)
+    return job_id
+
+
+def expire_leases(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_LEASE_SECONDS", 0.0)
+
+
+def test_claim_on_an_empty_queue(queue):
+    assert queue.claim("w1") is None
+
+
+def test_unknown_kind_is_refused(queue):
+    with pytest.raises(ValueError):
+        queue.submit("nope", {})
+
+
+def test_claim_marks_the_job_running(queue):
+    job_id = submit(queue, "a")
+    job = queue.claim("w1")
+    assert job["id"] == job_id
+    assert job["status"] == "running"
+    assert job["worker"] == "w1"
+    assert job["attempts"] == 1
+    assert job["payload"] == {"class_name": "Emp"}
+    assert queue.claim("w2") is None
+
+
+def test_sessions_take_turns(queue):
+    a1, a2, a3 = submit(queue, "a"), submit(queue, "a"), submit(queue, "a")
+    b1 = submit(queue, "b")
+    # b1 goes second although it was submitted last: session a already has a job running by then
+    claimed = [queue.claim("w")["id"] for _ in range(4)]
+    assert claimed == [a1, b1, a2, a3]
+
+
+def test_position_follows_the_claim_order(queue):
+    jobs = [submit(queue, session) for session in ("a", "a", "a", "b", "c", "b")]
+    positions = {job_id: queue.position(job_id) for job_id in jobs}
+    claimed = []
+    while True:
+        job = queue.claim("w")
+        if job is None:
+            break
+        claimed.append(job["id"])
+    assert sorted(jobs, key=positions.get) == claimed
+    assert queue.position(claimed[0]) == 0
+
+
+def test_cancel_only_queued_jobs(queue):
+    running, queued = submit(queue, "a"), submit(queue, "a")
+    queue.claim("w1")
+    assert not queue.cancel(running)
+    assert queue.cancel(queued)
+    assert queue.get(queued)["status"] == "cancelled"
+    assert queue.claim("w2") is None
+
+
+def test_an_expired_lease_is_claimed_again(queue, monkeypatch):
+    job_id = submit(queue, "a")
+    expire_leases(monkeypatch)
+    queue.claim("w1")
+    time.sleep(0.01)
+    job = queue.claim("w2")
+    assert job["id"] == job_id
+    assert job["worker"] == "w2"
+    assert job["attempts"] == 2
+
+
+def test_a_live_lease_is_not_claimed_again(queue):
+    submit(queue, "a")
+    queue.claim("w1")
+    assert queue.claim("w2") is None
+
+
+def test_a_job_fails_after_its_last_attempt_expires(queue, monkeypatch):
+    job_id = submit(queue, "a")
+    expire_leases(monkeypatch)
+    for worker in range(job_queue.JOB_MAX_ATTEMPTS):
+        assert queue.claim(f"w{worker}")["id"] == job_id
+        time.sleep(0.01)
+    assert queue.claim("last") is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "The worker running this job stopped responding."
+
+
+def test_a_stale_worker_cannot_finish_or_renew_a_reclaimed_job(queue, monkeypatch):
+    job_id = submit(queue, "a")
+    expire_leases(monkeypatch)
+    queue.claim("w1")
+    time.sleep(0.01)
+    monkeypatch.setattr(job_queue, "JOB_LEASE_SECONDS", 60.0)
+    queue.claim("w2")
+
+    queue.heartbeat(job_id, "w1", {"layers": "from w1"})
+    queue.finish(job_id, "w1", {"from": "w1"})
+    job = queue.get(job_id)
+    assert job["status"] == "running"
+    assert job["worker"] == "w2"
+    assert job["progress"] is None
+
+    queue.finish(job_id, "w2", {"from": "w2"})
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"from": "w2"}
+
+
+def test_finish_with_an_error(queue):
+    job_id = submit(queue, "a")
+    queue.claim("w1")
+    queue.finish(job_id, "w1", error="RuntimeError: boom")
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "RuntimeError: boom"
+    assert queue.get_stats()["failed"] == 1
@@ -0,0 +1,206 @@
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import LLMScheduler, SchedulerBusy, SharedTokenBucket, TokenBucket, is_retryable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+def make_scheduler(**kwargs):
+    clock = FakeClock()
+    kwargs.setdefault("bucket", TokenBucket(1000, 1000, clock, clock.sleep))
+    return LLMScheduler(sleep=clock.sleep, **kwargs), clock
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_bucket_allows_a_burst_then_the_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert clock.now == pytest.approx(1001.0)
+
+
+def test_bucket_refills_while_idle_up_to_its_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=2, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 100
+    assert [bucket.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_shared_bucket_is_shared_through_its_file(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "rate.sqlite3")
+    first = SharedTokenBucket(path, rate=1, capacity=2, clock=clock, sleep=clock.sleep)
+    second = SharedTokenBucket(path, rate=1, capacity=2, clock=clock, sleep=clock.sleep)
+    assert first.acquire() == 0.0
+    assert second.acquire() == 0.0
+    # Both tokens of the burst are gone, whichever instance asks next
+    assert first.acquire() == pytest.approx(1.0)
+    assert second.acquire() == pytest.approx(1.0)
+
+
+def test_identical_requests_in_flight_share_one_call():
+    scheduler, _ = make_scheduler()
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(scheduler.run("key", call))) for _ in range(3)]
+    threads[0].start()
+    wait_until(lambda: calls)
+    for thread in threads[1:]:
+        thread.start()
+    wait_until(lambda: scheduler.get_stats()["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["answer"] * 3
+    assert len(calls) == 1
+    # Once finished, the same request is sent again
+    assert scheduler.run("key", lambda: "again") == "again"
+
+
+def test_identical_streams_in_flight_share_one_upstream_stream():
+    scheduler, _ = make_scheduler()
+    release = threading.Event()
+    opened = []
+
+    def open_stream():
+        opened.append(1)
+        yield "a"
+        release.wait(5)
+        yield "b"
+
+    first = scheduler.stream("key", open_stream)
+    wait_until(lambda: opened)
+    second = scheduler.stream("key", open_stream)
+    release.set()
+    assert list(first) == ["a", "b"]
+    assert list(second) == ["a", "b"]
+    assert len(opened) == 1
+
+
+def test_quota_errors_are_retried_with_backoff():
+    scheduler, clock = make_scheduler(max_retries=3)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise QuotaError("quota exceeded")
+        return "ok"
+
+    assert scheduler.run("key", call) == "ok"
+    assert len(attempts) == 3
+    assert scheduler.get_stats()["retries"] == 2
+    assert len(clock.sleeps) == 2
+
+
+def test_retries_stop_after_max_retries():
+    scheduler, _ = make_scheduler(max_retries=2)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        raise QuotaError("quota exceeded")
+
+    with pytest.raises(QuotaError):
+        scheduler.run("key", call)
+    assert len(attempts) == 3
+
+
+def test_other_errors_are_not_retried():
+    scheduler, _ = make_scheduler()
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        scheduler.run("key", call)
+    assert len(attempts) == 1
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (QuotaError("x"), True),
+    (Exception("429 Too Many Requests"), True),
+    (Exception("Resource has been exhausted (e.g. check quota)."), True),
+    (type("ServiceUnavailable", (Exception,), {})("down"), True),
+    (ValueError("invalid argument"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_a_full_queue_turns_new_requests_away():
+    scheduler, _ = make_scheduler(max_concurrency=1, max_queued=1)
+    release = threading.Event()
+    running = threading.Thread(target=scheduler.run, args=("running", lambda: release.wait(5)))
+    running.start()
+    wait_until(lambda: scheduler.get_stats()["running"] == 1)
+    queued = threading.Thread(target=scheduler.run, args=("queued", lambda: None))
+    queued.start()
+    wait_until(lambda: scheduler.get_stats()["queued"] == 1)
+
+    with pytest.raises(SchedulerBusy):
+        scheduler.run("rejected", lambda: None)
+    assert scheduler.get_stats()["rejected"] == 1
+    release.set()
+    running.join(5)
+    queued.join(5)
+
+
+def test_sessions_take_turns():
+    scheduler, _ = make_scheduler(max_concurrency=1)
+    release = threading.Event()
+    order = []
+    blocker = threading.Thread(target=scheduler.run, args=("blocker", lambda: release.wait(5), "other"))
+    blocker.start()
+    wait_until(lambda: scheduler.get_stats()["running"] == 1)
+
+    threads = []
+    for number, session in enumerate(["a", "a", "a", "b"]):
+        name = f"{session}{number}"
+        thread = threading.Thread(target=scheduler.run, args=(name, lambda name=name: order.append(name), session))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: scheduler.get_stats()["queued"] == len(threads))
+    release.set()
+    for thread in [blocker] + threads:
+        thread.join(5)
+    # Session b's only request doesn't wait behind all of session a's
+    assert order == ["a0", "b3", "a1", "a2"]
@@ -0,0 +1,140 @@
+import pytest
+
+import online_ddl
+from online_ddl import (DDLRefused, change_column_clause, column_definitions, execute_online_alter, plan_algorithm,
+                        preflight, rename_clauses_as_change)
+
+CREATE_EMP = """CREATE TABLE `emp` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `ename` varchar(50) CHARACTER SET latin1 COLLATE latin1_bin NOT NULL DEFAULT 'n/a' COMMENT 'Employee''s name',
+  `active` bit(1) NOT NULL DEFAULT b'0',
+  `ename_len` int(11) GENERATED ALWAYS AS (char_length(`ename`)) VIRTUAL,
+  `odd``name` date DEFAULT NULL,
+  `dept_id` int(11) DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `fk_dept` (`dept_id`),
+  CONSTRAINT `fk_dept` FOREIGN KEY (`dept_id`) REFERENCES `dept` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+
+
+class FakeCursor:
+    def __init__(self, size=(10, 1024, 0), create_table_sql=CREATE_EMP, rejected_algorithms=()):
+        self.size = size
+        self.create_table_sql = create_table_sql
+        self.rejected_algorithms = rejected_algorithms
+        self.statements = []
+        self._row = None
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        if sql.startswith("SHOW CREATE TABLE"):
+            self._row = ("emp", self.create_table_sql)
+        elif "information_schema.TABLES" in sql:
+            self._row = self.size
+        for algorithm in self.rejected_algorithms:
+            if algorithm in sql:
+                error = Exception("not supported")
+                error.errno = 1846
+                raise error
+
+    def fetchone(self):
+        return self._row
+
+
+@pytest.fixture(autouse=True)
+def datasource_errors(monkeypatch):
+    # datasource.Error is mysql.connector.Error, which isn't needed to test the fallbacks
+    import datasource
+
+    monkeypatch.setitem(vars(datasource), "Error", Exception)
+
+
+def test_column_definitions_keep_every_attribute():
+    definitions = column_definitions(CREATE_EMP)
+    assert list(definitions) == ["id", "ename", "active", "ename_len", "odd`name", "dept_id"]
+    assert definitions["ename"] == ("varchar(50) CHARACTER SET latin1 COLLATE latin1_bin NOT NULL DEFAULT 'n/a' "
+                                    "COMMENT 'Employee''s name'")
+    assert definitions["active"] == "bit(1) NOT NULL DEFAULT b'0'"
+    assert definitions["ename_len"] == "int(11) GENERATED ALWAYS AS (char_length(`ename`)) VIRTUAL"
+
+
+def test_change_column_clause():
+    assert change_column_clause("a", "b", "int(11) NOT NULL") == "CHANGE a b int(11) NOT NULL"
+
+
+def test_rename_clauses_as_change_restates_the_definitions():
+    cursor = FakeCursor()
+    clauses = ["RENAME COLUMN ename TO name", "ADD x INT", "RENAME COLUMN active TO enabled",
+               "RENAME COLUMN ename_len TO name_len"]
+    assert rename_clauses_as_change(cursor, "emp", clauses) == [
+        "CHANGE ename name varchar(50) CHARACTER SET latin1 COLLATE latin1_bin NOT NULL DEFAULT 'n/a' "
+        "COMMENT 'Employee''s name'",
+        "ADD x INT",
+        "CHANGE active enabled bit(1) NOT NULL DEFAULT b'0'",
+        "CHANGE ename_len name_len int(11) GENERATED ALWAYS AS (char_length(`ename`)) VIRTUAL",
+    ]
+    assert cursor.statements == ["SHOW CREATE TABLE emp"]
+
+
+def test_rename_clauses_as_change_reads_bytes():
+    cursor = FakeCursor(create_table_sql=CREATE_EMP.encode("utf-8"))
+    assert rename_clauses_as_change(cursor, "emp", ["RENAME COLUMN id TO emp_id"]) == [
+        "CHANGE id emp_id int(11) NOT NULL AUTO_INCREMENT"
+    ]
+
+
+def test_renaming_a_column_that_does_not_exist_yet():
+    with pytest.raises(ValueError, match="doesn't exist"):
+        rename_clauses_as_change(FakeCursor(), "emp", ["ADD x INT", "RENAME COLUMN x TO y"])
+
+
+@pytest.mark.parametrize("clauses, plan", [
+    (["RENAME COLUMN a TO b", "DROP COLUMN c"], "instant"),
+    (["ADD x INT", "ADD PRIMARY KEY (x)"], "inplace"),
+    (["ADD x INT", "MODIFY y BIGINT"], "copy"),
+])
+def test_plan_algorithm(clauses, plan):
+    assert plan_algorithm(clauses) == plan
+
+
+def test_preflight_refuses_to_copy_a_large_table(monkeypatch):
+    monkeypatch.setattr(online_ddl, "COPY_LIMIT_BYTES", 1000)
+    with pytest.raises(DDLRefused):
+        preflight(FakeCursor(size=(50, 2000, 500)), "emp", ["MODIFY y BIGINT"])
+
+
+def test_preflight_allows_a_small_copy_with_a_warning(monkeypatch):
+    monkeypatch.setattr(online_ddl, "COPY_LIMIT_BYTES", 1000)
+    size, plan, warnings = preflight(FakeCursor(size=(5, 500, 100)), "emp", ["MODIFY y BIGINT"])
+    assert size == {"rows": 5, "bytes": 600}
+    assert plan == "copy"
+    assert len(warnings) == 1
+
+
+def test_preflight_warns_before_rebuilding_a_large_table(monkeypatch):
+    monkeypatch.setattr(online_ddl, "WARN_ROWS", 100)
+    _, plan, warnings = preflight(FakeCursor(size=(1000, 1, 1)), "emp", ["ADD PRIMARY KEY (x)"])
+    assert plan == "inplace"
+    assert "rebuilt in place" in warnings[0]
+
+
+def test_preflight_uses_the_given_plan(monkeypatch):
+    monkeypatch.setattr(online_ddl, "COPY_LIMIT_BYTES", 1000)
+    # A CHANGE that only renames is planned like the RENAME COLUMN it replaces, so no copy is refused
+    _, plan, warnings = preflight(FakeCursor(size=(50, 2000, 500)), "emp", ["CHANGE a b int"], plan="instant")
+    assert (plan, warnings) == ("instant", [])
+
+
+def test_online_alter_falls_back_to_inplace():
+    cursor = FakeCursor(rejected_algorithms=["ALGORITHM=INSTANT"])
+    algorithm, warnings = execute_online_alter(cursor, "emp", ["ADD x INT"])
+    assert algorithm == "ALGORITHM=INPLACE, LOCK=NONE"
+    assert cursor.statements[-1] == "ALTER TABLE emp ADD x INT, ALGORITHM=INPLACE, LOCK=NONE;"
+
+
+def test_online_alter_never_copies_a_large_table(monkeypatch):
+    monkeypatch.setattr(online_ddl, "COPY_LIMIT_BYTES", 1000)
+    cursor = FakeCursor(size=(50, 2000, 500), rejected_algorithms=["ALGORITHM=INSTANT", "ALGORITHM=INPLACE"])
+    with pytest.raises(DDLRefused):
+        execute_online_alter(cursor, "emp", ["ADD x INT"])
+    assert not any("ALGORITHM=COPY" in statement for statement in cursor.statements)
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+import output_writer
+from output_writer import BulkWriter
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def leftovers(base_dir):
+    return sorted(name for _, _, names in os.walk(base_dir) for name in names if name.endswith((".tmp", ".bak")))
+
+
+@pytest.fixture
+def layer(tmp_path):
+    base_dir = str(tmp_path)
+    paths = [os.path.join(base_dir, "app", name) for name in ("model.py", "service.py", "routes.py")]
+    write(paths[0], "old model")
+    write(paths[1], "old service")
+    return base_dir, paths
+
+
+def test_publish_writes_changed_files_only(layer):
+    base_dir, (model, service, routes) = layer
+    writer = BulkWriter(base_dir)
+    writer.stage(model, "old model")
+    writer.stage(service, "new service")
+    writer.stage(routes, "new routes")
+    assert writer.publish() == {"written": sorted([service, routes]), "unchanged": [model]}
+    assert (read(service), read(routes)) == ("new service", "new routes")
+    assert leftovers(base_dir) == []
+
+
+def test_a_failed_rename_restores_the_previous_files(layer, monkeypatch):
+    base_dir, (model, service, routes) = layer
+    real_replace = os.replace
+    renamed = []
+
+    def failing_replace(source, target):
+        if source.endswith(".tmp") and renamed:
+            raise OSError("disk full")
+        real_replace(source, target)
+        if source.endswith(".tmp"):
+            renamed.append(target)
+
+    monkeypatch.setattr(output_writer.os, "replace", failing_replace)
+    writer = BulkWriter(base_dir)
+    for path in (model, service, routes):
+        writer.stage(path, f"new {os.path.basename(path)}")
+    with pytest.raises(OSError, match="disk full"):
+        writer.publish()
+
+    assert len(renamed) == 1
+    assert (read(model), read(service)) == ("old model", "old service")
+    assert not os.path.exists(routes)
+    assert leftovers(base_dir) == []
+
+
+def test_a_failed_temp_write_leaves_the_targets_alone(layer, monkeypatch):
+    base_dir, (model, service, _) = layer
+    monkeypatch.setattr(output_writer.os, "fsync", lambda fd: (_ for _ in ()).throw(OSError("io error")))
+    writer = BulkWriter(base_dir)
+    writer.stage(model, "new model")
+    writer.stage(service, "new service")
+    with pytest.raises(OSError, match="io error"):
+        writer.publish()
+    assert (read(model), read(service)) == ("old model", "old service")
+    assert leftovers(base_dir) == []
@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+from schema_sources import FileSchemaSource, SchemaSourceError, parse_ddl, snapshot_from_json, snapshot_to_json
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "hr_dump.sql")
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return parse_ddl(f.read())
+
+
+def columns(table):
+    return [(column.name, column.column_type, column.nullable) for column in table.columns]
+
+
+def test_tables_and_database(snapshot):
+    assert snapshot.database == "hr"
+    # Tables named only in comments aren't tables
+    assert snapshot.table_names == ["dept", "emp", "emp_project", "project"]
+
+
+def test_columns(snapshot):
+    assert columns(snapshot.get_table("dept")) == [
+        ("id", "int", False), ("name", "varchar(100)", False), ("budget", "decimal(12,2)", True),
+    ]
+    assert columns(snapshot.get_table("emp")) == [
+        ("id", "int", False), ("first name", "varchar(50)", False), ("dept_id", "int", True),
+        ("manager_id", "int", True), ("active", "tinyint(1)", False), ("updated_at", "timestamp", True),
+    ]
+    assert columns(snapshot.get_table("emp_project"))[2] == ("role", "enum('lead','member')", True)
+
+
+def test_column_attributes(snapshot):
+    emp = snapshot.get_table("emp")
+    assert emp.columns_by_name["id"].extra == "auto_increment"
+    assert emp.columns_by_name["first name"].default == "n/a"
+    assert emp.columns_by_name["dept_id"].default is None
+    assert emp.columns_by_name["updated_at"].default == "CURRENT_TIMESTAMP"
+    assert emp.columns_by_name["updated_at"].extra == "on update current_timestamp"
+    assert snapshot.get_table("dept").columns_by_name["budget"].default == "0.00"
+    assert snapshot.get_table("dept").columns_by_name["name"].is_unique
+    assert snapshot.get_table("project").columns_by_name["title"].is_unique
+
+
+def test_primary_keys(snapshot):
+    assert snapshot.get_table("dept").primary_key == ["id"]
+    assert snapshot.get_table("emp").primary_key == ["id"]
+    assert snapshot.get_table("emp_project").primary_key == ["emp_id", "project_code"]
+    # Declared inline with the column
+    assert snapshot.get_table("project").primary_key == ["code"]
+    assert not snapshot.get_table("project").columns_by_name["code"].nullable
+
+
+def test_foreign_keys(snapshot):
+    emp = snapshot.get_table("emp")
+    assert sorted(emp.foreign_keys) == ["dept_id", "manager_id"]
+    dept_fk = emp.foreign_keys["dept_id"]
+    assert (dept_fk.referenced_table, dept_fk.referenced_column, dept_fk.constraint_name) == ("dept", "id",
+                                                                                             "fk_emp_dept")
+    assert (dept_fk.on_update, dept_fk.on_delete) == ("CASCADE", "SET NULL")
+    # A self-reference
+    assert emp.foreign_keys["manager_id"].referenced_table == "emp"
+    # Unnamed constraints get MySQL's generated names; schema-qualified names lose the schema
+    project_fk = snapshot.get_table("emp_project").foreign_keys["emp_id"]
+    assert (project_fk.referenced_table, project_fk.constraint_name, project_fk.on_delete) == (
+        "emp", "emp_project_ibfk_1", "CASCADE")
+    assert snapshot.get_table("dept").foreign_keys == {}
+
+
+def test_comments_inside_statements_are_ignored():
+    snapshot = parse_ddl("CREATE TABLE t ( -- the key\n  id int, # legacy\n  /* note, with a comma */ name text\n);")
+    assert columns(snapshot.get_table("t")) == [("id", "int", True), ("name", "text", True)]
+
+
+def test_a_truncated_statement_is_an_error():
+    with pytest.raises(ValueError):
+        parse_ddl("CREATE TABLE t (id int, name varchar(10)")
+
+
+def test_json_round_trip(snapshot):
+    restored = snapshot_from_json(json.loads(json.dumps(snapshot_to_json(snapshot))))
+    assert restored.table_names == snapshot.table_names
+    for name in snapshot.table_names:
+        assert restored.get_table(name).columns == snapshot.get_table(name).columns
+        assert restored.get_table(name).foreign_keys == snapshot.get_table(name).foreign_keys
+
+
+def test_file_source_reads_a_dump():
+    assert FileSchemaSource(FIXTURE).snapshot().table_names == ["dept", "emp", "emp_project", "project"]
+
+
+@pytest.mark.parametrize("name, content", [
+    ("missing.sql", None),
+    ("broken.json", "{not json"),
+    ("truncated.sql", "CREATE TABLE t (id int"),
+])
+def test_file_source_errors(tmp_path, name, content):
+    path = tmp_path / name
+    if content is not None:
+        path.write_text(content)
+    with pytest.raises(SchemaSourceError):
+        FileSchemaSource(str(path)).snapshot()